@@ -0,0 +1,258 @@
+from __future__ import annotations
+import random
+from typing import Dict, List, Optional, Tuple
+from .compiled import LITERAL, PREFIX, CompiledPattern, CompiledRule, CompiledRuleSet, _is_literal, _literal_head, \
+    ensure_compiled
+from .evaluator import Rules
+from .models import AccessControlRules
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# containment verdicts: proven by construction, or only backed by sampling
+EXACT, SAMPLED = "exact", "sampled"
+
+Atom = Tuple[str, str]  # ("lit", text) or ("pre", prefix)
+
+def pattern_atoms(pat: CompiledPattern) -> Optional[List[Atom]]:
+    """Literal/prefix alternatives of a pattern (``a|b.*|(c|d)``), or None for other regexes."""
+    if pat.kind == LITERAL:
+        return [("lit", pat.pattern)]
+    if pat.kind == PREFIX:
+        return [("pre", pat.prefix)]
+    body = pat.pattern
+    if body.startswith("(") and body.endswith(")") and body.count("(") == 1:
+        body = body[1:-1]
+        if body.startswith("?:"):
+            body = body[2:]
+    atoms = []
+    for part in body.split("|"):
+        if _is_literal(part):
+            atoms.append(("lit", part))
+        elif part.endswith(".*") and _is_literal(part[:-2]):
+            atoms.append(("pre", part[:-2]))
+        else:
+            return None
+    return atoms
+
+def _atom_covered(atom: Atom, atoms: List[Atom]) -> bool:
+    kind, text = atom
+    for a_kind, a_text in atoms:
+        if a_kind == "lit" and kind == "lit" and a_text == text:
+            return True
+        # "." doesn't match a newline, so a_text.* covers only values with none after the prefix
+        if a_kind == "pre" and text.startswith(a_text) and "\n" not in text[len(a_text):]:
+            return True
+    return False
+
+_ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789_"
+
+def _sample(tree, rng: random.Random, minimal: bool, captured: Optional[dict] = None) -> Optional[str]:
+    captured = {} if captured is None else captured  # group number -> text, for backreferences
+    out = []
+    for op, av in tree:
+        name = str(op)
+        if name == "LITERAL":
+            out.append(chr(av))
+        elif name == "NOT_LITERAL":
+            out.append(next(c for c in _ALPHABET if ord(c) != av))
+        elif name == "ANY":
+            out.append(rng.choice(_ALPHABET))
+        elif name == "IN":
+            choices = []
+            for item_op, item in av:
+                item_name = str(item_op)
+                if item_name == "LITERAL":
+                    choices.append(chr(item))
+                elif item_name == "RANGE":
+                    choices.extend(chr(c) for c in range(item[0], min(item[1], item[0] + 25) + 1))
+                elif item_name == "CATEGORY" and "DIGIT" in str(item):
+                    choices.extend("0123456789")
+                elif item_name == "CATEGORY" and "WORD" in str(item):
+                    choices.extend(_ALPHABET)
+                else:
+                    return None
+            if not choices:
+                return None
+            out.append(rng.choice(choices))
+        elif name in ("MAX_REPEAT", "MIN_REPEAT"):
+            lo, hi, sub = av
+            count = lo if minimal else rng.randint(lo, min(hi, lo + 3))
+            for _ in range(count):
+                part = _sample(sub, rng, minimal, captured)
+                if part is None:
+                    return None
+                out.append(part)
+        elif name == "BRANCH":
+            part = _sample(rng.choice(av[1]), rng, minimal, captured)
+            if part is None:
+                return None
+            out.append(part)
+        elif name == "SUBPATTERN":
+            part = _sample(av[3], rng, minimal, captured)
+            if part is None:
+                return None
+            if av[0] is not None:
+                captured[av[0]] = part
+            out.append(part)
+        elif name == "GROUPREF" and av in captured:
+            out.append(captured[av])
+        elif name == "AT":
+            continue
+        else:
+            return None
+    return "".join(out)
+
+def sample_strings(pattern: str, n: int = 64, seed: int = 0) -> Optional[List[str]]:
+    """Strings generated from a regex, each checked to fullmatch it; None if unsupported."""
+    try:
+        tree = sre_parse.parse(pattern)
+    except Exception:
+        return None
+    rng = random.Random(seed)
+    samples = set()
+    for i in range(n):
+        s = _sample(tree, rng, minimal=(i == 0))
+        if s is None:
+            return None
+        samples.add(s)
+    checker = CompiledPattern(pattern)
+    return sorted(s for s in samples if checker.match(s))
+
+def pattern_contains(a: CompiledPattern, b: CompiledPattern) -> Optional[str]:
+    """Whether every value matched by ``b`` is matched by ``a``: EXACT, SAMPLED or None."""
+    # ".*" takes any value without a newline: b must not be able to produce one
+    if a.pattern == b.pattern or (a.kind == PREFIX and a.prefix == "" and "\n" not in b.pattern
+                                  and "\\" not in b.pattern and "[^" not in b.pattern and "(?" not in b.pattern):
+        return EXACT
+    atoms_b = pattern_atoms(b)
+    atoms_a = pattern_atoms(a)
+    if atoms_b is not None and atoms_a is not None:
+        return EXACT if all(_atom_covered(atom, atoms_a) for atom in atoms_b) else None
+    if atoms_b is not None and all(kind == "lit" for kind, _ in atoms_b):
+        return EXACT if all(a.match(text) for _, text in atoms_b) else None
+    if atoms_b is None and atoms_a is not None and all(kind == "lit" for kind, _ in atoms_a):
+        # a general regex is not proven inside a finite set of names by sampling
+        return None
+    samples = sample_strings(b.pattern)
+    if atoms_b is not None:
+        samples = (samples or []) + [text + suffix for kind, text in atoms_b if kind == "pre" for suffix in ("", "x", "_1")]
+    if not samples:
+        return None
+    return SAMPLED if all(a.match(s) for s in samples) else None
+
+def _weakest(*verdicts: Optional[str]) -> Optional[str]:
+    if any(v is None for v in verdicts):
+        return None
+    return SAMPLED if SAMPLED in verdicts else EXACT
+
+def identity_contains(a: CompiledRule, b: CompiledRule) -> Optional[str]:
+    """Whether every principal that ``b`` applies to is also covered by ``a``."""
+    if a.anyone:
+        return EXACT
+    if b.anyone:
+        return None
+    verdicts = []
+    for field in ("user", "group", "role"):
+        pb = getattr(b, field)
+        if pb is None:
+            continue
+        pa = getattr(a, field)
+        verdicts.append(pattern_contains(pa, pb) if pa is not None else None)
+    return _weakest(*verdicts) if verdicts else EXACT
+
+def never_applies(rule: CompiledRule) -> bool:
+    # an empty user/group/role pattern is present (so not "anyone") but never matches
+    return not rule.anyone and rule.user is None and rule.group is None and rule.role is None
+
+def _atoms_overlap(x: Atom, y: Atom) -> bool:
+    (kx, tx), (ky, ty) = x, y
+    if kx == "lit" and ky == "lit":
+        return tx == ty
+    if kx == "pre" and ky == "pre":
+        return tx.startswith(ty) or ty.startswith(tx)
+    lit, pre = (tx, ty) if kx == "lit" else (ty, tx)
+    return lit.startswith(pre) and "\n" not in lit[len(pre):]
+
+def _head(pat: CompiledPattern) -> str:
+    return pat.pattern if pat.kind == LITERAL else pat.prefix if pat.kind == PREFIX else _literal_head(pat.pattern)
+
+def pattern_disjoint(a: CompiledPattern, b: CompiledPattern) -> bool:
+    """Whether no value can match both patterns; False unless proven."""
+    atoms_a, atoms_b = pattern_atoms(a), pattern_atoms(b)
+    if atoms_a is not None and atoms_b is not None:
+        return not any(_atoms_overlap(x, y) for x in atoms_a for y in atoms_b)
+    for atoms, other in ((atoms_a, b), (atoms_b, a)):
+        if atoms is not None and all(kind == "lit" for kind, _ in atoms):
+            return not any(other.match(text) for _, text in atoms)
+    # every match starts with the literal head, so incompatible heads never meet
+    head_a, head_b = _head(a), _head(b)
+    return not (head_a.startswith(head_b) or head_b.startswith(head_a))
+
+def identity_disjoint(a: CompiledRule, b: CompiledRule) -> bool:
+    """Whether no principal can match both rules' identity parts; False unless proven.
+
+    A principal may have any groups and roles, so only rules restricted to
+    disjoint user patterns (or never applying) are disjoint.
+    """
+    if never_applies(a) or never_applies(b):
+        return True
+    if a.anyone or b.anyone or a.group or a.role or b.group or b.role:
+        return False
+    return pattern_disjoint(a.user, b.user)
+
+TIERS = ("catalogs", "schemas", "tables")
+
+def _possible_shadowers(compiled: CompiledRuleSet, tier: str, j: int) -> List[int]:
+    index = getattr(compiled, tier[:-1] + "_index")
+    key = getattr(compiled, tier)[j].objects[-1]
+    if key.kind == LITERAL:
+        return [i for i in index.candidates(key.pattern) if i < j]
+    found = list(index.regex)
+    for prefix, positions in index.prefix.items():
+        if key.kind != PREFIX or key.prefix.startswith(prefix):
+            found.extend(positions)
+    return sorted(i for i in found if i < j)
+
+def find_shadowed(rules: Rules) -> List[Dict]:
+    """Rules that can never be the first match in their tier.
+
+    A rule is shadowed when an earlier rule in the same tier applies to every
+    principal it applies to and matches every object it matches. Containment
+    is proven for literal, prefix and literal-alternation patterns and
+    estimated by sampling for other regexes (``exact`` is False then).
+    """
+    compiled = ensure_compiled(rules)
+    found = []
+    for tier in TIERS:
+        rules_in_tier = getattr(compiled, tier)
+        for j, later in enumerate(rules_in_tier):
+            if never_applies(later):
+                found.append({"tier": tier, "index": j, "shadowed_by": None, "exact": True,
+                              "reason": "empty identity pattern never matches"})
+                continue
+            for i in _possible_shadowers(compiled, tier, j):
+                earlier = rules_in_tier[i]
+                verdict = identity_contains(earlier, later)
+                if verdict is None:
+                    continue
+                verdict = _weakest(verdict, *(pattern_contains(a, b) for a, b in zip(earlier.objects, later.objects)))
+                if verdict is not None:
+                    found.append({"tier": tier, "index": j, "shadowed_by": i, "exact": verdict == EXACT,
+                                  "reason": f"covered by rule {i} ({verdict})"})
+                    break
+    return found
+
+def minimize_rules(rules: Rules, include_sampled: bool = False) -> AccessControlRules:
+    """Copy of the rules without shadowed catalog/schema/table rules.
+
+    Only rules proven dead are dropped unless include_sampled is set.
+    """
+    compiled = ensure_compiled(rules)
+    dead = {(r["tier"], r["index"]) for r in find_shadowed(compiled) if r["exact"] or include_sampled}
+    data = compiled.rules.model_copy()
+    for tier in TIERS:
+        setattr(data, tier, [r for i, r in enumerate(getattr(compiled.rules, tier)) if (tier, i) not in dead])
+    return data
@@ -0,0 +1,112 @@
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, List, Optional
+
+class DecisionCache:
+    """Bounded LRU of evaluation results tied to one rules version.
+
+    Entries are only valid for the version they were computed against; the
+    first lookup with a different version drops everything. After replace()
+    the old version is retired: lookups for it (a request still finishing on
+    the old rules after a reload) bypass the cache instead of flushing it.
+    Cached results are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self.version: Optional[str] = None
+        self._retired: OrderedDict = OrderedDict()
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def _check_version(self, version: str) -> bool:
+        if version == self.version:
+            return True
+        if version in self._retired:
+            return False
+        if self._data:
+            self.invalidations += 1
+        self._data.clear()
+        self.version = version
+        return True
+
+    def _retire(self) -> None:
+        if self.version is not None:
+            self._retired[self.version] = None
+            while len(self._retired) > 8:
+                self._retired.popitem(last=False)
+
+    def get(self, version: str, key: Hashable):
+        with self._lock:
+            if not self._check_version(version):
+                self.misses += 1
+                return None
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, version: str, key: Hashable, value) -> None:
+        with self._lock:
+            if not self._check_version(version):
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, version: str, key: Hashable, compute: Callable[[], object]):
+        value = self.get(version, key)
+        if value is None:
+            value = compute()
+            self.put(version, key, value)
+        return value
+
+    def recent_keys(self, n: int) -> List[Hashable]:
+        """Up to n most recently used keys, most recent first."""
+        with self._lock:
+            keys = []
+            for key in reversed(self._data):
+                if len(keys) >= n:
+                    break
+                keys.append(key)
+            return keys
+
+    def replace(self, version: str, entries: Iterable[tuple]) -> None:
+        """Switch to a new version pre-filled with (key, value) entries."""
+        with self._lock:
+            self._retire()
+            self._retired.pop(version, None)
+            if self._data:
+                self.invalidations += 1
+            self._data = OrderedDict(reversed(list(entries)))
+            self.version = version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self.version,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            }
+
+def decision_key(user: str, groups: Iterable[str], roles: Iterable[str],
+                 catalog: str, schema: Optional[str], table: Optional[str]) -> tuple:
+    return (user, tuple(sorted(groups)), tuple(sorted(roles)), catalog, schema or None,
+            (table or None) if schema else None)
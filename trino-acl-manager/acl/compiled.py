@@ -0,0 +1,372 @@
+from __future__ import annotations
+import re
+import sys
+from array import array
+from functools import lru_cache
+from heapq import merge
+from typing import Dict, Iterable, List, Optional, Sequence, get_args
+from .models import AccessControlRules, Privilege
+
+LITERAL, PREFIX, REGEX = "literal", "prefix", "regex"
+
+_META = frozenset(".^$*+?{}[]\\|()")
+
+def _is_literal(text: str) -> bool:
+    return not any(c in _META for c in text)
+
+class CompiledPattern:
+    """A rule pattern compiled once; invalid regexes fall back to literal equality.
+
+    kind is LITERAL for plain identifiers, PREFIX for ``<literal>.*`` and
+    REGEX for everything else; the first two never touch the regex engine.
+    """
+    __slots__ = ("pattern", "kind", "prefix", "match")
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.prefix = None
+        if _is_literal(pattern):
+            self.kind = LITERAL
+            self.match = pattern.__eq__
+            return
+        if pattern.endswith(".*") and _is_literal(pattern[:-2]):
+            self.kind = PREFIX
+            prefix = self.prefix = pattern[:-2]
+            n = len(prefix)
+            # "." does not match a newline, keep fullmatch semantics exact
+            self.match = lambda value: value.startswith(prefix) and "\n" not in value[n:]
+            return
+        try:
+            fullmatch = re.compile(pattern).fullmatch
+        except re.error:
+            self.kind = LITERAL
+            self.match = pattern.__eq__
+            return
+        self.kind = REGEX
+        self.match = lambda value: fullmatch(value) is not None
+
+    def __repr__(self) -> str:
+        return f"CompiledPattern({self.pattern!r})"
+
+@lru_cache(maxsize=1 << 16)
+def compile_pattern(pattern: str) -> CompiledPattern:
+    return CompiledPattern(sys.intern(pattern))
+
+def _opt(pattern: Optional[str]) -> Optional[CompiledPattern]:
+    # empty patterns are ignored by match_identity, same as missing ones
+    return compile_pattern(pattern) if pattern else None
+
+PRIVILEGES = frozenset(get_args(Privilege))
+
+# what each tier's first matching rule decides, stored on the compiled record
+_OUTCOMES = {
+    "catalogs": lambda r: sys.intern(r.allow),
+    "schemas": lambda r: r.owner,
+    "tables": lambda r: tuple(sys.intern(p) for p in r.privileges if p in PRIVILEGES),
+    "functions": lambda r: r.execute,
+    "procedures": lambda r: r.execute,
+    "session_properties": lambda r: (r.allow, compile_pattern(r.catalog) if r.catalog is not None else None),
+    "queries": lambda r: r.allow,
+    "system_information": lambda r: r.allow,
+}
+
+class CompiledRule:
+    """Slotted evaluation record for one rule.
+
+    Holds only shared compiled patterns and the rule's outcome; the pydantic
+    rule stays in ``CompiledRuleSet.rules`` at the same position.
+    """
+    __slots__ = ("user", "group", "role", "anyone", "identity_key", "objects", "outcome")
+
+    def __init__(self, source, object_fields: tuple[str, ...], outcome=None, any_if_missing: bool = False,
+                 shared: Optional[dict] = None):
+        shared = {} if shared is None else shared
+        self.user = _opt(getattr(source, "user", None))
+        self.group = _opt(getattr(source, "group", None))
+        self.role = _opt(getattr(source, "role", None))
+        self.anyone = all(getattr(source, f, None) is None for f in ("user", "group", "role"))
+        key = (self.user, self.group, self.role, self.anyone)
+        self.identity_key = shared.setdefault(key, key)
+        values = (getattr(source, f) for f in object_fields)
+        objects = tuple(compile_pattern(".*" if v is None and any_if_missing else v) for v in values)
+        self.objects = shared.setdefault(objects, objects)
+        self.outcome = shared.setdefault(outcome, outcome) if isinstance(outcome, tuple) else outcome
+
+    def identity_matches(self, user: str, groups: list[str], roles: list[str]) -> bool:
+        if self.anyone:
+            return True
+        if self.user is not None and self.user.match(user):
+            return True
+        if self.group is not None and any(self.group.match(g) for g in groups):
+            return True
+        if self.role is not None and any(self.role.match(r) for r in roles):
+            return True
+        return False
+
+    def object_matches(self, *values: str) -> bool:
+        for pat, value in zip(self.objects, values):
+            if not pat.match(value):
+                return False
+        return True
+
+class TierIndex:
+    """Maps an object name to the positions of the rules that could match it.
+
+    Literal and prefix patterns are hashed; only regex rules are always
+    candidates. Positions come back in ascending order, so scanning them
+    keeps first-match-wins semantics.
+    """
+
+    def __init__(self, patterns: Iterable[CompiledPattern]):
+        literal: Dict[str, List[int]] = {}
+        prefix: Dict[str, List[int]] = {}
+        regex: List[int] = []
+        for pos, pat in enumerate(patterns):
+            if pat.kind == LITERAL:
+                literal.setdefault(pat.pattern, []).append(pos)
+            elif pat.kind == PREFIX:
+                prefix.setdefault(pat.prefix, []).append(pos)
+            else:
+                regex.append(pos)
+        # tuples: most names have one rule, and a list over-allocates for it
+        self.literal: Dict[str, tuple] = {k: tuple(v) for k, v in literal.items()}
+        self.prefix: Dict[str, tuple] = {k: tuple(v) for k, v in prefix.items()}
+        self.regex = tuple(regex)
+        self.prefix_lengths = sorted({len(p) for p in self.prefix})
+
+    def candidates(self, value: str) -> Iterable[int]:
+        lists = []
+        hit = self.literal.get(value)
+        if hit:
+            lists.append(hit)
+        for n in self.prefix_lengths:
+            if n > len(value):
+                break
+            hit = self.prefix.get(value[:n])
+            if hit:
+                lists.append(hit)
+        if self.regex:
+            lists.append(self.regex)
+        if not lists:
+            return ()
+        if len(lists) == 1:
+            return lists[0]
+        return merge(*lists)
+
+# budget for memoized per-value masks of one field; a mask costs one bit per rule
+MATCH_MEMO_BYTES = 4 << 20
+
+def _literal_head(pattern: str) -> str:
+    # literal text every match of the regex starts with ("" when unknown)
+    if "|" in pattern:
+        return ""
+    i = 0
+    while i < len(pattern) and pattern[i] not in _META:
+        i += 1
+    head = pattern[:i]
+    return head[:-1] if i < len(pattern) and pattern[i] in "?*{" else head
+
+def _screen(patterns: Iterable[str]):
+    # one alternation over every regex of a field: a value it rejects matches none of them
+    patterns = list(patterns)
+    if not patterns or any(re.search(r"\\[1-9]|\(\?P=|\(\?\(", p) for p in patterns):
+        return None
+    try:
+        return re.compile("|".join(f"(?:{p})" for p in patterns)).fullmatch
+    except re.error:
+        return None
+
+class FieldMatcher:
+    """All rules whose pattern for one object field matches a value, as a bitmask.
+
+    Literal patterns are hashed, ``<literal>.*`` patterns looked up by prefix
+    length and regexes bucketed by their literal head behind a single
+    alternation that rejects non-matching values in one pass. Masks are
+    memoized per value. The position tables come from a TierIndex over the
+    same patterns, shared with it when one is passed.
+    """
+
+    def __init__(self, patterns: Sequence[CompiledPattern], index: Optional[TierIndex] = None):
+        self.size = len(patterns)
+        index = TierIndex(patterns) if index is None else index
+        self.literal = index.literal
+        self.anything = self._mask(index.prefix.get("", ()))  # ".*": any value without a newline
+        self.prefix = {p: hit for p, hit in index.prefix.items() if p}
+        regex: Dict[str, List[int]] = {}
+        for pos in index.regex:
+            regex.setdefault(patterns[pos].pattern, []).append(pos)
+        self.prefix_lengths = sorted({len(p) for p in self.prefix})
+        self.regex: Dict[str, list] = {}
+        for pattern, positions in regex.items():
+            self.regex.setdefault(_literal_head(pattern), []).append((compile_pattern(pattern), positions))
+        self.head_lengths = sorted({len(h) for h in self.regex})
+        self.screen = _screen(regex)
+        self.mask = lru_cache(maxsize=max(64, MATCH_MEMO_BYTES // (self.size // 8 + 1)))(self._match)
+
+    def _mask(self, positions: Iterable[int]) -> int:
+        bits = bytearray(self.size // 8 + 1)
+        for pos in positions:
+            bits[pos >> 3] |= 1 << (pos & 7)
+        return int.from_bytes(bits, "little")
+
+    def _match(self, value: str) -> int:
+        positions = list(self.literal.get(value, ()))
+        for n in self.prefix_lengths:
+            if n > len(value):
+                break
+            hit = self.prefix.get(value[:n])
+            if hit and "\n" not in value[n:]:
+                positions.extend(hit)
+        if self.regex and (self.screen is None or self.screen(value) is not None):
+            for n in self.head_lengths:
+                if n > len(value):
+                    break
+                for pat, hit in self.regex.get(value[:n], ()):
+                    if pat.match(value):
+                        positions.extend(hit)
+        mask = self._mask(positions) if positions else 0
+        return mask | self.anything if "\n" not in value else mask
+
+class TierMatcher:
+    """Object-pattern automaton of one tier: ``match`` narrows an applicability mask
+    to the rules whose every object pattern matches, in one lookup per field."""
+
+    def __init__(self, rules: Sequence["CompiledRule"], n_fields: int, indexes: Optional[Dict[int, TierIndex]] = None):
+        indexes = indexes or {}
+        self.fields = [FieldMatcher([r.objects[i] for r in rules], indexes.get(i)) for i in range(n_fields)]
+
+    def match(self, applicable: int, values: tuple) -> int:
+        mask = applicable
+        # the last field (table, schema, ...) is the most selective one
+        for matcher, value in zip(reversed(self.fields), reversed(values)):
+            if not mask:
+                break
+            mask &= matcher.mask(value)
+        return mask
+
+    def first(self, applicable: int, values: tuple) -> Optional[int]:
+        """Position of the first rule that applies and matches, or None."""
+        mask = self.match(applicable, values)
+        return (mask & -mask).bit_length() - 1 if mask else None
+
+# rule kinds with user/group/role identity patterns, in PrincipalView order
+IDENTITY_TIERS = ("catalogs", "schemas", "tables", "functions", "procedures",
+                  "session_properties", "queries", "system_information")
+
+class PrincipalView:
+    """Per-tier bitmasks of the rules whose identity part matches one principal.
+
+    Bit ``i`` of ``tables`` is set when rule ``i`` of ``rules.tables`` applies
+    to the principal; evaluators only have to check object patterns.
+    ``bits[tier]`` holds the same mask as little-endian bytes, so testing one
+    position is O(1) instead of shifting a many-thousand-bit integer.
+    """
+    __slots__ = IDENTITY_TIERS + ("bits",)
+
+    def __init__(self, bits: Iterable[bytearray]):
+        self.bits = {}
+        for tier, b in zip(IDENTITY_TIERS, bits):
+            self.bits[tier] = bytes(b)
+            setattr(self, tier, int.from_bytes(b, "little"))
+
+def _identity_positions(tiers: tuple) -> Dict[tuple, list]:
+    # rules sharing the same user/group/role patterns are matched once per principal;
+    # positions rather than masks: a sparse mask over many rules costs a bit per rule
+    found: Dict[tuple, list] = {}
+    for t, tier in enumerate(tiers):
+        for pos, rule in enumerate(tier):
+            entry = found.get(rule.identity_key)
+            if entry is None:
+                entry = found[rule.identity_key] = [rule] + [()] * len(tiers)
+            if not entry[t + 1]:
+                entry[t + 1] = array("I")
+            entry[t + 1].append(pos)
+    return found
+
+class CompiledImpersonation:
+    """Impersonation rule; ``user`` may refer to principal groups as ``$1``."""
+    __slots__ = ("principal", "target", "templated", "user", "allow")
+
+    def __init__(self, source):
+        self.user = source.user
+        self.allow = source.allow
+        try:
+            self.principal = re.compile(source.principal)
+        except re.error:
+            self.principal = re.compile(re.escape(source.principal))
+        self.templated = re.search(r"\$\d", source.user) is not None
+        self.target = compile_pattern(source.user)
+
+    def target_pattern(self, match: "re.Match") -> CompiledPattern:
+        if not self.templated:
+            return self.target
+        groups = (match.group(0),) + match.groups()
+        pattern = re.sub(r"\$(\d)", lambda m: (groups[int(m.group(1))] or "") if int(m.group(1)) < len(groups)
+                         else m.group(0), self.user)
+        return compile_pattern(pattern)
+
+class CompiledRuleSet:
+    """Evaluation form of AccessControlRules; build once per rules version and reuse."""
+
+    def __init__(self, rules: AccessControlRules, version: Optional[str] = None):
+        self.rules = rules
+        shared: dict = {}
+
+        def compile_tier(tier: str, fields: tuple, any_if_missing: bool = False) -> List[CompiledRule]:
+            outcome = _OUTCOMES[tier]
+            return [CompiledRule(r, fields, outcome(r), any_if_missing, shared) for r in getattr(rules, tier)]
+
+        self.catalogs = compile_tier("catalogs", ("catalog",))
+        self.schemas = compile_tier("schemas", ("catalog", "schema"))
+        self.tables = compile_tier("tables", ("catalog", "schema", "table"))
+        self.functions = compile_tier("functions", ("catalog", "function"))
+        self.procedures = compile_tier("procedures", ("catalog", "procedure"))
+        # the optional catalog of a session property rule is part of its outcome
+        self.session_properties = compile_tier("session_properties", ("property",))
+        self.queries = compile_tier("queries", ("query",), any_if_missing=True)
+        self.system_information = compile_tier("system_information", ())
+        self.impersonation: List[CompiledImpersonation] = [CompiledImpersonation(r) for r in rules.impersonation]
+        # candidate indexes (analysis, reverse lookup) on the most specific object pattern
+        self.catalog_index = TierIndex(r.objects[0] for r in self.catalogs)
+        self.schema_index = TierIndex(r.objects[1] for r in self.schemas)
+        self.table_index = TierIndex(r.objects[2] for r in self.tables)
+        self.impersonation_index = TierIndex(r.target for r in self.impersonation)
+        # object-pattern automata the evaluators take first matches from; they share the indexes' tables
+        self.catalog_matcher = TierMatcher(self.catalogs, 1, {0: self.catalog_index})
+        self.schema_matcher = TierMatcher(self.schemas, 2, {1: self.schema_index})
+        self.table_matcher = TierMatcher(self.tables, 3, {2: self.table_index})
+        self.function_matcher = TierMatcher(self.functions, 2)
+        self.procedure_matcher = TierMatcher(self.procedures, 2)
+        self.session_property_matcher = TierMatcher(self.session_properties, 1)
+        self.query_matcher = TierMatcher(self.queries, 1)
+        self._identity = list(_identity_positions(tuple(getattr(self, t) for t in IDENTITY_TIERS)).values())
+        self._views = lru_cache(maxsize=4096)(self._build_view)
+        self._version = version
+
+    @property
+    def version(self) -> str:
+        """Content hash of the rules this set was compiled from."""
+        if self._version is None:
+            from .parser import rules_fingerprint
+            self._version = rules_fingerprint(self.rules)
+        return self._version
+
+    def principal_view(self, user: str, groups: Iterable[str] = (), roles: Iterable[str] = ()) -> PrincipalView:
+        """Applicable rules for a principal, memoized on (user, set of groups, set of roles)."""
+        return self._views(user, frozenset(groups), frozenset(roles))
+
+    def _build_view(self, user: str, groups: frozenset, roles: frozenset) -> PrincipalView:
+        bits = [bytearray(len(getattr(self, t)) // 8 + 1) for t in IDENTITY_TIERS]
+        for rule, *positions in self._identity:
+            if rule.identity_matches(user, groups, roles):
+                for b, tier_positions in zip(bits, positions):
+                    for pos in tier_positions:
+                        b[pos >> 3] |= 1 << (pos & 7)
+        return PrincipalView(bits)
+
+    @classmethod
+    def from_rules(cls, rules: AccessControlRules) -> "CompiledRuleSet":
+        return cls(rules)
+
+def ensure_compiled(rules) -> CompiledRuleSet:
+    return rules if isinstance(rules, CompiledRuleSet) else CompiledRuleSet(rules)
@@ -0,0 +1,90 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Sequence
+from pydantic import ValidationError
+from .evaluator import PRIVS
+from .models import AccessControlRules
+from .parser import RULE_MODELS
+from .redos import PATTERN_FIELDS, check_pattern
+
+# grid columns per editable tier; table privileges are one checkbox column each
+GRID_TIERS = {
+    "catalogs": ("catalog", "allow", "user", "group", "role"),
+    "schemas": ("catalog", "schema", "owner", "user", "group", "role"),
+    "tables": ("catalog", "schema", "table", "user", "group", "role") + tuple(PRIVS),
+}
+IDENTITY_FIELDS = ("user", "group", "role")
+OBJECT_FIELDS = {"catalogs": ("catalog",), "schemas": ("catalog", "schema"), "tables": ("catalog", "schema", "table")}
+
+def rule_row(tier: str, pos: int, rule) -> Dict[str, Any]:
+    row: Dict[str, Any] = {"#": pos}
+    for col in GRID_TIERS[tier]:
+        row[col] = col in rule.privileges if col in PRIVS else getattr(rule, col)
+    return row
+
+def search_positions(rules: AccessControlRules, tier: str, pattern: str = "", identity: str = "",
+                     privilege: Optional[str] = None) -> List[int]:
+    """Positions of rules whose object patterns / identity contain the search text (case-insensitive)."""
+    pattern, identity = pattern.lower(), identity.lower()
+    found = []
+    for pos, rule in enumerate(getattr(rules, tier)):
+        if pattern and not any(pattern in getattr(rule, f).lower() for f in OBJECT_FIELDS[tier]):
+            continue
+        if identity and not any(identity in (getattr(rule, f) or "").lower() for f in IDENTITY_FIELDS):
+            continue
+        if privilege and tier == "tables" and privilege not in rule.privileges:
+            continue
+        found.append(pos)
+    return found
+
+def _values(tier: str, row: Dict[str, Any]) -> Dict[str, Any]:
+    values = {}
+    for col in GRID_TIERS[tier]:
+        if col in PRIVS or col not in row:
+            continue
+        value = row[col]
+        if value != value:  # NaN from an empty grid cell
+            value = None
+        # a cleared identity cell removes the pattern, as in the old form editor
+        values[col] = (value or None) if col in IDENTITY_FIELDS else value
+    if tier == "tables":
+        values["privileges"] = [p for p in PRIVS if row.get(p)]
+    return values
+
+def _validated(tier: str, values: Dict[str, Any], where: str, bounded: bool = False):
+    try:
+        rule = RULE_MODELS[tier](**{k: v for k, v in values.items() if v is not None})
+    except ValidationError as e:
+        err = e.errors()[0]
+        raise ValueError(f"{tier} {where}: {'.'.join(str(x) for x in err['loc'])}: {err['msg']}") from None
+    if bounded:
+        for field in PATTERN_FIELDS:
+            value = getattr(rule, field, None)
+            if isinstance(value, str) and value:  # BaseModel.schema is a method on rules without a schema
+                try:
+                    check_pattern(value)
+                except ValueError as e:
+                    raise ValueError(f"{tier} {where}: {field}: {e}") from None
+    return rule
+
+def apply_grid_edits(rules: AccessControlRules, tier: str, positions: Sequence[int], edits: Dict[str, Any],
+                     bounded: bool = False) -> int:
+    """Apply one ``st.data_editor`` edit state to a tier and return the number of changes.
+
+    ``positions`` maps grid rows to rule positions. Edited rules are replaced
+    by new rule objects, added rows are inserted after the last shown rule and
+    deleted rows are removed; nothing changes if any row fails validation.
+    With ``bounded`` edited and added patterns must pass redos.check_pattern.
+    """
+    current = getattr(rules, tier)
+    updated = list(current)
+    for row, changes in (edits.get("edited_rows") or {}).items():
+        pos = positions[int(row)]
+        values = _values(tier, {**rule_row(tier, pos, current[pos]), **changes})
+        updated[pos] = _validated(tier, values, f"rule {pos}", bounded)
+    added = [_validated(tier, _values(tier, row), "new rule", bounded) for row in edits.get("added_rows") or []]
+    deleted = {positions[int(row)] for row in edits.get("deleted_rows") or []}
+    insert_at = positions[-1] + 1 if positions else len(current)
+    result = [r for pos, r in enumerate(updated[:insert_at]) if pos not in deleted] + added + \
+             [r for pos, r in enumerate(updated[insert_at:], insert_at) if pos not in deleted]
+    setattr(rules, tier, result)
+    return len(edits.get("edited_rows") or {}) + len(added) + len(deleted)
@@ -1,57 +1,333 @@
 from __future__ import annotations
-from typing import Dict, Optional
+import time
+from typing import Dict, Optional, Union
 from .models import AccessControlRules
-from .parser import match_identity
-import re
+from .compiled import CompiledRuleSet, ensure_compiled
+from .cache import DecisionCache, decision_key
+from .trace import HitCounter, explain_tier
 
 PRIVS = ["SELECT","INSERT","DELETE","UPDATE","OWNERSHIP","GRANT_SELECT","CREATE_VIEW"]
 
-def _match(pat: str, value: str) -> bool:
-    try:
-        return re.fullmatch(pat, value) is not None
-    except re.error:
-        return pat == value
-
-def eval_catalog(rules: AccessControlRules, user: str, groups: list[str], roles: list[str], catalog: str) -> Dict:
-    for rule in rules.catalogs:
-        if not match_identity(rule, user, groups, roles): 
-            continue
-        if _match(rule.catalog, catalog):
-            allow = rule.allow
-            return {
-                "matched_rule": rule,
-                "allow": allow,
-                "allowed_privileges": (PRIVS if allow=="all" else (["SELECT","CREATE_VIEW"] if allow=="read-only" else []))
-            }
+Rules = Union[AccessControlRules, CompiledRuleSet]
+
+def _catalog_result(compiled: CompiledRuleSet, pos: Optional[int]) -> Dict:
+    if pos is not None:
+        allow = compiled.catalogs[pos].outcome
+        return {
+            "matched_rule": compiled.rules.catalogs[pos],
+            "allow": allow,
+            "allowed_privileges": (PRIVS if allow=="all" else (["SELECT","CREATE_VIEW"] if allow=="read-only" else []))
+        }
     return {"matched_rule": None, "allow": "none", "allowed_privileges": []}
 
-def eval_schema(rules: AccessControlRules, user: str, groups: list[str], roles: list[str], catalog: str, schema: str) -> Dict:
-    for rule in rules.schemas:
-        if not match_identity(rule, user, groups, roles):
-            continue
-        if _match(rule.catalog, catalog) and _match(rule.schema, schema):
-            return {"matched_rule": rule, "owner": rule.owner}
+def _schema_result(compiled: CompiledRuleSet, pos: Optional[int]) -> Dict:
+    if pos is not None:
+        return {"matched_rule": compiled.rules.schemas[pos], "owner": compiled.schemas[pos].outcome}
     return {"matched_rule": None, "owner": False}
 
-def eval_table(rules: AccessControlRules, user: str, groups: list[str], roles: list[str], catalog: str, schema: str, table: str) -> Dict:
-    for rule in rules.tables:
-        if not match_identity(rule, user, groups, roles):
-            continue
-        if _match(rule.catalog, catalog) and _match(rule.schema, schema) and _match(rule.table, table):
-            allowed = [p for p in rule.privileges if p in PRIVS]
-            return {"matched_rule": rule, "privileges": allowed}
+def _table_result(compiled: CompiledRuleSet, pos: Optional[int]) -> Dict:
+    if pos is not None:
+        return {"matched_rule": compiled.rules.tables[pos], "privileges": list(compiled.tables[pos].outcome)}
     return {"matched_rule": None, "privileges": []}
 
-def effective_access(rules: AccessControlRules, user: str, groups: list[str], roles: list[str],
-                     catalog: str, schema: Optional[str]=None, table: Optional[str]=None) -> Dict:
+def eval_catalog(rules: Rules, user: str, groups: list[str], roles: list[str], catalog: str) -> Dict:
+    compiled = ensure_compiled(rules)
+    return _catalog_result(compiled, compiled.catalog_matcher.first(
+        compiled.principal_view(user, groups, roles).catalogs, (catalog,)))
+
+def eval_schema(rules: Rules, user: str, groups: list[str], roles: list[str], catalog: str, schema: str) -> Dict:
+    compiled = ensure_compiled(rules)
+    return _schema_result(compiled, compiled.schema_matcher.first(
+        compiled.principal_view(user, groups, roles).schemas, (catalog, schema)))
+
+def eval_table(rules: Rules, user: str, groups: list[str], roles: list[str], catalog: str, schema: str, table: str) -> Dict:
+    compiled = ensure_compiled(rules)
+    return _table_result(compiled, compiled.table_matcher.first(
+        compiled.principal_view(user, groups, roles).tables, (catalog, schema, table)))
+
+def effective_access(rules: Rules, user: str, groups: list[str], roles: list[str],
+                     catalog: str, schema: Optional[str]=None, table: Optional[str]=None,
+                     cache: Optional[DecisionCache]=None, explain: bool=False, group_provider=None) -> Dict:
+    """Catalog, schema and table decisions for one principal and object.
+
+    ``group_provider`` (e.g. acl.groups.FileGroupProvider) adds the user's
+    groups from a membership file to ``groups``.
+
+    With ``explain`` the result also has an ``explain`` entry: per tier the
+    evaluator's elapsed time, the matched position and a rule-by-rule trace
+    of the skipped rules (see trace.explain_tier). Explained results bypass
+    the cache.
+    """
+    compiled = ensure_compiled(rules)
+    if group_provider is not None:
+        groups = _member_groups(user, groups, group_provider)
+    if explain:
+        return _explain_access(compiled, user, groups, roles, catalog, schema, table)
+    if cache is not None:
+        return cache.get_or_compute(compiled.version, decision_key(user, groups, roles, catalog, schema, table),
+                                    lambda: _effective_access(compiled, user, groups, roles, catalog, schema, table))
+    return _effective_access(compiled, user, groups, roles, catalog, schema, table)
+
+def _effective_access(compiled: CompiledRuleSet, user: str, groups: list[str], roles: list[str],
+                      catalog: str, schema: Optional[str], table: Optional[str]) -> Dict:
     result = {}
-    cat = eval_catalog(rules, user, groups, roles, catalog)
+    cat = eval_catalog(compiled, user, groups, roles, catalog)
     result["catalog"] = cat
     if schema:
-        sch = eval_schema(rules, user, groups, roles, catalog, schema)
+        sch = eval_schema(compiled, user, groups, roles, catalog, schema)
         result["schema"] = sch
     if schema and table:
-        tbl = eval_table(rules, user, groups, roles, catalog, schema, table)
+        tbl = eval_table(compiled, user, groups, roles, catalog, schema, table)
         result["table"] = tbl
     result["visible"] = (cat["allow"] != "none")
     return result
+
+def _member_groups(user: str, groups, group_provider):
+    found = group_provider.groups_for(user)
+    # the provider's frozenset as is keeps principal_view's memo key cheap
+    return found.union(groups) if groups else found
+
+def _explain_access(compiled: CompiledRuleSet, user: str, groups: list[str], roles: list[str],
+                    catalog: str, schema: Optional[str], table: Optional[str]) -> Dict:
+    # one evaluation pass, timed stage by stage; traces are replayed after the clock stops
+    started = time.perf_counter()
+    view = compiled.principal_view(user, groups, roles)
+    tiers = {}
+    explain = {"identity_seconds": time.perf_counter() - started, "tiers": tiers}
+    result = {}
+    for tier, key, matcher, build, values in (
+            ("catalogs", "catalog", compiled.catalog_matcher, _catalog_result, (catalog,)),
+            ("schemas", "schema", compiled.schema_matcher, _schema_result, (catalog, schema)),
+            ("tables", "table", compiled.table_matcher, _table_result, (catalog, schema, table))):
+        if not all(values):
+            break
+        started = time.perf_counter()
+        pos = matcher.first(getattr(view, tier), values)
+        tiers[tier] = {"seconds": time.perf_counter() - started}
+        result[key] = build(compiled, pos)
+    for tier, values in (("catalogs", (catalog,)), ("schemas", (catalog, schema)), ("tables", (catalog, schema, table))):
+        if tier in tiers:
+            tiers[tier].update(explain_tier(compiled, tier, user, groups, roles, values))
+    result["visible"] = (result["catalog"]["allow"] != "none")
+    result["explain"] = explain
+    return result
+
+def has_privilege(access: Dict, privilege: str) -> bool:
+    """Whether an effective_access result grants a table privilege.
+
+    The catalog rule has to allow the privilege; owning the schema grants
+    every table privilege, otherwise the table rule has to list it.
+    """
+    if privilege not in access["catalog"]["allowed_privileges"]:
+        return False
+    return access.get("schema", {}).get("owner", False) or privilege in access.get("table", {}).get("privileges", [])
+
+BATCH_COLUMNS = ["user","groups","roles","catalog","schema","table",
+                 "visible","catalog_allow","schema_owner","privileges",
+                 "catalog_rule","schema_rule","table_rule"]
+
+def _split(value) -> tuple:
+    if value is None or value != value:  # None or NaN from a CSV cell
+        return ()
+    if isinstance(value, str):
+        return tuple(v.strip() for v in value.split(",") if v.strip())
+    return tuple(value)
+
+def _opt_name(value) -> Optional[str]:
+    if value is None or value != value or value == "":
+        return None
+    return str(value)
+
+def _principal(row, group_provider=None) -> tuple:
+    user, groups = str(row["user"]), _split(row.get("groups"))
+    if group_provider is not None:
+        member_of = group_provider.groups_for(user)
+        if member_of:
+            groups = tuple(sorted(member_of.union(groups)))
+    return user, groups, _split(row.get("roles"))
+
+def effective_access_many(rules: Rules, checks, hits: Optional[HitCounter] = None, group_provider=None):
+    """Evaluate many (principal, object) checks in one call.
+
+    checks is an iterable of mappings or a pandas DataFrame with columns
+    user, groups, roles, catalog, schema, table (groups/roles as lists or
+    comma separated strings). Returns a dict of equal-length columns, or a
+    DataFrame when a DataFrame was passed. Identity matching is done once
+    per principal (CompiledRuleSet.principal_view) and duplicate checks are
+    decided once. ``hits`` accumulates the matched rules across calls;
+    ``group_provider`` adds each user's groups from a membership file.
+    """
+    compiled = ensure_compiled(rules)
+    is_frame = hasattr(checks, "to_dict") and hasattr(checks, "columns")
+    rows = checks.to_dict("records") if is_frame else checks
+    out: Dict[str, list] = {c: [] for c in BATCH_COLUMNS}
+    decided: Dict[tuple, tuple] = {}
+    for row in rows:
+        principal = _principal(row, group_provider)
+        catalog = str(row["catalog"])
+        schema = _opt_name(row.get("schema"))
+        table = _opt_name(row.get("table")) if schema else None
+        key = (principal, catalog, schema, table)
+        decision = decided.get(key)
+        if decision is None:
+            view = compiled.principal_view(*principal)
+            cat_pos = compiled.catalog_matcher.first(view.catalogs, (catalog,))
+            allow = compiled.catalogs[cat_pos].outcome if cat_pos is not None else "none"
+            sch_pos = owner = None
+            if schema:
+                sch_pos = compiled.schema_matcher.first(view.schemas, (catalog, schema))
+                owner = compiled.schemas[sch_pos].outcome if sch_pos is not None else False
+            tbl_pos = privileges = None
+            if table:
+                tbl_pos = compiled.table_matcher.first(view.tables, (catalog, schema, table))
+                privileges = list(compiled.tables[tbl_pos].outcome) if tbl_pos is not None else []
+            decision = decided[key] = (allow != "none", allow, owner, privileges, cat_pos, sch_pos, tbl_pos)
+        for col, value in zip(BATCH_COLUMNS, (principal[0], list(principal[1]), list(principal[2]),
+                                              catalog, schema, table) + decision):
+            out[col].append(value)
+    if hits is not None:
+        hits.record_batch(compiled, out)
+    if is_frame:
+        import pandas as pd
+        return pd.DataFrame(out, columns=BATCH_COLUMNS)
+    return out
+
+# Functions, procedures, session properties and queries are unrestricted when
+# their section has no rules at all; otherwise the first matching rule decides
+# and anything unmatched is denied. System information and impersonation are
+# denied without a matching rule (a user may always impersonate themselves).
+
+def _lowest_bit(mask: int) -> Optional[int]:
+    return (mask & -mask).bit_length() - 1 if mask else None
+
+def _decide_function(compiled: CompiledRuleSet, view, catalog: str, function: str) -> tuple:
+    if not compiled.functions:
+        return None, True
+    pos = compiled.function_matcher.first(view.functions, (catalog, function))
+    return pos, (compiled.functions[pos].outcome if pos is not None else False)
+
+def _decide_procedure(compiled: CompiledRuleSet, view, catalog: str, procedure: str) -> tuple:
+    if not compiled.procedures:
+        return None, True
+    pos = compiled.procedure_matcher.first(view.procedures, (catalog, procedure))
+    return pos, (compiled.procedures[pos].outcome if pos is not None else False)
+
+def _decide_session_property(compiled: CompiledRuleSet, view, prop: str, catalog: Optional[str]) -> tuple:
+    if not compiled.session_properties:
+        return None, True
+    tier = compiled.session_properties
+    mask = compiled.session_property_matcher.match(view.session_properties, (prop,))
+    while mask:
+        pos = _lowest_bit(mask)
+        mask &= mask - 1
+        # rules without a catalog cover system properties, the others catalog properties
+        allow, rule_catalog = tier[pos].outcome
+        if rule_catalog is None:
+            if catalog is None:
+                return pos, allow
+        elif catalog is not None and rule_catalog.match(catalog):
+            return pos, allow
+    return None, False
+
+def _decide_query(compiled: CompiledRuleSet, view, owner: str) -> tuple:
+    if not compiled.queries:
+        return None, True
+    pos = compiled.query_matcher.first(view.queries, (owner,))
+    return pos, (compiled.queries[pos].outcome if pos is not None else False)
+
+def _decide_system_information(compiled: CompiledRuleSet, view) -> tuple:
+    pos = _lowest_bit(view.system_information)
+    return pos, (compiled.system_information[pos].outcome if pos is not None else False)
+
+def _decide_impersonation(compiled: CompiledRuleSet, principal: str, target: str) -> tuple:
+    for pos in compiled.impersonation_index.candidates(target):
+        rule = compiled.impersonation[pos]
+        m = rule.principal.fullmatch(principal)
+        if m is not None and rule.target_pattern(m).match(target):
+            return pos, rule.allow
+    return None, principal == target
+
+def _rule_result(tier, pos: Optional[int], allow: bool) -> Dict:
+    # tier is the pydantic rule list, so matched_rule is the editable rule
+    return {"matched_rule": tier[pos] if pos is not None else None, "allow": allow}
+
+def eval_function(rules: Rules, user: str, groups: list[str], roles: list[str], catalog: str, function: str) -> Dict:
+    compiled = ensure_compiled(rules)
+    view = compiled.principal_view(user, groups, roles)
+    return _rule_result(compiled.rules.functions, *_decide_function(compiled, view, catalog, function))
+
+def eval_procedure(rules: Rules, user: str, groups: list[str], roles: list[str], catalog: str, procedure: str) -> Dict:
+    compiled = ensure_compiled(rules)
+    view = compiled.principal_view(user, groups, roles)
+    return _rule_result(compiled.rules.procedures, *_decide_procedure(compiled, view, catalog, procedure))
+
+def eval_session_property(rules: Rules, user: str, groups: list[str], roles: list[str], property: str,
+                          catalog: Optional[str]=None) -> Dict:
+    compiled = ensure_compiled(rules)
+    view = compiled.principal_view(user, groups, roles)
+    return _rule_result(compiled.rules.session_properties, *_decide_session_property(compiled, view, property, catalog))
+
+def eval_query(rules: Rules, user: str, groups: list[str], roles: list[str], query_owner: Optional[str]=None) -> Dict:
+    """Access to queries owned by query_owner (the user's own queries by default)."""
+    compiled = ensure_compiled(rules)
+    view = compiled.principal_view(user, groups, roles)
+    return _rule_result(compiled.rules.queries, *_decide_query(compiled, view, query_owner or user))
+
+def eval_system_information(rules: Rules, user: str, groups: list[str], roles: list[str]) -> Dict:
+    compiled = ensure_compiled(rules)
+    view = compiled.principal_view(user, groups, roles)
+    return _rule_result(compiled.rules.system_information, *_decide_system_information(compiled, view))
+
+def eval_impersonation(rules: Rules, principal: str, user: str) -> Dict:
+    """Whether ``principal`` may impersonate ``user``; ``$1`` in a rule's user pattern is
+    replaced by the first group of its principal pattern, as in Trino."""
+    compiled = ensure_compiled(rules)
+    return _rule_result(compiled.rules.impersonation, *_decide_impersonation(compiled, principal, user))
+
+# kind -> (decision function, object columns, takes a principal view)
+RULE_KINDS = {
+    "function": (_decide_function, ("catalog", "function"), True),
+    "procedure": (_decide_procedure, ("catalog", "procedure"), True),
+    "session_property": (_decide_session_property, ("property", "catalog"), True),
+    "query": (_decide_query, ("query_owner",), True),
+    "system_information": (_decide_system_information, (), True),
+    "impersonation": (_decide_impersonation, ("principal", "user"), False),
+}
+
+def evaluate_many(rules: Rules, kind: str, checks, group_provider=None):
+    """Batch evaluation for the non-table rule kinds in RULE_KINDS.
+
+    Checks carry user, groups, roles plus the kind's object columns
+    (impersonation checks carry only principal and user). Returns a dict of
+    columns with ``allow`` and the matched ``rule`` position, or a DataFrame
+    when a DataFrame was passed. ``group_provider`` is as in effective_access_many.
+    """
+    decide, columns, uses_view = RULE_KINDS[kind]
+    compiled = ensure_compiled(rules)
+    is_frame = hasattr(checks, "to_dict") and hasattr(checks, "columns")
+    rows = checks.to_dict("records") if is_frame else checks
+    identity = ("user", "groups", "roles") if uses_view else ()
+    out: Dict[str, list] = {c: [] for c in identity + columns + ("allow", "rule")}
+    decided: Dict[tuple, tuple] = {}
+    for row in rows:
+        objects = tuple(_opt_name(row.get(c)) for c in columns)
+        if kind == "query" and objects[0] is None:
+            objects = (str(row["user"]),)
+        if uses_view:
+            principal = _principal(row, group_provider)
+            key = (principal,) + objects
+            result = decided.get(key)
+            if result is None:
+                result = decided[key] = decide(compiled, compiled.principal_view(*principal), *objects)
+            values = (principal[0], list(principal[1]), list(principal[2])) + objects + result[::-1]
+        else:
+            result = decided.get(objects)
+            if result is None:
+                result = decided[objects] = decide(compiled, *objects)
+            values = objects + result[::-1]
+        for col, value in zip(out, values):
+            out[col].append(value)
+    if is_frame:
+        import pandas as pd
+        return pd.DataFrame(out)
+    return out
@@ -0,0 +1,206 @@
+from __future__ import annotations
+import base64
+import csv
+import os
+import sys
+import threading
+import time
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+FORMATS = ("trino", "csv", "ldif")
+EMPTY: FrozenSet[str] = frozenset()
+
+Membership = Tuple[str, str]  # (user, group)
+
+def detect_format(name: str) -> str:
+    """Format by file extension: .ldif, .csv, otherwise Trino's group file (``group:user1,user2``)."""
+    ext = os.path.splitext(name)[1].lower()
+    return "ldif" if ext == ".ldif" else "csv" if ext == ".csv" else "trino"
+
+def _rdn_value(dn: str) -> str:
+    # uid=alice,ou=people,dc=example -> alice
+    first = dn.split(",", 1)[0]
+    return first.split("=", 1)[1].strip() if "=" in first else first.strip()
+
+def _trino_record(line: str) -> List[Membership]:
+    group, _, users = line.partition(":")
+    group = group.strip()
+    return [(u.strip(), group) for u in users.split(",") if u.strip()] if group else []
+
+def _csv_record(line: str, columns: List[str]) -> List[Membership]:
+    row = dict(zip(columns, next(csv.reader([line]), [])))
+    user = (row.get("user") or "").strip()
+    groups = row.get("groups") if "groups" in row else row.get("group")
+    return [(user, g.strip()) for g in (groups or "").split(",") if g.strip()] if user else []
+
+def _ldif_record(block: str) -> List[Membership]:
+    attrs: Dict[str, List[str]] = {}
+    for line in block.replace("\n ", "").splitlines():  # unfold continuation lines
+        if not line or line.startswith("#") or ":" not in line:
+            continue
+        name, _, value = line.partition(":")
+        if value.startswith(":"):
+            value = base64.b64decode(value[1:].strip()).decode("utf-8", "replace")
+        attrs.setdefault(name.strip().lower(), []).append(value.strip())
+    out = []
+    # group entries list their members, user entries their groups
+    members = attrs.get("memberuid", []) + [_rdn_value(dn) for dn in attrs.get("member", []) + attrs.get("uniquemember", [])]
+    if members:
+        group = (attrs.get("cn") or [_rdn_value((attrs.get("dn") or [""])[0])])[0]
+        out.extend((m, group) for m in members if m)
+    user = (attrs.get("uid") or [None])[0]
+    if user:
+        out.extend((user, _rdn_value(dn)) for dn in attrs.get("memberof", []))
+    return out
+
+class GroupIndex:
+    """User -> groups and group -> users maps over a membership file.
+
+    The file is split into records (lines, or LDIF entries); ``update``
+    only parses records that are new since the previous text and retracts
+    the ones that disappeared, so a reload costs the size of the change.
+    Lookups are served from the index and return shared frozensets, which
+    is also what CompiledRuleSet.principal_view memoizes on.
+    """
+
+    def __init__(self, fmt: str = "trino"):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown group file format {fmt!r}; expected one of {', '.join(FORMATS)}")
+        self.fmt = fmt
+        self.user_groups: Dict[str, FrozenSet[str]] = {}
+        self.group_users: Dict[str, FrozenSet[str]] = {}
+        self.version = 0
+        self._header: Optional[str] = None
+        self._records: Dict[str, Tuple[Membership, ...]] = {}
+        self._declared: Dict[Membership, int] = {}  # records declaring each membership
+        self._lock = threading.Lock()
+
+    def _split(self, text: str) -> Tuple[Optional[str], List[str]]:
+        text = text.replace("\r\n", "\n")
+        if self.fmt == "ldif":
+            blocks = [b.strip("\n") for b in text.split("\n\n")]
+            return None, [b for b in blocks if b and not b.lower().startswith("version:")]
+        lines = [line.strip() for line in text.split("\n")]
+        lines = [line for line in lines if line and not line.startswith("#")]
+        if self.fmt == "csv":
+            return (lines[0].lower(), lines[1:]) if lines else (None, [])
+        return None, lines
+
+    def _parse(self, record: str) -> Tuple[Membership, ...]:
+        if self.fmt == "ldif":
+            pairs = _ldif_record(record)
+        elif self.fmt == "csv":
+            pairs = _csv_record(record, [c.strip() for c in next(csv.reader([self._header or ""]), [])])
+        else:
+            pairs = _trino_record(record)
+        return tuple((sys.intern(u), sys.intern(g)) for u, g in pairs)
+
+    def update(self, text: str) -> Set[str]:
+        """Bring the index to a new version of the file; returns the users whose groups changed."""
+        header, records = self._split(text)
+        with self._lock:
+            current = dict.fromkeys(records)
+            # new CSV columns change what every row means: retract all rows and parse them again
+            removed = list(self._records) if header != self._header else [r for r in self._records if r not in current]
+            self._header = header
+            touched: List[Membership] = []
+            for record in removed:
+                for pair in self._records.pop(record):
+                    n = self._declared[pair] - 1
+                    if n:
+                        self._declared[pair] = n
+                    else:
+                        del self._declared[pair]
+                        touched.append(pair)
+            for record in current:
+                if record in self._records:
+                    continue
+                pairs = self._records[record] = self._parse(record)
+                for pair in pairs:
+                    n = self._declared.get(pair, 0)
+                    self._declared[pair] = n + 1
+                    if not n:
+                        touched.append(pair)
+            changed = self._apply(touched)
+            if changed:
+                self.version += 1
+            return changed
+
+    def _apply(self, touched: Iterable[Membership]) -> Set[str]:
+        users: Dict[str, Set[str]] = {}
+        groups: Dict[str, Set[str]] = {}
+        for user, group in touched:
+            of_user = users.get(user)
+            if of_user is None:
+                of_user = users[user] = set(self.user_groups.get(user, ()))
+            of_group = groups.get(group)
+            if of_group is None:
+                of_group = groups[group] = set(self.group_users.get(group, ()))
+            if (user, group) in self._declared:
+                of_user.add(group)
+                of_group.add(user)
+            else:
+                of_user.discard(group)
+                of_group.discard(user)
+        changed = set()
+        for mapping, values in ((self.user_groups, users), (self.group_users, groups)):
+            for key, members in values.items():
+                old = mapping.get(key, EMPTY)
+                if members == old:
+                    continue
+                if mapping is self.user_groups:
+                    changed.add(key)
+                if members:
+                    mapping[key] = frozenset(members)
+                else:
+                    del mapping[key]
+        return changed
+
+    def groups_for(self, user: str) -> FrozenSet[str]:
+        return self.user_groups.get(user, EMPTY)
+
+    def users_in(self, group: str) -> FrozenSet[str]:
+        return self.group_users.get(group, EMPTY)
+
+    def principals(self) -> List[Tuple[str, Tuple[str, ...], Tuple[str, ...]]]:
+        """(user, groups, roles) for every known user, the shape who_can and acl.matrix take."""
+        return [(u, tuple(sorted(g)), ()) for u, g in sorted(self.user_groups.items())]
+
+class FileGroupProvider(GroupIndex):
+    """GroupIndex kept in sync with a file, like Trino's file group provider.
+
+    The file is re-checked at most every ``interval`` seconds (on lookup,
+    or with ``check``) and reloaded through ``update`` when its mtime or
+    size changed; a file that fails to read keeps the last index serving.
+    """
+
+    def __init__(self, path: str, fmt: Optional[str] = None, interval: float = 5.0):
+        super().__init__(fmt or detect_format(path))
+        self.path = path
+        self.interval = interval
+        self.last_error: Optional[str] = None
+        self._stat: Optional[tuple] = None
+        self._checked = 0.0
+        self.check()
+
+    def check(self) -> Set[str]:
+        """Reload if the file changed; returns the users whose groups changed."""
+        self._checked = time.monotonic()
+        try:
+            st = os.stat(self.path)
+            stat = (st.st_mtime_ns, st.st_size)
+            if stat == self._stat:
+                return set()
+            with open(self.path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except OSError as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            return set()
+        self._stat = stat
+        self.last_error = None
+        return self.update(text)
+
+    def groups_for(self, user: str) -> FrozenSet[str]:
+        if self.interval and time.monotonic() - self._checked >= self.interval:
+            self.check()
+        return self.user_groups.get(user, EMPTY)
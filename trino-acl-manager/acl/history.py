@@ -0,0 +1,166 @@
+from __future__ import annotations
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+from .models import AccessControlRules
+from .parser import RULE_MODELS
+
+CHUNK = 64
+
+Chunks = Tuple[tuple, ...]
+
+def _chunked(rules: List, previous: Chunks) -> Chunks:
+    """Split a tier into chunks, reusing every chunk of ``previous`` that is still intact.
+
+    Rule objects are compared by identity: edits replace rule objects rather
+    than mutate them, so an edit only costs the chunks around it plus the
+    chunk index, whatever the tier size.
+    """
+    starts = {id(chunk[0]): chunk for chunk in previous}
+    out: List[tuple] = []
+    pending: list = []
+    i, n = 0, len(rules)
+    while i < n:
+        chunk = starts.get(id(rules[i]))
+        if chunk is not None and i + len(chunk) <= n and all(a is b for a, b in zip(chunk, rules[i:i + len(chunk)])):
+            if pending:
+                out.append(tuple(pending))
+                pending = []
+            out.append(chunk)
+            i += len(chunk)
+            continue
+        pending.append(rules[i])
+        if len(pending) == CHUNK:
+            out.append(tuple(pending))
+            pending = []
+        i += 1
+    if pending:
+        out.append(tuple(pending))
+    return tuple(out)
+
+class Snapshot:
+    """Immutable view of one rules version: per tier, a tuple of rule chunks."""
+    __slots__ = ("version", "label", "tiers")
+
+    def __init__(self, version: int, label: str, tiers: Dict[str, Chunks]):
+        self.version, self.label, self.tiers = version, label, tiers
+
+    def tier(self, name: str) -> List:
+        return [rule for chunk in self.tiers[name] for rule in chunk]
+
+    def rules(self) -> AccessControlRules:
+        # fresh lists sharing the rule objects; editing them does not touch the snapshot
+        return AccessControlRules.model_construct(**{name: self.tier(name) for name in RULE_MODELS})
+
+class RulesHistory:
+    """Undo/redo history of rule edits with named checkpoints.
+
+    ``record`` is called after each edit. Rules must be edited by replacing
+    rule objects (acl.editor does), never by mutating them in place, since
+    snapshots share unchanged rules and chunks with each other.
+    """
+
+    def __init__(self, rules: AccessControlRules, limit: int = 500):
+        self.limit = limit
+        self.checkpoints: Dict[str, int] = {}
+        self._snapshots: Dict[int, Snapshot] = {}
+        self._timeline: List[int] = []
+        self._pos = -1
+        self._next = 0
+        self.record(rules, "initial")
+
+    @property
+    def current(self) -> Snapshot:
+        return self._snapshots[self._timeline[self._pos]]
+
+    def record(self, rules: AccessControlRules, label: str = "") -> int:
+        """Snapshot the rules as a new version (dropping redo) unless nothing changed."""
+        prev = self.current.tiers if self._timeline else {}
+        tiers = {name: _chunked(getattr(rules, name), prev.get(name, ())) for name in RULE_MODELS}
+        if prev and all(tiers[name] == prev[name] for name in RULE_MODELS):
+            return self.current.version
+        for version in self._timeline[self._pos + 1:]:
+            self._forget(version)
+        del self._timeline[self._pos + 1:]
+        snap = Snapshot(self._next, label, tiers)
+        self._next += 1
+        self._snapshots[snap.version] = snap
+        self._timeline.append(snap.version)
+        while len(self._timeline) > self.limit:
+            self._forget(self._timeline.pop(0))
+        self._pos = len(self._timeline) - 1
+        return snap.version
+
+    def _forget(self, version: int) -> None:
+        if version not in self.checkpoints.values():
+            self._snapshots.pop(version, None)
+
+    @property
+    def can_undo(self) -> bool:
+        return self._pos > 0
+
+    @property
+    def can_redo(self) -> bool:
+        return self._pos < len(self._timeline) - 1
+
+    def undo(self) -> Optional[AccessControlRules]:
+        if not self.can_undo:
+            return None
+        self._pos -= 1
+        return self.current.rules()
+
+    def redo(self) -> Optional[AccessControlRules]:
+        if not self.can_redo:
+            return None
+        self._pos += 1
+        return self.current.rules()
+
+    def checkpoint(self, name: str) -> int:
+        self.checkpoints[name] = self.current.version
+        return self.current.version
+
+    def restore(self, name: str) -> AccessControlRules:
+        """Rules of a checkpoint, recorded as a new version so the restore itself can be undone."""
+        rules = self._snapshots[self.checkpoints[name]].rules()
+        self.record(rules, f"restore {name}")
+        return rules
+
+    def versions(self) -> List[Dict]:
+        return [{"version": v, "label": self._snapshots[v].label, "current": i == self._pos}
+                for i, v in enumerate(self._timeline)]
+
+    def snapshot(self, version: int) -> Snapshot:
+        return self._snapshots[version]
+
+    def diff(self, a: int, b: int) -> Dict[str, List[Dict]]:
+        """Per tier, the rules added, removed or changed going from version a to b."""
+        old, new = self._snapshots[a], self._snapshots[b]
+        return {name: diff_tier(old.tier(name), new.tier(name)) for name in RULE_MODELS
+                if old.tiers[name] != new.tiers[name]}
+
+def diff_tier(old: List, new: List) -> List[Dict]:
+    """Rules added, removed or changed (replaced in place) between two versions of a tier."""
+    # trim the shared head and tail; only the middle goes to difflib
+    head = 0
+    while head < min(len(old), len(new)) and (old[head] is new[head] or old[head] == new[head]):
+        head += 1
+    tail = 0
+    while tail < min(len(old), len(new)) - head and (old[-1 - tail] is new[-1 - tail] or old[-1 - tail] == new[-1 - tail]):
+        tail += 1
+    a, b = old[head:len(old) - tail], new[head:len(new) - tail]
+    changes = []
+    matcher = SequenceMatcher(None, [r.model_dump_json() for r in a], [r.model_dump_json() for r in b], autojunk=False)
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == "equal":
+            continue
+        paired = min(i2 - i1, j2 - j1) if op == "replace" else 0
+        for k in range(paired):
+            changes.append({"change": "changed", "old_index": head + i1 + k, "new_index": head + j1 + k,
+                            "before": a[i1 + k].model_dump(exclude_none=True),
+                            "after": b[j1 + k].model_dump(exclude_none=True)})
+        for i in range(i1 + paired, i2):
+            changes.append({"change": "removed", "old_index": head + i, "new_index": None,
+                            "before": a[i].model_dump(exclude_none=True), "after": None})
+        for j in range(j1 + paired, j2):
+            changes.append({"change": "added", "old_index": None, "new_index": head + j,
+                            "before": None, "after": b[j].model_dump(exclude_none=True)})
+    return changes
@@ -0,0 +1,89 @@
+from __future__ import annotations
+import time
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from .compiled import LITERAL, CompiledRule, ensure_compiled
+from .evaluator import PRIVS, Rules, effective_access_many
+from .history import diff_tier
+from .matrix import ObjectName, Principal
+
+TIERS = ("catalogs", "schemas", "tables")
+
+def effective_privileges(allow: str, owner: Optional[bool], privileges: Optional[list]) -> List[str]:
+    # same decision as evaluator.has_privilege for every privilege
+    allowed = PRIVS if allow == "all" else (["SELECT", "CREATE_VIEW"] if allow == "read-only" else [])
+    return [p for p in allowed if owner or p in (privileges or ())]
+
+class _Universe:
+    # principals x inventory with per-field value indexes, so literal
+    # object patterns do not scan the whole inventory
+    def __init__(self, principals: Sequence[Principal], inventory: Sequence[ObjectName]):
+        self.principals = [(u, tuple(g), tuple(r)) for u, g, r in principals]
+        self.inventory = [tuple(o) for o in inventory]
+        self.by_value: List[Dict[str, List[int]]] = [{}, {}, {}]
+        for pos, obj in enumerate(self.inventory):
+            for field, value in enumerate(obj):
+                self.by_value[field].setdefault(value, []).append(pos)
+
+    def principals_for(self, rule: CompiledRule) -> Set[int]:
+        return {i for i, (u, g, r) in enumerate(self.principals) if rule.identity_matches(u, g, r)}
+
+    def objects_for(self, rule: CompiledRule) -> Set[int]:
+        key = rule.objects[-1]
+        field = len(rule.objects) - 1
+        candidates = self.by_value[field].get(key.pattern, ()) if key.kind == LITERAL else range(len(self.inventory))
+        return {pos for pos in candidates if rule.object_matches(*self.inventory[pos][:field + 1])}
+
+def affected_pairs(old: Rules, new: Rules, principals: Sequence[Principal],
+                   inventory: Sequence[ObjectName]) -> Tuple[Dict[str, List[Dict]], Set[Tuple[int, int]]]:
+    """Changed catalog/schema/table rules and the (principal, object) positions they can influence.
+
+    A pair none of the changed rules (old or new form) applies to sees the
+    same ordered list of matching rules in both versions, so its first
+    match per tier, and therefore its decision, cannot change.
+    """
+    old_c, new_c = ensure_compiled(old), ensure_compiled(new)
+    universe = _Universe(principals, inventory)
+    changes: Dict[str, List[Dict]] = {}
+    pairs: Set[Tuple[int, int]] = set()
+    for tier in TIERS:
+        tier_changes = diff_tier(getattr(old_c.rules, tier), getattr(new_c.rules, tier))
+        if not tier_changes:
+            continue
+        changes[tier] = tier_changes
+        for change in tier_changes:
+            for compiled, index in ((old_c, change["old_index"]), (new_c, change["new_index"])):
+                if index is None:
+                    continue
+                rule = getattr(compiled, tier)[index]
+                objects = universe.objects_for(rule)
+                if objects:
+                    pairs.update((p, o) for p in universe.principals_for(rule) for o in objects)
+    return changes, pairs
+
+def impact(old: Rules, new: Rules, principals: Sequence[Principal], inventory: Sequence[ObjectName]) -> Dict:
+    """Decisions that differ between two rule versions over principals x inventory.
+
+    Only the pairs the changed rules can influence are evaluated (see
+    affected_pairs). Each change lists the privileges granted and revoked
+    and the catalog visibility before and after.
+    """
+    started = time.perf_counter()
+    old_c, new_c = ensure_compiled(old), ensure_compiled(new)
+    rule_changes, pairs = affected_pairs(old_c, new_c, principals, inventory)
+    principals = [(u, tuple(g), tuple(r)) for u, g, r in principals]
+    inventory = [tuple(o) for o in inventory]
+    ordered = sorted(pairs)
+    checks = [dict(user=principals[p][0], groups=list(principals[p][1]), roles=list(principals[p][2]),
+                   catalog=inventory[o][0], schema=inventory[o][1], table=inventory[o][2]) for p, o in ordered]
+    before = effective_access_many(old_c, checks)
+    after = effective_access_many(new_c, checks)
+    decisions = []
+    for i, check in enumerate(checks):
+        was = effective_privileges(before["catalog_allow"][i], before["schema_owner"][i], before["privileges"][i])
+        now = effective_privileges(after["catalog_allow"][i], after["schema_owner"][i], after["privileges"][i])
+        if was != now or before["visible"][i] != after["visible"][i]:
+            decisions.append({**check, "granted": [p for p in now if p not in was],
+                              "revoked": [p for p in was if p not in now],
+                              "visible_before": before["visible"][i], "visible_after": after["visible"][i]})
+    return {"rule_changes": rule_changes, "decisions": decisions, "evaluated": len(checks),
+            "universe": len(principals) * len(inventory), "seconds": round(time.perf_counter() - started, 3)}
@@ -0,0 +1,163 @@
+from __future__ import annotations
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from .compiled import CompiledRuleSet, ensure_compiled
+from .evaluator import PRIVS, Rules, _split
+from .parser import dump_rules, load_rules
+
+# Optional columnar output dependency
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except Exception:
+    HAS_PYARROW = False
+
+Principal = Tuple[str, Tuple[str, ...], Tuple[str, ...]]
+ObjectName = Tuple[str, str, str]
+
+MATRIX_COLUMNS = ["user", "catalog", "schema", "table", "visible", "catalog_allow", "schema_owner"] + \
+                 [p.lower() for p in PRIVS]
+
+def principals_from_rows(rows: Iterable[Dict]) -> List[Principal]:
+    return [(str(r["user"]), _split(r.get("groups")), _split(r.get("roles"))) for r in rows]
+
+def load_principals(path: str) -> List[Principal]:
+    """Principals from a JSON list of {user, groups, roles} or a CSV with those columns."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        rows = json.load(f) if path.endswith(".json") else list(csv.DictReader(f))
+    return principals_from_rows(rows)
+
+def load_inventory(path: str) -> List[ObjectName]:
+    """Tables from a CSV with catalog, schema and table columns."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return [(r["catalog"], r["schema"], r["table"]) for r in csv.DictReader(f)]
+
+_STRING_COLUMNS = {"user", "catalog", "schema", "table", "catalog_allow"}
+
+def _arrow_schema():
+    # column order is MATRIX_COLUMNS; the record batches are built in that order
+    return pa.schema([(c, pa.string() if c in _STRING_COLUMNS else pa.bool_()) for c in MATRIX_COLUMNS])
+
+def _decide_chunk(compiled: CompiledRuleSet, view, chunk: Sequence[ObjectName]) -> list:
+    catalogs: Dict[str, str] = {}
+    schemas: Dict[tuple, bool] = {}
+    grants: Dict[Optional[int], tuple] = {None: (False,) * len(PRIVS)}
+    allow_col, owner_col, priv_rows = [], [], []
+    for catalog, schema, table in chunk:
+        allow = catalogs.get(catalog)
+        if allow is None:
+            pos = compiled.catalog_matcher.first(view.catalogs, (catalog,))
+            allow = catalogs[catalog] = compiled.catalogs[pos].outcome if pos is not None else "none"
+        owner = schemas.get((catalog, schema))
+        if owner is None:
+            pos = compiled.schema_matcher.first(view.schemas, (catalog, schema))
+            owner = schemas[(catalog, schema)] = compiled.schemas[pos].outcome if pos is not None else False
+        pos = compiled.table_matcher.first(view.tables, (catalog, schema, table))
+        granted = grants.get(pos)
+        if granted is None:
+            privileges = compiled.tables[pos].outcome
+            granted = grants[pos] = tuple(p in privileges for p in PRIVS)
+        allow_col.append(allow)
+        owner_col.append(owner)
+        priv_rows.append(granted)
+    visible = [a != "none" for a in allow_col]
+    priv_cols = list(zip(*priv_rows)) if priv_rows else [()] * len(PRIVS)
+    return [pa.array(visible, pa.bool_()), pa.array(allow_col, pa.string()), pa.array(owner_col, pa.bool_())] + \
+           [pa.array(c, pa.bool_()) for c in priv_cols]
+
+_worker: Dict[str, object] = {}
+
+def _init_worker(rules_data: dict, inventory: List[ObjectName], chunk_size: int) -> None:
+    _worker["compiled"] = CompiledRuleSet(load_rules(rules_data))
+    _worker["chunks"] = [
+        [pa.array(col, pa.string()) for col in zip(*inventory[i:i + chunk_size])] + [inventory[i:i + chunk_size]]
+        for i in range(0, len(inventory), chunk_size)
+    ]
+
+def _write_part(task: tuple) -> int:
+    # each task owns whole groups of principals that share one PrincipalView,
+    # so every inventory chunk is decided once per group and reused per user
+    path, groups, compression = task
+    compiled = _worker["compiled"]
+    schema = _arrow_schema()
+    rows = 0
+    with pq.ParquetWriter(path, schema, compression=compression) as writer:
+        for members in groups:
+            view = compiled.principal_view(*members[0])
+            for cat_arr, sch_arr, tbl_arr, chunk in _worker["chunks"]:
+                decided = _decide_chunk(compiled, view, chunk)
+                batches = [pa.RecordBatch.from_arrays([pa.repeat(user, len(chunk)).cast(pa.string()),
+                                                       cat_arr, sch_arr, tbl_arr] + decided, schema=schema)
+                           for user, _, _ in members]
+                writer.write_table(pa.Table.from_batches(batches, schema=schema))
+                rows += len(chunk) * len(members)
+    return rows
+
+def build_access_matrix(rules: Rules, principals: Sequence[Principal], inventory: Sequence[ObjectName],
+                        out_dir: str, chunk_size: int = 50_000, processes: Optional[int] = None,
+                        compression: str = "zstd") -> Dict[str, object]:
+    """Write the principals x inventory access matrix as a Parquet dataset under out_dir.
+
+    Principals with identical applicable rules are decided together. Large
+    inputs are split across ``processes`` worker processes (default: all
+    CPUs once the matrix exceeds a million rows), each writing its own part file.
+    """
+    if not HAS_PYARROW:
+        raise RuntimeError("pyarrow is not installed. Install 'pyarrow' to write the access matrix.")
+    started = time.perf_counter()
+    compiled = ensure_compiled(rules)
+    inventory = [tuple(o) for o in inventory]
+    groups: Dict[tuple, List[Principal]] = {}
+    for user, grps, roles in principals:
+        principal = (user, tuple(grps), tuple(roles))
+        view = compiled.principal_view(*principal)
+        groups.setdefault((view.catalogs, view.schemas, view.tables), []).append(principal)
+    if processes is None:
+        processes = (os.cpu_count() or 1) if len(principals) * len(inventory) > 1_000_000 else 1
+    processes = max(1, min(processes, len(groups) or 1))
+
+    # spread groups over parts by principal count, largest first
+    parts: List[List[List[Principal]]] = [[] for _ in range(processes * 2 if processes > 1 else 1)]
+    loads = [0] * len(parts)
+    for members in sorted(groups.values(), key=len, reverse=True):
+        i = loads.index(min(loads))
+        parts[i].append(members)
+        loads[i] += len(members)
+    os.makedirs(out_dir, exist_ok=True)
+    tasks = [(os.path.join(out_dir, f"part-{i:05d}.parquet"), part, compression)
+             for i, part in enumerate(parts) if part]
+
+    init_args = (dump_rules(compiled.rules), inventory, chunk_size)
+    if processes == 1:
+        _init_worker(*init_args)
+        rows = sum(_write_part(t) for t in tasks)
+    else:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=init_args) as pool:
+            rows = sum(pool.map(_write_part, tasks))
+    return {"rows": rows, "parts": len(tasks), "principals": len(principals), "objects": len(inventory),
+            "distinct_views": len(groups), "processes": processes,
+            "seconds": round(time.perf_counter() - started, 3)}
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Materialize the access matrix to Parquet.")
+    ap.add_argument("rules", help="rules JSON")
+    ap.add_argument("principals", help="principals CSV/JSON (user, groups, roles)")
+    ap.add_argument("inventory", help="inventory CSV (catalog, schema, table)")
+    ap.add_argument("out_dir")
+    ap.add_argument("--processes", type=int, default=None)
+    ap.add_argument("--chunk-size", type=int, default=50_000)
+    args = ap.parse_args(argv)
+    with open(args.rules, "r", encoding="utf-8") as f:
+        rules = load_rules(json.load(f))
+    summary = build_access_matrix(rules, load_principals(args.principals), load_inventory(args.inventory),
+                                  args.out_dir, chunk_size=args.chunk_size, processes=args.processes)
+    print(json.dumps(summary))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+from .cache import DecisionCache
+from .compiled import CompiledRuleSet
+from .evaluator import (_decide_function, _decide_impersonation, _decide_procedure, _decide_query,
+                        _decide_session_property, _decide_system_information, _lowest_bit, effective_access,
+                        has_privilege)
+
+# Trino OPA access-control operations mapped onto the file-based rule model.
+# Table operations need the privilege on both the catalog and the table rule;
+# owning the schema grants every table privilege.
+TABLE_PRIVILEGE_OPERATIONS = {
+    "SelectFromColumns": "SELECT",
+    "InsertIntoTable": "INSERT",
+    "DeleteFromTable": "DELETE",
+    "TruncateTable": "DELETE",
+    "UpdateTableColumns": "UPDATE",
+    "CreateViewWithSelectFromColumns": "CREATE_VIEW",
+    "CreateTable": "OWNERSHIP",
+    "DropTable": "OWNERSHIP",
+    "RenameTable": "OWNERSHIP",
+    "SetTableProperties": "OWNERSHIP",
+    "SetTableComment": "OWNERSHIP",
+    "SetColumnComment": "OWNERSHIP",
+    "AddColumn": "OWNERSHIP",
+    "DropColumn": "OWNERSHIP",
+    "RenameColumn": "OWNERSHIP",
+    "AlterColumn": "OWNERSHIP",
+    "SetTableAuthorization": "OWNERSHIP",
+    "CreateView": "OWNERSHIP",
+    "DropView": "OWNERSHIP",
+    "RenameView": "OWNERSHIP",
+    "SetViewComment": "OWNERSHIP",
+    "CreateMaterializedView": "OWNERSHIP",
+    "DropMaterializedView": "OWNERSHIP",
+    "RefreshMaterializedView": "UPDATE",
+}
+# ShowTables names only the schema: allowed to its owner or with any table grant in it
+SCHEMA_TABLES_OPERATIONS = {"ShowTables"}
+TABLE_VISIBILITY_OPERATIONS = {"FilterTables", "ShowColumns", "FilterColumns", "ShowCreateTable"}
+CATALOG_OPERATIONS = {"AccessCatalog", "FilterCatalogs", "ShowSchemas", "FilterSchemas", "ShowFunctions"}
+SCHEMA_OWNER_OPERATIONS = {"CreateSchema", "DropSchema", "RenameSchema", "SetSchemaAuthorization"}
+QUERY_OPERATIONS = {"ExecuteQuery", "ViewQueryOwnedBy", "FilterViewQueryOwnedBy", "KillQueryOwnedBy"}
+SYSTEM_INFORMATION_OPERATIONS = {"ReadSystemInformation", "WriteSystemInformation"}
+
+def _identity(inp: Dict[str, Any]) -> tuple:
+    ident = inp.get("context", {}).get("identity", {})
+    return ident.get("user", ""), list(ident.get("groups") or []), list(ident.get("enabledRoles") or [])
+
+def _object(resource: Dict[str, Any]) -> tuple:
+    if "table" in resource:
+        t = resource["table"]
+        return t.get("catalogName"), t.get("schemaName"), t.get("tableName")
+    if "schema" in resource:
+        s = resource["schema"]
+        return s.get("catalogName"), s.get("schemaName"), None
+    if "catalog" in resource:
+        return resource["catalog"].get("name"), None, None
+    return None, None, None
+
+def _other_rule_kind(compiled: CompiledRuleSet, operation: str, principal: tuple,
+                     resource: Dict[str, Any]) -> Optional[bool]:
+    # decisions taken from the non-table rule kinds; None for table operations
+    user, groups, roles = principal
+    if operation == "ImpersonateUser":
+        return _decide_impersonation(compiled, user, resource.get("user", {}).get("user", ""))[1]
+    if operation in QUERY_OPERATIONS:
+        owner = resource.get("user", {}).get("user") or user
+        return _decide_query(compiled, compiled.principal_view(user, groups, roles), owner)[1]
+    if operation in SYSTEM_INFORMATION_OPERATIONS:
+        return _decide_system_information(compiled, compiled.principal_view(user, groups, roles))[1]
+    if operation == "SetSystemSessionProperty":
+        name = resource.get("systemSessionProperty", {}).get("name", "")
+        return _decide_session_property(compiled, compiled.principal_view(user, groups, roles), name, None)[1]
+    if operation == "SetCatalogSessionProperty":
+        prop = resource.get("catalogSessionProperty", {})
+        return _decide_session_property(compiled, compiled.principal_view(user, groups, roles),
+                                        prop.get("propertyName", ""), prop.get("catalogName", ""))[1]
+    if operation in ("ExecuteFunction", "ExecuteTableFunction"):
+        fn = resource.get("function", {})
+        return _decide_function(compiled, compiled.principal_view(user, groups, roles),
+                                fn.get("catalogName", ""), fn.get("functionName", ""))[1]
+    if operation == "ExecuteProcedure":
+        fn = resource.get("function", {})
+        return _decide_procedure(compiled, compiled.principal_view(user, groups, roles),
+                                 fn.get("catalogName", ""), fn.get("functionName", ""))[1]
+    return None
+
+def _any_table_grant(compiled: CompiledRuleSet, principal: tuple, catalog: str, schema: str) -> bool:
+    # any applicable table rule with privileges whose catalog and schema patterns match
+    mask = compiled.principal_view(*principal).tables
+    while mask:
+        pos = _lowest_bit(mask)
+        mask &= mask - 1
+        rule = compiled.tables[pos]
+        if rule.outcome and rule.objects[0].match(catalog) and rule.objects[1].match(schema):
+            return True
+    return False
+
+def _allowed(compiled: CompiledRuleSet, operation: str, principal: tuple, resource: Dict[str, Any],
+             cache: Optional[DecisionCache]) -> bool:
+    resource = resource or {}
+    other = _other_rule_kind(compiled, operation, principal, resource)
+    if other is not None:
+        return other
+    catalog, schema, table = _object(resource)
+    if not catalog:
+        return False
+    user, groups, roles = principal
+    res = effective_access(compiled, user, groups, roles, catalog, schema, table, cache=cache)
+    if operation in CATALOG_OPERATIONS:
+        return res["visible"]
+    if not schema:
+        return False
+    owner = res["schema"]["owner"]
+    if operation in SCHEMA_OWNER_OPERATIONS:
+        return res["visible"] and owner
+    if operation in SCHEMA_TABLES_OPERATIONS:
+        return res["visible"] and (owner or _any_table_grant(compiled, principal, catalog, schema))
+    if not table:
+        return False
+    if operation in TABLE_VISIBILITY_OPERATIONS:
+        return res["visible"] and (owner or bool(res["table"]["privileges"]))
+    privilege = TABLE_PRIVILEGE_OPERATIONS.get(operation)
+    return privilege is not None and has_privilege(res, privilege)
+
+def decide(compiled: CompiledRuleSet, body: Dict[str, Any], cache: Optional[DecisionCache] = None) -> bool:
+    """Answer a single OPA request body (``{"input": {...}}``); unknown operations are denied."""
+    inp = body.get("input", body)
+    action = inp.get("action", {})
+    return _allowed(compiled, action.get("operation", ""), _identity(inp), action.get("resource"), cache)
+
+def decide_batch(compiled: CompiledRuleSet, body: Dict[str, Any], cache: Optional[DecisionCache] = None) -> List[int]:
+    """Answer a batched request: indices of ``action.filterResources`` that are allowed.
+
+    FilterColumns sends one table resource with a column list and expects
+    column indices back; a visible table exposes all of its columns.
+    """
+    inp = body.get("input", body)
+    action = inp.get("action", {})
+    operation = action.get("operation", "")
+    principal = _identity(inp)
+    resources = action.get("filterResources") or []
+    if operation == "FilterColumns" and len(resources) == 1 and "table" in resources[0]:
+        columns = resources[0]["table"].get("columns") or []
+        return list(range(len(columns))) if _allowed(compiled, operation, principal, resources[0], cache) else []
+    return [i for i, resource in enumerate(resources) if _allowed(compiled, operation, principal, resource, cache)]
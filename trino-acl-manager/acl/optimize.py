@@ -0,0 +1,208 @@
+from __future__ import annotations
+import argparse
+import json
+import random
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+from .analysis import TIERS, minimize_rules, pattern_atoms, sample_strings
+from .compiled import LITERAL, CompiledRuleSet, compile_pattern, ensure_compiled
+from .evaluator import Rules, effective_access_many
+from .models import AccessControlRules
+from .parser import dump_rules, dump_rules_json, load_rules
+
+OBJECT_FIELDS = {"catalogs": ("catalog",), "schemas": ("catalog", "schema"), "tables": ("catalog", "schema", "table")}
+IDENTITY_FIELDS = ("user", "group", "role")
+
+# named groups, backreferences and conditionals depend on group names/numbers an alternation would clash or shift
+_GROUP_REFS = re.compile(r"\(\?P|\(\?\(|\\\d|\\g<")
+
+def _mergeable(pattern: Optional[str]) -> bool:
+    # invalid regexes are matched literally, so they can't go into an alternation
+    if not pattern or _GROUP_REFS.search(pattern):
+        return False
+    try:
+        compiled = re.compile(pattern)
+    except re.error:
+        return False
+    # global inline flags such as (?i) must lead the whole pattern, so they can't sit in a branch
+    return not compiled.flags & ~re.UNICODE
+
+def _alternation(patterns: Sequence[str]) -> Optional[str]:
+    """One pattern matching exactly the union, or None if the merged regex doesn't check out."""
+    unique = list(dict.fromkeys(patterns))
+    merged = "|".join(p if compile_pattern(p).kind == LITERAL else f"(?:{p})" for p in unique)
+    try:
+        groups = re.compile(merged).groups
+    except re.error:
+        return None
+    # every branch keeps its own groups; a shifted or missing one means the merge isn't the union
+    return merged if groups == sum(re.compile(p).groups for p in unique) else None
+
+def _merge_field(a: dict, b: dict, fields: Sequence[str]) -> Optional[str]:
+    """The single mergeable field in which two rule dicts differ, if any."""
+    diff = [k for k in set(a) | set(b) if a.get(k) != b.get(k)]
+    if len(diff) != 1 or diff[0] not in fields:
+        return None
+    field = diff[0]
+    return field if _mergeable(a.get(field)) and _mergeable(b.get(field)) else None
+
+def merge_adjacent(rules: List[dict], object_fields: Sequence[str]) -> List[dict]:
+    """Merge runs of adjacent rules that differ in one pattern into an alternation.
+
+    Rules in a run share identity and outcome and nothing sits between them,
+    so the merged rule matches exactly the union and first-match order is kept.
+    """
+    fields = tuple(object_fields) + IDENTITY_FIELDS
+    out: List[dict] = []
+    run: List[dict] = []
+    run_field: Optional[str] = None
+
+    def flush():
+        if run:
+            pattern = _alternation([r[run_field] for r in run]) if run_field is not None else None
+            if run_field is not None and pattern is None:
+                out.extend(run)
+                return
+            merged = dict(run[0])
+            if run_field is not None:
+                merged[run_field] = pattern
+            out.append(merged)
+
+    for rule in rules:
+        if run:
+            field = _merge_field(run[0], rule, fields)
+            if field is not None and (run_field is None or field == run_field):
+                run.append(rule)
+                run_field = field
+                continue
+            flush()
+        run, run_field = [rule], None
+    flush()
+    return out
+
+def _samples(pattern: Optional[str], n: int) -> List[str]:
+    if not pattern:
+        return []
+    pat = compile_pattern(pattern)
+    atoms = pattern_atoms(pat)
+    if atoms is not None:
+        return [text if kind == "lit" else text + "x" for kind, text in atoms][:n]
+    return (sample_strings(pattern, n=n) or [])[:n]
+
+def _universe(compiled: CompiledRuleSet, max_principals: int, max_objects: int,
+              seed: int) -> Tuple[List[tuple], List[tuple], List[Tuple[tuple, tuple]]]:
+    # a principals x objects mix within the limits, plus each rule's own (principal, matching object) pairs
+    rng = random.Random(seed)
+    users, groups, roles = {"nobody"}, set(), set()
+    pairs: Dict[Tuple[tuple, tuple], None] = {}
+    objects = {("nomatch_catalog", "nomatch_schema", "nomatch_table")}
+    for tier in TIERS:
+        for rule in getattr(compiled.rules, tier):
+            u, g, r = _samples(rule.user, 3), _samples(rule.group, 3), _samples(rule.role, 2)
+            users.update(u)
+            groups.update(g)
+            roles.update(r)
+            principal = (u[0] if u else "nobody", tuple(g[:1]), tuple(r[:1]))
+            values = [_samples(getattr(rule, f), 3) or ["zz_other"] for f in OBJECT_FIELDS[tier]]
+            for i in range(max(len(v) for v in values)):
+                picked = [v[min(i, len(v) - 1)] for v in values]
+                pairs[(principal, tuple(picked + ["zz_other"] * (3 - len(picked))))] = None
+            values = [v + ["zz_other"] for v in values]
+            for _ in range(3):
+                picked = [rng.choice(v) for v in values]
+                objects.add(tuple(picked + ["zz_other"] * (3 - len(picked))))
+    users, groups, roles = sorted(users), sorted(groups), sorted(roles)
+    principals = [(u, (), ()) for u in users] + [("nobody", (g,), ()) for g in groups] + \
+                 [("nobody", (), (r,)) for r in roles]
+    while len(principals) < max_principals and (groups or roles):
+        principals.append((rng.choice(users), tuple(rng.sample(groups, min(2, len(groups)))),
+                           tuple(rng.sample(roles, min(1, len(roles))))))
+    principals = list(dict.fromkeys(principals))
+    principals = principals if len(principals) <= max_principals else rng.sample(principals, max_principals)
+    objects.update(o for _, o in pairs)
+    objects = sorted(objects)
+    objects = objects if len(objects) <= max_objects else rng.sample(objects, max_objects)
+    return principals, objects, list(pairs)
+
+def sample_universe(rules: Rules, max_principals: int = 100, max_objects: int = 1000,
+                    seed: int = 0) -> Tuple[List[tuple], List[dict]]:
+    """Principals and objects that exercise the rules' patterns, plus a few that match nothing.
+
+    At most ``max_principals`` and ``max_objects``; objects are drawn from
+    values matching every rule fully as well as from mixes of field values.
+    """
+    principals, objects, _ = _universe(ensure_compiled(rules), max_principals, max_objects, seed)
+    return principals, [dict(catalog=c, schema=s, table=t) for c, s, t in objects]
+
+def rule_checks(rules: Rules) -> List[Tuple[tuple, dict]]:
+    """Per catalog/schema/table rule, a principal its identity matches with objects all its patterns match."""
+    _, _, pairs = _universe(ensure_compiled(rules), 0, 0, 0)
+    return [(p, dict(catalog=c, schema=s, table=t)) for p, (c, s, t) in pairs]
+
+def verify_equivalent(original: Rules, candidate: Rules, max_principals: int = 100,
+                      max_objects: int = 1000, seed: int = 0) -> Dict:
+    """Compare decisions of two rule sets on sampled access checks.
+
+    The checks are a principals x objects matrix within the limits, sampled
+    from both rule sets, plus for every rule of either set a principal it
+    applies to against objects it fully matches (not the whole matrix), so
+    the cost grows linearly with the number of rules.
+    """
+    original, candidate = ensure_compiled(original), ensure_compiled(candidate)
+    principals, objects, pairs = _universe(original, max_principals, max_objects, seed)
+    more_principals, more_objects, more_pairs = _universe(candidate, max_principals // 4, max_objects // 4, seed)
+    principals = list(dict.fromkeys(principals + more_principals))
+    objects = list(dict.fromkeys(objects + more_objects))
+    matrix = [(p, o) for p in principals for o in objects]
+    seen = set(matrix)
+    cells = matrix + [c for c in dict.fromkeys(pairs + more_pairs) if c not in seen]
+    checks = [dict(user=u, groups=list(g), roles=list(r), catalog=c, schema=s, table=t)
+              for (u, g, r), (c, s, t) in cells]
+    cols = ("visible", "catalog_allow", "schema_owner", "privileges")
+    before = effective_access_many(original, checks)
+    after = effective_access_many(candidate, checks)
+    mismatches = []
+    for i, check in enumerate(checks):
+        a = tuple(before[c][i] for c in cols)
+        b = tuple(after[c][i] for c in cols)
+        if a != b:
+            mismatches.append({"check": check, "original": a, "optimized": b})
+    return {"checked": len(checks), "equivalent": not mismatches, "mismatches": mismatches[:50]}
+
+def optimize_for_trino(rules: Rules, verify: bool = True) -> Tuple[AccessControlRules, Dict]:
+    """Shrink catalog/schema/table rules for Trino's linear evaluator.
+
+    Drops proven dead rules, then merges adjacent compatible rules into
+    alternation patterns. With verify, the result is checked against the
+    original over a sampled access matrix and the report says whether they agree.
+    """
+    compiled = ensure_compiled(rules)
+    data = dump_rules(minimize_rules(compiled))
+    for tier in TIERS:
+        data[tier] = merge_adjacent(data.get(tier, []), OBJECT_FIELDS[tier])
+    optimized = load_rules(data)
+    report = {"before": {t: len(getattr(compiled.rules, t)) for t in TIERS},
+              "after": {t: len(getattr(optimized, t)) for t in TIERS}}
+    if verify:
+        report["verification"] = verify_equivalent(compiled, CompiledRuleSet(optimized))
+    return optimized, report
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Write an equivalent, smaller rules file for Trino.")
+    ap.add_argument("rules")
+    ap.add_argument("out")
+    ap.add_argument("--force", action="store_true", help="write the output even if verification finds differences")
+    args = ap.parse_args(argv)
+    with open(args.rules, "r", encoding="utf-8") as f:
+        rules = load_rules(json.load(f))
+    optimized, report = optimize_for_trino(rules)
+    verification = report.get("verification", {})
+    mismatches = verification.pop("mismatches", [])
+    print(json.dumps(report))
+    if not verification.get("equivalent", True) and not args.force:
+        raise SystemExit(f"not writing {args.out}: the optimized rules decide differently, e.g. {json.dumps(mismatches[0])}")
+    with open(args.out, "wb") as f:
+        f.write(dump_rules_json(optimized))
+
+if __name__ == "__main__":
+    main()
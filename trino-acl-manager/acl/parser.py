@@ -1,22 +1,151 @@
 from __future__ import annotations
-import json, re
-from typing import Dict, Any
+import hashlib
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple, Union, get_args, get_type_hints
+from pydantic import TypeAdapter, ValidationError
 from .models import AccessControlRules
+from .compiled import compile_pattern
 
 def load_rules(obj: Dict[str, Any]) -> AccessControlRules:
     data = obj.get("data", obj)
     return AccessControlRules(**data)
 
+class RulesLoadError(ValueError):
+    """A rules file that failed to parse or validate, with the offending position."""
+
+    def __init__(self, message: str, tier: Optional[str] = None, index: Optional[int] = None,
+                 line: Optional[int] = None, column: Optional[int] = None):
+        section = tier if index is None else f"{tier}[{index}]"
+        where = ", ".join(x for x in (section if tier is not None else "",
+                                       f"line {line} column {column}" if line is not None else "") if x)
+        super().__init__(f"{where}: {message}" if where else message)
+        self.tier, self.index, self.line, self.column = tier, index, line, column
+
+# rule model per top-level section, e.g. "tables" -> TableAccessControlRule
+RULE_MODELS = {name: get_args(hint)[0] for name, hint in get_type_hints(AccessControlRules).items()}
+_ADAPTERS = {name: TypeAdapter(List[model]) for name, model in RULE_MODELS.items()}
+_WS = re.compile(r"[ \t\n\r]*")
+
+def _position(text: str, offset: int) -> Tuple[int, int]:
+    line = text.count("\n", 0, offset) + 1
+    return line, offset - (text.rfind("\n", 0, offset) + 1) + 1
+
+class _Stream:
+    # walks the top-level object with raw_decode so only one chunk of rule
+    # dicts is alive at a time instead of the whole decoded document
+    def __init__(self, text: str, chunk_size: int):
+        self.text, self.chunk_size = text, chunk_size
+        self.decoder = json.JSONDecoder()
+        self.sections: Dict[str, list] = {}
+
+    def fail(self, message: str, offset: int, tier: Optional[str] = None, index: Optional[int] = None):
+        raise RulesLoadError(message, tier, index, *_position(self.text, offset))
+
+    def skip(self, pos: int) -> int:
+        return _WS.match(self.text, pos).end()
+
+    def expect(self, pos: int, char: str) -> int:
+        pos = self.skip(pos)
+        if self.text[pos:pos + 1] != char:
+            self.fail(f"expected {char!r}", pos)
+        return pos + 1
+
+    def value(self, pos: int) -> Tuple[Any, int]:
+        try:
+            return self.decoder.raw_decode(self.text, pos)
+        except json.JSONDecodeError as e:
+            raise RulesLoadError(e.msg, line=e.lineno, column=e.colno) from None
+
+    def document(self) -> Dict[str, list]:
+        pos = self.object(self.skip(0), top=True)
+        if self.skip(pos) != len(self.text):
+            self.fail("extra data after rules object", self.skip(pos))
+        return self.sections
+
+    def object(self, pos: int, top: bool = False) -> int:
+        pos = self.expect(pos, "{")
+        if self.text[self.skip(pos):self.skip(pos) + 1] == "}":
+            return self.skip(pos) + 1
+        wrapped = False
+        while True:
+            key, pos = self.value(self.skip(pos))
+            if not isinstance(key, str):
+                self.fail("expected a string key", pos)
+            pos = self.skip(self.expect(pos, ":"))
+            head = self.text[pos:pos + 1]
+            if key == "data" and top and head == "{":
+                # {"data": {...}} wraps the rules, as accepted by load_rules: its siblings are ignored
+                self.sections = {}
+                pos = self.object(pos)
+                wrapped = True
+            elif key in RULE_MODELS and head == "[" and not wrapped:
+                pos = self.array(key, pos)
+            else:
+                start = pos
+                _, pos = self.value(pos)
+                if key in RULE_MODELS and not wrapped:
+                    self.fail(f"{key} must be a list", start, key)
+            pos = self.skip(pos)
+            if self.text[pos:pos + 1] == "}":
+                return pos + 1
+            pos = self.expect(pos, ",")
+
+    def array(self, tier: str, pos: int) -> int:
+        rules: list = []
+        chunk: list = []
+        offsets: List[int] = []
+        pos = self.skip(pos + 1)
+        if self.text[pos:pos + 1] != "]":
+            while True:
+                offsets.append(pos)
+                item, pos = self.value(pos)
+                chunk.append(item)
+                if len(chunk) >= self.chunk_size:
+                    rules.extend(self.validate(tier, chunk, len(rules), offsets))
+                    chunk, offsets = [], []
+                pos = self.skip(pos)
+                if self.text[pos:pos + 1] == "]":
+                    break
+                pos = self.skip(self.expect(pos, ","))
+        rules.extend(self.validate(tier, chunk, len(rules), offsets))
+        self.sections[tier] = rules
+        return pos + 1
+
+    def validate(self, tier: str, chunk: list, start: int, offsets: List[int]) -> list:
+        try:
+            return _ADAPTERS[tier].validate_python(chunk)
+        except ValidationError as e:
+            err = e.errors()[0]
+            i = err["loc"][0] if err["loc"] and isinstance(err["loc"][0], int) else 0
+            field = ".".join(str(x) for x in err["loc"][1:])
+            self.fail(f"{field + ': ' if field else ''}{err['msg']}", offsets[i], tier, start + i)
+
+def load_rules_stream(source: Union[bytes, str], chunk_size: int = 5_000) -> AccessControlRules:
+    """Parse raw rules file content section by section, validating rules in chunks.
+
+    Equivalent to ``load_rules(json.loads(source))`` without holding the whole
+    decoded document; errors raise RulesLoadError naming the section, rule
+    index, line and column.
+    """
+    text = source if isinstance(source, str) else source.decode("utf-8-sig")
+    # each section is already a validated list of rule models
+    return AccessControlRules.model_construct(**_Stream(text, chunk_size).document())
+
 def dump_rules(rules: AccessControlRules, wrap: bool=False) -> Dict[str, Any]:
-    data = json.loads(rules.model_dump_json(exclude_none=True))
+    data = rules.model_dump(mode="json", exclude_none=True)
     return {"data": data} if wrap else data
 
+def dump_rules_json(rules: AccessControlRules, indent: Optional[int]=2) -> bytes:
+    """Rules file content, serialized in one pass without an intermediate dict."""
+    return rules.model_dump_json(indent=indent, exclude_none=True).encode("utf-8")
+
+def rules_fingerprint(rules: AccessControlRules) -> str:
+    return hashlib.sha256(rules.model_dump_json(exclude_none=True).encode()).hexdigest()
+
 def match_identity(rule, user: str, groups: list[str], roles: list[str]) -> bool:
     def m(pat: str, value: str) -> bool:
-        try:
-            return re.fullmatch(pat, value) is not None
-        except re.error:
-            return pat == value
+        return compile_pattern(pat).match(value)
     ok = False
     if getattr(rule, "user", None):
         ok = ok or m(rule.user, user)
@@ -0,0 +1,352 @@
+from __future__ import annotations
+import argparse
+import json
+import re
+import time
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from .compiled import REGEX, compile_pattern
+from .evaluator import Rules
+from .models import AccessControlRules
+from .parser import RULE_MODELS, load_rules_stream
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# Optional: the `regex` module can abort a match after a timeout; re cannot be interrupted
+try:
+    import regex
+    HAS_REGEX = True
+except Exception:
+    HAS_REGEX = False
+
+PATTERN_FIELDS = ("user", "group", "role", "catalog", "schema", "table", "function", "procedure", "property",
+                  "query", "principal")
+EXPONENTIAL, POLYNOMIAL = "exponential", "polynomial"
+MAX_PATTERN_LENGTH = 512
+# chained unbounded repeats over overlapping characters cost n^k on a failed match
+POLYNOMIAL_DEGREE = 3
+
+_DIGITS = frozenset(range(ord("0"), ord("9") + 1))
+
+class UnsafePatternError(ValueError):
+    """A pattern rejected by the bounded matching mode."""
+
+# character sets are frozensets of code points; None means "any character"
+def _union(a, b):
+    return None if a is None or b is None else a | b
+
+def _overlap(a, b) -> bool:
+    return a is None or b is None or bool(a & b)
+
+def _char_set(name: str, av):
+    if name == "LITERAL":
+        return frozenset((av,))
+    if name == "IN":
+        chars = frozenset()
+        for item_op, item in av:
+            item_name = str(item_op)
+            if item_name == "LITERAL":
+                chars |= {item}
+            elif item_name == "RANGE" and item[1] - item[0] <= 512:
+                chars |= frozenset(range(item[0], item[1] + 1))
+            elif item_name == "CATEGORY" and str(item).endswith("_DIGIT"):
+                chars |= _DIGITS
+            else:  # NEGATE, other categories, wide ranges
+                return None
+        return chars
+    return None  # ANY, NOT_LITERAL
+
+def _first(tree) -> Tuple[Optional[frozenset], bool]:
+    """Characters a subpattern can start with, and whether it can match the empty string."""
+    chars: Optional[frozenset] = frozenset()
+    for op, av in tree:
+        name = str(op)
+        if name == "AT":
+            continue
+        if name in ("LITERAL", "NOT_LITERAL", "ANY", "IN"):
+            return _union(chars, _char_set(name, av)), False
+        if name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT"):
+            sub_chars, nullable = _first(av[2])
+            chars = _union(chars, sub_chars)
+            if av[0] > 0 and not nullable:
+                return chars, False
+        elif name in ("SUBPATTERN", "ATOMIC_GROUP"):
+            sub_chars, nullable = _first(av[-1])
+            chars = _union(chars, sub_chars)
+            if not nullable:
+                return chars, False
+        elif name == "BRANCH":
+            results = [_first(b) for b in av[1]]
+            for sub_chars, _ in results:
+                chars = _union(chars, sub_chars)
+            if not any(nullable for _, nullable in results):
+                return chars, False
+        else:  # backreferences, lookarounds: assume anything
+            return None, True
+    return chars, True
+
+def _unbounded_inside(tree) -> bool:
+    return "MAXREPEAT" in str(tree)
+
+def _flat(tree) -> Iterator:
+    # groups and short bounded repeats do not change how a sequence backtracks; inline them
+    for op, av in tree:
+        name = str(op)
+        if name == "SUBPATTERN":
+            yield from _flat(av[-1])
+        elif name in ("MAX_REPEAT", "MIN_REPEAT") and 1 < av[1] < sre_parse.MAXREPEAT and _unbounded_inside(av[2]):
+            for _ in range(min(av[1], POLYNOMIAL_DEGREE)):
+                yield from _flat(av[2])
+        else:
+            yield op, av
+
+def _chars(items) -> Optional[frozenset]:
+    # every character a sequence can consume
+    chars: Optional[frozenset] = frozenset()
+    for op, av in items:
+        name = str(op)
+        if name == "AT":
+            continue
+        if name in ("LITERAL", "NOT_LITERAL", "ANY", "IN"):
+            chars = _union(chars, _char_set(name, av))
+        elif name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT"):
+            chars = _union(chars, _chars(_flat(av[2])))
+        elif name == "BRANCH":
+            for b in av[1]:
+                chars = _union(chars, _chars(_flat(b)))
+        else:
+            return None
+        if chars is None:
+            return None
+    return chars
+
+def _delimited(sub) -> bool:
+    """Whether a repeated body ends in a required character nothing before it can match, as in ``(\\d+\\.)+``.
+
+    Each iteration then ends at the first such character, so the input
+    splits into iterations one way only.
+    """
+    items = list(_flat(sub))
+    if len(items) < 2 or str(items[-1][0]) not in ("LITERAL", "IN"):
+        return False
+    end = _char_set(str(items[-1][0]), items[-1][1])
+    return end is not None and not _overlap(end, _chars(items[:-1]))
+
+def _walk(tree, enclosing: List, out: List[Tuple[str, str]]) -> None:
+    # enclosing: (first characters, delimited) of each unbounded repeat around tree
+    chain: List = []
+    for op, av in _flat(tree):
+        name = str(op)
+        if name in ("MAX_REPEAT", "MIN_REPEAT"):
+            lo, hi, sub = av
+            body = _first(sub)[0]
+            if hi != sre_parse.MAXREPEAT:
+                # a variable count under an unbounded quantifier splits the input ambiguously too
+                if hi > lo and any(_overlap(outer, body) for outer, delimited in enclosing if not delimited):
+                    out.append((EXPONENTIAL, "nested quantifiers over the same characters"))
+                _walk(sub, enclosing, out)
+                continue
+            if any(_overlap(outer, body) for outer, delimited in enclosing if not delimited):
+                out.append((EXPONENTIAL, "nested unbounded quantifiers over the same characters"))
+            chain = chain + [body] if chain and _overlap(chain[-1], body) else [body]
+            if len(chain) == POLYNOMIAL_DEGREE:
+                out.append((POLYNOMIAL, f"{POLYNOMIAL_DEGREE} or more chained unbounded quantifiers "
+                                        "over overlapping characters"))
+            # quantifiers inside a delimited body can't trade characters between iterations;
+            # alternatives inside it can still be ambiguous
+            _walk(sub, enclosing + [(body, _delimited(sub))], out)
+        elif name in ("LITERAL", "NOT_LITERAL", "ANY", "IN"):
+            # a character the previous quantifier cannot consume ends the chain
+            if chain and not _overlap(chain[-1], _char_set(name, av)):
+                chain = []
+        elif name == "BRANCH":
+            branches = av[1]
+            if enclosing:
+                # sre_parse factors shared prefixes out, so (a|a) leaves two empty alternatives
+                firsts = [_first(b) for b in branches]
+                if any(_overlap(a[0], b[0]) or (a[1] and b[1]) for i, a in enumerate(firsts) for b in firsts[i + 1:]):
+                    out.append((EXPONENTIAL, "alternatives starting with the same characters under an unbounded quantifier"))
+            for b in branches:
+                _walk(b, enclosing, out)
+        elif name in ("ASSERT", "ASSERT_NOT"):
+            _walk(av[1], enclosing, out)
+        elif name in ("ATOMIC_GROUP", "POSSESSIVE_REPEAT"):
+            continue  # no backtracking into these
+
+@lru_cache(maxsize=1 << 14)
+def analyze_pattern(pattern: str) -> Tuple[Tuple[str, str], ...]:
+    """(severity, reason) for each catastrophic-backtracking construct in a rule pattern.
+
+    Only patterns that reach the regex engine are checked: literal and
+    ``<literal>.*`` patterns and invalid regexes (matched literally) never
+    backtrack. Severity is EXPONENTIAL for nested quantifiers or ambiguous
+    alternation under a quantifier, POLYNOMIAL for long chains of
+    overlapping quantifiers like ``.*_.*_.*``. The check is conservative;
+    profile_patterns measures the actual cost.
+    """
+    if compile_pattern(pattern).kind != REGEX:
+        return ()
+    try:
+        tree = sre_parse.parse(pattern)
+    except Exception:
+        return ()
+    out: List[Tuple[str, str]] = []
+    _walk(tree, [], out)
+    return tuple(dict.fromkeys(out))
+
+def _patterns(rules: AccessControlRules) -> Iterator[Tuple[str, int, str, str]]:
+    for tier in RULE_MODELS:
+        for index, rule in enumerate(getattr(rules, tier)):
+            for field in PATTERN_FIELDS:
+                value = getattr(rule, field, None)
+                if isinstance(value, str) and value:
+                    yield tier, index, field, value
+
+def _rules(rules: Rules) -> AccessControlRules:
+    return rules if isinstance(rules, AccessControlRules) else rules.rules
+
+def scan_rules(rules: Rules) -> List[Dict]:
+    """Every rule pattern analyze_pattern flags, with its tier, rule index and field."""
+    return [{"tier": tier, "index": index, "field": field, "pattern": pattern, "severity": severity, "reason": reason}
+            for tier, index, field, pattern in _patterns(_rules(rules))
+            for severity, reason in analyze_pattern(pattern)]
+
+def _pumps(pattern: str) -> List[str]:
+    # strings repeated to build worst-case inputs: the pattern's literal characters and a few identifier characters
+    try:
+        tree = sre_parse.parse(pattern)
+    except Exception:
+        return ["a"]
+    chars = dict.fromkeys("a0_")
+    stack = [tree]
+    while stack:
+        for op, av in stack.pop():
+            name = str(op)
+            if name == "LITERAL":
+                chars[chr(av)] = None
+            elif name in ("MAX_REPEAT", "MIN_REPEAT"):
+                stack.append(av[2])
+            elif name == "SUBPATTERN":
+                stack.append(av[-1])
+            elif name == "BRANCH":
+                stack.extend(av[1])
+    return list(chars)[:12]
+
+def pattern_cost(pattern: str, identifiers: Sequence[str] = (), budget: float = 0.05,
+                 max_length: int = 256) -> Dict:
+    """Time one regex on representative identifiers and on growing worst-case inputs.
+
+    Worst-case inputs are a pumped character followed by one that fails the
+    match (where backtracking explodes); growth stops once a single match
+    takes ``budget`` seconds, so an exponential pattern costs a few times
+    the budget to profile, not forever.
+    """
+    try:
+        fullmatch = re.compile(pattern).fullmatch
+    except re.error:
+        return {"typical_us": 0.0, "worst_ms": 0.0, "worst_length": 0, "exceeded": False}
+    typical = 0.0
+    if identifiers:
+        started = time.perf_counter()
+        for value in identifiers:
+            fullmatch(value)
+        typical = (time.perf_counter() - started) / len(identifiers)
+    worst, worst_length, exceeded = 0.0, 0, False
+    for pump in _pumps(pattern):
+        for tail in ("\n", "!"):
+            n = 4
+            while n <= max_length:
+                value = pump * n + tail
+                started = time.perf_counter()
+                fullmatch(value)
+                elapsed = time.perf_counter() - started
+                if elapsed > worst:
+                    worst, worst_length = elapsed, len(value)
+                if elapsed >= budget:
+                    exceeded = True
+                    break
+                # small steps while exponential blowup is still possible, then doubling
+                n = n + 2 if n < 32 else n * 2
+            if exceeded:
+                break
+        if exceeded:
+            break
+    return {"typical_us": round(typical * 1e6, 2), "worst_ms": round(worst * 1e3, 3),
+            "worst_length": worst_length, "exceeded": exceeded}
+
+def profile_patterns(rules: Rules, identifiers: Optional[Sequence[str]] = None, budget: float = 0.05,
+                     top: Optional[int] = None) -> List[Dict]:
+    """Regex rules ranked by worst-case match time, most expensive first.
+
+    ``identifiers`` are representative names (e.g. a catalog inventory and
+    user list); each distinct pattern is profiled once whatever the number
+    of rules using it.
+    """
+    costs: Dict[str, Dict] = {}
+    ranked = []
+    for tier, index, field, pattern in _patterns(_rules(rules)):
+        if compile_pattern(pattern).kind != REGEX:
+            continue
+        cost = costs.get(pattern)
+        if cost is None:
+            cost = costs[pattern] = pattern_cost(pattern, identifiers or (), budget)
+        flags = analyze_pattern(pattern)
+        ranked.append({"tier": tier, "index": index, "field": field, "pattern": pattern, **cost,
+                       "flagged": flags[0][0] if flags else None})
+    ranked.sort(key=lambda r: (-r["worst_ms"], -r["typical_us"], r["tier"], r["index"]))
+    return ranked[:top] if top is not None else ranked
+
+def check_pattern(pattern: str, max_length: int = MAX_PATTERN_LENGTH, timeout: float = 0.05) -> None:
+    """Bounded mode for untrusted patterns: raise UnsafePatternError if one may stall matching.
+
+    Regex patterns longer than ``max_length`` are rejected. A flagged
+    pattern is rejected outright, unless the ``regex`` module is installed:
+    then it is run against worst-case inputs under a timeout and only
+    rejected if one of them times out.
+    """
+    if compile_pattern(pattern).kind != REGEX:
+        return
+    if len(pattern) > max_length:
+        raise UnsafePatternError(f"pattern longer than {max_length} characters: {pattern[:40]!r}...")
+    flags = analyze_pattern(pattern)
+    if not flags:
+        return
+    if HAS_REGEX:
+        try:
+            compiled = regex.compile(pattern)
+            for pump in _pumps(pattern):
+                compiled.fullmatch(pump * 64 + "!", timeout=timeout)
+                compiled.fullmatch(pump * 64 + "\n", timeout=timeout)
+            return
+        except (TimeoutError, regex.error):
+            pass  # timed out, or regex's syntax differs from re's: keep the static verdict
+    raise UnsafePatternError(f"{flags[0][0]} backtracking in {pattern!r}: {flags[0][1]}")
+
+def check_rules(rules: Rules, max_length: int = MAX_PATTERN_LENGTH) -> None:
+    """check_pattern on every rule pattern; usable as a RuleStore ``validate`` hook."""
+    for tier, index, field, pattern in _patterns(_rules(rules)):
+        try:
+            check_pattern(pattern, max_length)
+        except UnsafePatternError as e:
+            raise UnsafePatternError(f"{tier}[{index}].{field}: {e}") from None
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Flag and profile ACL regexes that may backtrack catastrophically.")
+    ap.add_argument("rules", help="rules JSON")
+    ap.add_argument("--identifiers", help="file with one representative name per line")
+    ap.add_argument("--top", type=int, default=20)
+    args = ap.parse_args(argv)
+    with open(args.rules, "rb") as f:
+        rules = load_rules_stream(f.read())
+    identifiers = None
+    if args.identifiers:
+        with open(args.identifiers, "r", encoding="utf-8") as f:
+            identifiers = [line.strip() for line in f if line.strip()]
+    print(json.dumps({"flagged": scan_rules(rules), "costliest": profile_patterns(rules, identifiers, top=args.top)},
+                     indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+from __future__ import annotations
+import hashlib
+import os
+import threading
+from typing import Callable, Optional
+from .cache import DecisionCache
+from .compiled import CompiledRuleSet
+from .evaluator import _effective_access
+from .models import AccessControlRules
+from .parser import load_rules_stream
+
+class RuleStore:
+    """Holds the live CompiledRuleSet and swaps in new versions atomically.
+
+    Readers take ``store.current`` once per request and keep using that
+    object, so a swap never affects an evaluation already in progress. New
+    versions are parsed, compiled and warmed by the caller (normally the
+    watcher thread) before the swap; a version that fails to load or fails
+    ``validate`` is discarded and the old one keeps serving.
+    """
+
+    def __init__(self, rules: Optional[AccessControlRules] = None, cache: Optional[DecisionCache] = None,
+                 validate: Optional[Callable[[CompiledRuleSet], None]] = None, warm_size: int = 10_000):
+        self.current = CompiledRuleSet(rules or AccessControlRules.empty())
+        self.previous: Optional[CompiledRuleSet] = None
+        self.cache = cache
+        self.validate = validate
+        self.warm_size = warm_size
+        self.last_error: Optional[str] = None
+        self.reloads = 0
+        self._lock = threading.Lock()
+
+    def load_bytes(self, raw: bytes) -> bool:
+        try:
+            compiled = CompiledRuleSet(load_rules_stream(raw), version=hashlib.sha256(raw).hexdigest())
+            if self.validate is not None:
+                self.validate(compiled)
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            return False
+        self.swap(compiled)
+        return True
+
+    def load_file(self, path: str) -> bool:
+        with open(path, "rb") as f:
+            return self.load_bytes(f.read())
+
+    def swap(self, compiled: CompiledRuleSet) -> None:
+        with self._lock:
+            if compiled.version == self.current.version:
+                return
+            self._warm(compiled)
+            self.previous, self.current = self.current, compiled
+            self.last_error = None
+            self.reloads += 1
+
+    def rollback(self) -> bool:
+        with self._lock:
+            if self.previous is None:
+                return False
+            self._warm(self.previous)
+            self.current, self.previous = self.previous, self.current
+            return True
+
+    def _warm(self, compiled: CompiledRuleSet) -> None:
+        # re-decide the hottest cached keys against the new version so the
+        # swap does not start from an empty cache
+        if self.cache is None or not self.warm_size:
+            return
+        entries = []
+        for key in self.cache.recent_keys(self.warm_size):
+            user, groups, roles, catalog, schema, table = key
+            entries.append((key, _effective_access(compiled, user, groups, roles, catalog, schema, table)))
+        self.cache.replace(compiled.version, entries)
+
+class FileWatcher:
+    """Polls a rules file and reloads the store when its content changes."""
+
+    def __init__(self, store: RuleStore, path: str, interval: float = 1.0):
+        self.store = store
+        self.path = path
+        self.interval = interval
+        self._stat: Optional[tuple] = None
+        self._digest: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check(self) -> bool:
+        """Reload if the file changed since the last check; True when a new version went live."""
+        try:
+            st = os.stat(self.path)
+        except OSError as e:
+            self.store.last_error = f"{type(e).__name__}: {e}"
+            return False
+        stat = (st.st_mtime_ns, st.st_size)
+        if stat == self._stat:
+            return False
+        self._stat = stat
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+        if digest == self._digest:
+            return False
+        self._digest = digest
+        return digest != self.store.current.version and self.store.load_bytes(raw)
+
+    def start(self) -> "FileWatcher":
+        self.check()
+        self._thread = threading.Thread(target=self._run, name="acl-rules-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
@@ -0,0 +1,255 @@
+from __future__ import annotations
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from .cache import DecisionCache
+from .compiled import CompiledRuleSet, ensure_compiled
+from .evaluator import Rules, effective_access_many
+from .groups import FileGroupProvider
+from .impact import effective_privileges
+from .parser import dump_rules, load_rules
+
+# Optional: SQLAlchemy engines/connections (as used by trino-monitor) stream with server-side cursors
+try:
+    from sqlalchemy import text as sa_text
+    HAS_SQLALCHEMY = True
+except Exception:
+    HAS_SQLALCHEMY = False
+
+# privilege needed on the written table, by the event listener's update_type
+UPDATE_PRIVILEGES = {
+    "INSERT": "INSERT",
+    "DELETE": "DELETE",
+    "UPDATE": "UPDATE",
+    "MERGE": "UPDATE",
+    "CREATE TABLE": "OWNERSHIP",
+    "CREATE TABLE AS": "OWNERSHIP",
+    "CREATE VIEW": "OWNERSHIP",
+    "CREATE MATERIALIZED VIEW": "OWNERSHIP",
+    "REFRESH MATERIALIZED VIEW": "UPDATE",
+    "DROP TABLE": "OWNERSHIP",
+}
+
+Check = Tuple[str, Tuple[str, ...], str, str, str, str]  # user, groups, catalog, schema, table, privilege
+
+def _is_sqlalchemy(conn) -> bool:
+    return HAS_SQLALCHEMY and hasattr(conn, "execution_options")
+
+@contextmanager
+def _sa_connection(conn):
+    # an engine is connected for the read; a caller's connection is left open
+    if hasattr(conn, "connect"):
+        with conn.connect() as c:
+            yield c
+    else:
+        yield conn
+
+def _quote(conn, name: str) -> str:
+    dialect = getattr(getattr(conn, "dialect", None), "name", "")
+    return f"`{name}`" if dialect == "mysql" or type(conn).__module__.startswith("pymysql") else f'"{name}"'
+
+def _columns(conn, table: str) -> List[str]:
+    sql = f"SELECT * FROM {table} WHERE 1 = 0"
+    if _is_sqlalchemy(conn):
+        with _sa_connection(conn) as c:
+            return [k.lower() for k in c.execute(sa_text(sql)).keys()]
+    cur = conn.cursor()
+    cur.execute(sql)
+    names = [d[0].lower() for d in cur.description]
+    cur.close()
+    return names
+
+def iter_query_rows(conn, table: str = "trino_queries", chunk_size: int = 10_000,
+                    since: Optional[Any] = None) -> Iterator[List[Dict[str, Any]]]:
+    """Rows of the event-listener table in chunks, without loading the whole table.
+
+    ``conn`` is a DB-API connection (sqlite3, pymysql, psycopg2, ...) or a
+    SQLAlchemy engine/connection, which is read with ``stream_results``.
+    ``since`` filters on create_time when the table has it.
+    """
+    available = set(_columns(conn, table))
+    wanted = [c for c in ("query_id", "user", "catalog", "schema", "inputs_json", "output_json", "update_type")
+              if c in available]
+    sql = f"SELECT {', '.join(_quote(conn, c) for c in wanted)} FROM {table}"
+    use_since = since is not None and "create_time" in available
+    if _is_sqlalchemy(conn):
+        if use_since:
+            sql += " WHERE create_time >= :since"
+        with _sa_connection(conn) as c:
+            result = c.execution_options(stream_results=True).execute(sa_text(sql), {"since": since} if use_since else {})
+            for part in result.partitions(chunk_size):
+                yield [dict(zip(wanted, row)) for row in part]
+        return
+    params: tuple = ()
+    if use_since:
+        style = getattr(sys.modules.get(type(conn).__module__.split(".")[0]), "paramstyle", "qmark")
+        sql += " WHERE create_time >= " + ("?" if style == "qmark" else "%s")
+        params = (since,)
+    cur = conn.cursor()
+    try:
+        cur.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield [dict(zip(wanted, row)) for row in rows]
+    finally:
+        cur.close()
+
+def _tables(value) -> List[Dict[str, Any]]:
+    if not value:
+        return []
+    data = json.loads(value) if isinstance(value, (str, bytes)) else value
+    return data if isinstance(data, list) else [data]
+
+def query_checks(row: Dict[str, Any], groups: Optional[Dict[str, Sequence[str]]] = None) -> List[Check]:
+    """Access checks implied by one logged query: SELECT on each input, the update privilege on the output."""
+    user = str(row.get("user") or "")
+    user_groups = tuple(groups.get(user, ())) if groups else ()
+    checks = []
+    for t in _tables(row.get("inputs_json")):
+        if t.get("catalogName") and t.get("schema") and t.get("table"):
+            checks.append((user, user_groups, t["catalogName"], t["schema"], t["table"], "SELECT"))
+    privilege = UPDATE_PRIVILEGES.get(str(row.get("update_type") or "").upper())
+    for t in _tables(row.get("output_json")) if privilege else ():
+        if t.get("catalogName") and t.get("schema") and t.get("table"):
+            checks.append((user, user_groups, t["catalogName"], t["schema"], t["table"], privilege))
+    return checks
+
+def _granted(compiled: CompiledRuleSet, checks: List[Check], cache: DecisionCache) -> Dict[Check, bool]:
+    # logs repeat the same user/table pairs, so decisions are kept across chunks
+    granted = {}
+    missing = []
+    for check in dict.fromkeys(checks):
+        value = cache.get(compiled.version, check)
+        if value is None:
+            missing.append(check)
+        else:
+            granted[check] = value
+    out = effective_access_many(compiled, [dict(user=u, groups=list(g), roles=[], catalog=c, schema=s, table=t)
+                                           for u, g, c, s, t, _ in missing])
+    for i, check in enumerate(missing):
+        granted[check] = check[5] in effective_privileges(out["catalog_allow"][i], out["schema_owner"][i],
+                                                          out["privileges"][i])
+        cache.put(compiled.version, check, granted[check])
+    return granted
+
+_worker: Dict[str, Any] = {}
+
+def _init_worker(rules_data: dict, baseline_data: Optional[dict], groups: Optional[dict]) -> None:
+    _worker["rules"] = CompiledRuleSet(load_rules(rules_data))
+    _worker["baseline"] = CompiledRuleSet(load_rules(baseline_data)) if baseline_data is not None else None
+    _worker["groups"] = groups
+    _worker["caches"] = (DecisionCache(200_000), DecisionCache(200_000))
+
+def _replay_chunk(rows: List[Dict[str, Any]]) -> Tuple[int, int, int, Dict[Check, list]]:
+    # returns rows, checks, rows without table access, and denials as check -> [count, first query id]
+    per_row = [(row.get("query_id"), query_checks(row, _worker["groups"])) for row in rows]
+    checks = [c for _, row_checks in per_row for c in row_checks]
+    rules_cache, baseline_cache = _worker["caches"]
+    granted = _granted(_worker["rules"], checks, rules_cache)
+    before = _granted(_worker["baseline"], checks, baseline_cache) if _worker["baseline"] is not None else None
+    denied: Dict[Check, list] = {}
+    for query_id, row_checks in per_row:
+        for check in set(row_checks):
+            if granted[check] or (before is not None and not before[check]):
+                continue
+            entry = denied.setdefault(check, [0, query_id])
+            entry[0] += 1
+    return len(rows), len(checks), sum(1 for _, c in per_row if not c), denied
+
+def replay(conn, rules: Rules, baseline: Optional[Rules] = None, table: str = "trino_queries",
+           chunk_size: int = 10_000, processes: int = 1, since: Optional[Any] = None,
+           groups: Optional[Dict[str, Sequence[str]]] = None) -> Dict[str, Any]:
+    """Replay logged queries through the rules and report the ones that would be denied.
+
+    With ``baseline`` (normally the live rules) only checks it allows and
+    ``rules`` denies are reported. The log has no group memberships, so
+    ``groups`` maps user -> groups when rules depend on them. Rows are
+    streamed in chunks and decided in ``processes`` workers with at most
+    two chunks per worker in flight; each worker keeps a bounded LRU of
+    decisions, so memory stays bounded by the chunk size, the caches and
+    the number of distinct denials.
+    """
+    started = time.perf_counter()
+    rules_data = dump_rules(ensure_compiled(rules).rules)
+    baseline_data = dump_rules(ensure_compiled(baseline).rules) if baseline is not None else None
+    totals = {"rows": 0, "checks": 0, "skipped": 0}
+    denied: Dict[Check, list] = {}
+
+    def merge(result) -> None:
+        rows, checks, skipped, chunk_denied = result
+        totals["rows"] += rows
+        totals["checks"] += checks
+        totals["skipped"] += skipped
+        for check, (count, query_id) in chunk_denied.items():
+            entry = denied.setdefault(check, [0, query_id])
+            entry[0] += count
+
+    chunks = iter_query_rows(conn, table, chunk_size, since)
+    if processes <= 1:
+        _init_worker(rules_data, baseline_data, groups)
+        for rows in chunks:
+            merge(_replay_chunk(rows))
+    else:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(rules_data, baseline_data, groups)) as pool:
+            pending = set()
+            for rows in chunks:
+                pending.add(pool.submit(_replay_chunk, rows))
+                if len(pending) >= processes * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        merge(future.result())
+            for future in pending:
+                merge(future.result())
+
+    report = [{"user": u, "catalog": c, "schema": s, "table": t, "privilege": p, "queries": count,
+               "example_query_id": query_id}
+              for (u, _, c, s, t, p), (count, query_id) in denied.items()]
+    report.sort(key=lambda r: (-r["queries"], r["user"], r["catalog"], r["schema"], r["table"], r["privilege"]))
+    by_user: Dict[str, int] = {}
+    for r in report:
+        by_user[r["user"]] = by_user.get(r["user"], 0) + r["queries"]
+    return {**totals, "denied": report, "by_user": dict(sorted(by_user.items(), key=lambda kv: -kv[1])),
+            "seconds": round(time.perf_counter() - started, 3)}
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Replay the trino_queries event log through an ACL rules file.")
+    ap.add_argument("rules", help="proposed rules JSON")
+    ap.add_argument("database", help="SQLAlchemy URL, or a path to a SQLite copy of the table")
+    ap.add_argument("--baseline", help="current rules JSON; only report newly denied checks")
+    ap.add_argument("--table", default="trino_queries")
+    ap.add_argument("--groups", help="JSON object mapping user -> list of groups, or a Trino group file, CSV or LDIF")
+    ap.add_argument("--since", help="only queries with create_time >= this value")
+    ap.add_argument("--chunk-size", type=int, default=10_000)
+    ap.add_argument("--processes", type=int, default=1)
+    args = ap.parse_args(argv)
+
+    def read(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def read_groups(path):
+        return read(path) if path.lower().endswith(".json") else FileGroupProvider(path, interval=0).user_groups
+
+    if "://" in args.database:
+        if not HAS_SQLALCHEMY:
+            raise SystemExit("SQLAlchemy is not installed. Install 'SQLAlchemy' or pass a SQLite file path.")
+        from sqlalchemy import create_engine
+        conn = create_engine(args.database)
+    else:
+        import sqlite3
+        conn = sqlite3.connect(args.database)
+    result = replay(conn, load_rules(read(args.rules)),
+                    baseline=load_rules(read(args.baseline)) if args.baseline else None,
+                    table=args.table, chunk_size=args.chunk_size, processes=args.processes,
+                    since=args.since, groups=read_groups(args.groups) if args.groups else None)
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+from __future__ import annotations
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from .analysis import EXACT, pattern_contains
+from .compiled import LITERAL, CompiledRule, CompiledRuleSet, compile_pattern, ensure_compiled
+from .evaluator import PRIVS, Rules
+
+Principal = Tuple[str, Tuple[str, ...], Tuple[str, ...]]
+
+def _object_rules(tier: List[CompiledRule], index, key: str, values: tuple) -> List[int]:
+    return [pos for pos in index.candidates(key) if tier[pos].object_matches(*values)]
+
+def _decide(compiled: CompiledRuleSet, matched: tuple, applies: Callable[[int, int, CompiledRule], bool],
+            privilege: str) -> bool:
+    # first applicable rule per tier among the object-matching positions
+    found = []
+    for t, (tier, positions) in enumerate(zip((compiled.catalogs, compiled.schemas, compiled.tables), matched)):
+        found.append(next((pos for pos in positions if applies(t, pos, tier[pos])), None))
+    return _granted(compiled, *found, privilege)
+
+def _granted(compiled: CompiledRuleSet, cat: Optional[int], sch: Optional[int], tbl: Optional[int],
+             privilege: str) -> bool:
+    # same decision as evaluator.has_privilege, from matched rule positions
+    allow = compiled.catalogs[cat].outcome if cat is not None else "none"
+    if allow == "none" or (allow == "read-only" and privilege not in ("SELECT", "CREATE_VIEW")):
+        return False
+    if sch is not None and compiled.schemas[sch].outcome:
+        return True
+    return tbl is not None and privilege in compiled.tables[tbl].outcome
+
+def _everyone(rule: CompiledRule) -> bool:
+    # a user pattern covering every name applies to every principal, like a rule without identity;
+    # role patterns don't: a principal without roles matches none of them
+    return rule.anyone or (rule.user is not None and pattern_contains(rule.user, compile_pattern(".*")) == EXACT)
+
+def _identity_text(rule: CompiledRule) -> Dict[str, Optional[str]]:
+    return {f: (getattr(rule, f).pattern if getattr(rule, f) is not None else None) for f in ("user", "group", "role")}
+
+def who_can(rules: Rules, catalog: str, schema: str, table: str, privilege: str = "SELECT",
+            directory: Optional[Sequence[Principal]] = None) -> Dict:
+    """Reverse lookup: which identities hold ``privilege`` on one table.
+
+    Each tier is walked once to find the rules whose object patterns match;
+    only those can decide the outcome, in rule order. From them:
+
+    * ``rules`` lists every table rule that matches the object, whether it
+      grants the privilege and whether an earlier rule that applies to
+      everyone (no identity, or a user pattern such as ``.*``) shadows it;
+    * ``groups`` are the groups whose membership alone grants access
+      (literal group patterns, plus directory groups for regex patterns);
+    * ``users`` are the directory principals that are granted access, decided
+      exactly from their first matching rule per tier;
+    * ``anyone`` tells whether a principal matching no identity pattern gets it.
+    """
+    if privilege not in PRIVS:
+        raise ValueError(f"unknown privilege {privilege!r}")
+    compiled = ensure_compiled(rules)
+    cats = _object_rules(compiled.catalogs, compiled.catalog_index, catalog, (catalog,))
+    schs = _object_rules(compiled.schemas, compiled.schema_index, schema, (catalog, schema))
+    tbls = _object_rules(compiled.tables, compiled.table_index, table, (catalog, schema, table))
+
+    report = []
+    shadowed = False
+    for pos in tbls:
+        rule = compiled.tables[pos]
+        report.append(dict(index=pos, **_identity_text(rule), grants=privilege in rule.outcome,
+                           reachable=not shadowed))
+        shadowed = shadowed or _everyone(rule)
+
+    matched = (cats, schs, tbls)
+    users: List[str] = []
+    for user, groups, roles in directory or ():
+        view = compiled.principal_view(user, groups, roles)
+        bits = (view.bits["catalogs"], view.bits["schemas"], view.bits["tables"])
+        if _decide(compiled, matched, lambda t, pos, _rule: bits[t][pos >> 3] >> (pos & 7) & 1, privilege):
+            users.append(user)
+
+    candidates = {r.group.pattern for tier, positions in zip((compiled.catalogs, compiled.schemas, compiled.tables), matched)
+                  for r in (tier[p] for p in positions) if r.group is not None and r.group.kind == LITERAL}
+    candidates.update(g for _, groups, _ in directory or () for g in groups)
+    groups_granted = [group for group in sorted(candidates)
+                      if _decide(compiled, matched, lambda _t, _pos, rule: _everyone(rule) or
+                                 (rule.group is not None and rule.group.match(group)), privilege)]
+
+    return {
+        "object": f"{catalog}.{schema}.{table}",
+        "privilege": privilege,
+        "users": sorted(set(users)),
+        "groups": groups_granted,
+        "anyone": _decide(compiled, matched, lambda _t, _pos, rule: _everyone(rule), privilege),
+        "rules": report,
+    }
@@ -0,0 +1,117 @@
+from __future__ import annotations
+import hashlib
+import hmac
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+from .cache import DecisionCache
+from .compiled import CompiledRuleSet
+from .models import AccessControlRules
+from .opa import decide, decide_batch
+from .parser import load_rules_stream
+from .redos import check_rules
+from .reload import FileWatcher, RuleStore
+
+# Optional service dependencies; the decision logic in acl.opa works without them
+try:
+    from fastapi import FastAPI, HTTPException, Request
+    from fastapi.concurrency import run_in_threadpool
+    HAS_FASTAPI = True
+except Exception:
+    HAS_FASTAPI = False
+
+# Trino OPA plugin settings for this service:
+#   opa.policy.uri=http://<host>:8181/v1/data/trino/allow
+#   opa.policy.batched-uri=http://<host>:8181/v1/data/trino/batch
+
+def load_compiled(path: Optional[str]) -> CompiledRuleSet:
+    if not path:
+        return CompiledRuleSet(AccessControlRules.empty())
+    with open(path, "rb") as f:
+        raw = f.read()
+    # versioned by file content, the same way FileWatcher reloads are
+    return CompiledRuleSet(load_rules_stream(raw), version=hashlib.sha256(raw).hexdigest())
+
+LOOPBACK = {"127.0.0.1", "::1", "localhost"}
+
+def create_app(rules_path: Optional[str] = None, cache_size: int = 200_000, watch_interval: Optional[float] = None,
+               admin_token: Optional[str] = None):
+    """FastAPI app answering Trino OPA requests from a rules JSON file.
+
+    Run with ``ACL_RULES_FILE=rules.json uvicorn --factory acl.service:create_app --port 8181``.
+    The file is watched (``ACL_WATCH_INTERVAL`` seconds, default 2, 0 disables)
+    and new versions are swapped in atomically once they load and compile.
+    With ``ACL_BOUNDED_PATTERNS=1`` rules files with regexes that may
+    backtrack catastrophically are rejected (see acl.redos.check_rules).
+    ``/reload`` and ``/rollback`` change the live policy: they need
+    ``Authorization: Bearer <ACL_ADMIN_TOKEN>``, or without a token
+    configured are only answered to loopback clients.
+    """
+    if not HAS_FASTAPI:
+        raise RuntimeError("FastAPI is not installed. Install 'fastapi' and 'uvicorn' to run the decision service.")
+    rules_path = rules_path or os.getenv("ACL_RULES_FILE")
+    if watch_interval is None:
+        watch_interval = float(os.getenv("ACL_WATCH_INTERVAL", "2"))
+    bounded = os.getenv("ACL_BOUNDED_PATTERNS", "0") not in ("", "0", "false")
+    admin_token = admin_token or os.getenv("ACL_ADMIN_TOKEN") or None
+    cache = DecisionCache(maxsize=cache_size)
+    store = RuleStore(cache=cache, validate=check_rules if bounded else None)
+    if rules_path:
+        compiled = load_compiled(rules_path)
+        if bounded:
+            check_rules(compiled)
+        store.swap(compiled)
+    watcher = FileWatcher(store, rules_path, watch_interval) if rules_path and watch_interval > 0 else None
+
+    @asynccontextmanager
+    async def lifespan(app):
+        if watcher is not None:
+            watcher.start()
+        yield
+        if watcher is not None:
+            watcher.stop()
+
+    app = FastAPI(title="Trino ACL decision service", lifespan=lifespan)
+    app.state.store = store
+
+    # decisions are CPU-bound; evaluate them in the threadpool so the event loop keeps serving
+    @app.post("/v1/data/trino/allow")
+    async def allow(request: Request):
+        body = await request.json()
+        return {"result": await run_in_threadpool(decide, store.current, body, cache)}
+
+    @app.post("/v1/data/trino/batch")
+    async def batch(request: Request):
+        body = await request.json()
+        return {"result": await run_in_threadpool(decide_batch, store.current, body, cache)}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "version": store.current.version, "reloads": store.reloads,
+                "last_error": store.last_error}
+
+    def require_admin(request: Request) -> None:
+        if admin_token is None:
+            if request.client is None or request.client.host not in LOOPBACK:
+                raise HTTPException(403, "admin endpoints are loopback-only unless ACL_ADMIN_TOKEN is set")
+            return
+        given = request.headers.get("authorization", "")
+        if not hmac.compare_digest(given.encode(), f"Bearer {admin_token}".encode()):
+            raise HTTPException(401, "invalid or missing admin token", headers={"WWW-Authenticate": "Bearer"})
+
+    @app.post("/reload")
+    def reload(request: Request):
+        require_admin(request)
+        ok = store.load_file(rules_path) if rules_path else False
+        return {"reloaded": ok, "version": store.current.version, "last_error": store.last_error}
+
+    @app.post("/rollback")
+    def rollback(request: Request):
+        require_admin(request)
+        return {"rolled_back": store.rollback(), "version": store.current.version}
+
+    @app.get("/stats")
+    async def stats():
+        return cache.stats()
+
+    return app
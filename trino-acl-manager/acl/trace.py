@@ -0,0 +1,105 @@
+from __future__ import annotations
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence
+from .compiled import CompiledRuleSet
+
+ACCESS_TIERS = {"catalogs": ("catalog",), "schemas": ("catalog", "schema"), "tables": ("catalog", "schema", "table")}
+TRACE_LIMIT = 200
+
+def explain_tier(compiled: CompiledRuleSet, tier: str, user: str, groups: Sequence[str], roles: Sequence[str],
+                 values: tuple, limit: int = TRACE_LIMIT) -> Dict:
+    """Replay one tier's first-match scan rule by rule, recording why each rule was skipped.
+
+    This is the reference linear scan, not the evaluator's bitmask path:
+    ``examined`` is how many rules a linear scan reads before deciding. At
+    most ``limit`` skipped rules are listed; the counts cover all of them.
+    """
+    fields = ACCESS_TIERS[tier]
+    rules = getattr(compiled, tier)
+    skipped = {"identity": 0, "pattern": 0}
+    trace: List[Dict] = []
+    matched = None
+    for pos, rule in enumerate(rules):
+        if not rule.identity_matches(user, groups, roles):
+            entry = {"index": pos, "reason": "identity"}
+        else:
+            miss = next((i for i, (pat, value) in enumerate(zip(rule.objects, values)) if not pat.match(value)), None)
+            if miss is None:
+                matched = pos
+                break
+            entry = {"index": pos, "reason": "pattern", "field": fields[miss],
+                     "pattern": rule.objects[miss].pattern, "value": values[miss]}
+        skipped[entry["reason"]] += 1
+        if len(trace) < limit:
+            trace.append(entry)
+    return {"examined": matched + 1 if matched is not None else len(rules), "matched": matched,
+            "skipped": skipped, "trace": trace, "truncated": sum(skipped.values()) > len(trace)}
+
+class HitCounter:
+    """Cumulative first-match counts per rule across batch evaluations.
+
+    Rules are counted by tier and content rather than position, so counts
+    stay with a rule when it is moved or other rules are edited between
+    runs. Pass one to ``effective_access_many(..., hits=counter)``.
+    The content keys are built once per compiled rule set.
+    """
+
+    def __init__(self):
+        self.counts: Dict[tuple, int] = {}
+        self.misses = {tier: 0 for tier in ACCESS_TIERS}
+        self.checks = 0
+        self._keyed: Optional[tuple] = None  # (compiled, {tier: key per position})
+
+    def _keys(self, compiled: CompiledRuleSet) -> Dict[str, List[tuple]]:
+        if self._keyed is None or self._keyed[0] is not compiled:
+            keys = {tier: [(tier, rule.model_dump_json()) for rule in getattr(compiled.rules, tier)]
+                    for tier in ACCESS_TIERS}
+            self._keyed = (compiled, keys)
+        return self._keyed[1]
+
+    def record(self, compiled: CompiledRuleSet, tier: str, positions: Iterable[Optional[int]]) -> None:
+        keys = self._keys(compiled)[tier]
+        for pos, n in Counter(positions).items():
+            if pos is None:
+                self.misses[tier] += n
+                continue
+            key = keys[pos]
+            self.counts[key] = self.counts.get(key, 0) + n
+
+    def record_batch(self, compiled: CompiledRuleSet, out: Dict[str, list]) -> None:
+        """Count the matched rules of an effective_access_many result (column form)."""
+        self.checks += len(out["catalog"])
+        self.record(compiled, "catalogs", out["catalog_rule"])
+        self.record(compiled, "schemas", (p for p, s in zip(out["schema_rule"], out["schema"]) if s is not None))
+        self.record(compiled, "tables", (p for p, t in zip(out["table_rule"], out["table"]) if t is not None))
+
+    def hot_rules(self, compiled: CompiledRuleSet, top: Optional[int] = None) -> List[Dict]:
+        """Rules of the current version by hits, most hit first."""
+        out = []
+        keys = self._keys(compiled)
+        for tier in ACCESS_TIERS:
+            seen = set()
+            for pos, key in enumerate(keys[tier]):
+                if key in seen:
+                    continue  # an identical earlier rule always matches first
+                seen.add(key)
+                hits = self.counts.get(key)
+                if hits:
+                    out.append({"tier": tier, "index": pos, "hits": hits,
+                                "share": round(hits / self.checks, 4) if self.checks else 0.0})
+        out.sort(key=lambda r: (-r["hits"], r["tier"], r["index"]))
+        return out[:top] if top is not None else out
+
+    def summary(self, compiled: CompiledRuleSet) -> Dict[str, Dict]:
+        """Per tier: hits, misses and the mean number of rules a linear scan reads per decision."""
+        out = {}
+        hot = self.hot_rules(compiled)
+        for tier in ACCESS_TIERS:
+            rows = [r for r in hot if r["tier"] == tier]
+            hits = sum(r["hits"] for r in rows)
+            misses = self.misses[tier]
+            # a miss reads every rule of the tier
+            scanned = sum(r["hits"] * (r["index"] + 1) for r in rows) + misses * len(getattr(compiled, tier))
+            out[tier] = {"hits": hits, "misses": misses,
+                         "mean_examined": round(scanned / (hits + misses), 2) if hits + misses else 0.0}
+        return out
@@ -1,75 +1,159 @@
 import streamlit as st
+import csv
+import hashlib
+import io
 import json
-from typing import List
-from acl.models import AccessControlRules, CatalogAccessControlRule, CatalogSchemaAccessControlRule, TableAccessControlRule, Privilege
-from acl.parser import load_rules, dump_rules
-from acl.evaluator import effective_access
+from typing import List, Optional
+from acl.models import AccessControlRules
+from acl.parser import dump_rules_json, load_rules_stream, rules_fingerprint
+from acl.evaluator import PRIVS, effective_access, effective_access_many
+from acl.matrix import principals_from_rows
+from acl.reverse import who_can
+from acl.analysis import find_shadowed, minimize_rules
+from acl.optimize import optimize_for_trino
+from acl.reorder import reorder_rules
+from acl.compiled import CompiledRuleSet
+from acl.cache import DecisionCache
+from acl.editor import GRID_TIERS, apply_grid_edits, rule_row, search_positions
+from acl.history import RulesHistory
+from acl.impact import impact
+from acl.redos import profile_patterns, scan_rules
+from acl.trace import HitCounter
+from acl.groups import GroupIndex, detect_format
 
 st.set_page_config(page_title="Trino ACL Manager", layout="wide")
 st.title("🔐 Trino ACL Manager (File-based)")
 
+if "rules" not in st.session_state:
+    st.session_state.rules = AccessControlRules.empty()
+    st.session_state.rules_version = 0
+    st.session_state.history = RulesHistory(st.session_state.rules)
+
+def bump_rules_version(label: Optional[str] = "edit") -> None:
+    # label=None when the rules came out of the history (undo/redo/restore)
+    st.session_state.rules_version += 1
+    if label is not None:
+        st.session_state.history.record(st.session_state.rules, label)
+
+def set_rules_from_history(rules: Optional[AccessControlRules]) -> None:
+    if rules is not None:
+        st.session_state.rules = rules
+        bump_rules_version(None)
+
+def rules_json() -> bytes:
+    # serialized once per rules version instead of on every rerun
+    cached = st.session_state.get("rules_json")
+    if cached is None or cached[0] != st.session_state.rules_version:
+        cached = st.session_state.rules_json = (st.session_state.rules_version,
+                                                dump_rules_json(st.session_state.rules))
+    return cached[1]
+
+def regex_findings() -> list:
+    # scanned once per rules version, like rules_json
+    cached = st.session_state.get("regex_findings")
+    if cached is None or cached[0] != st.session_state.rules_version:
+        cached = st.session_state.regex_findings = (st.session_state.rules_version, scan_rules(st.session_state.rules))
+    return cached[1]
+
 with st.sidebar:
     st.header("Rules JSON")
     uploaded = st.file_uploader("Load ACL JSON", type=["json"])
-    if "rules" not in st.session_state:
-        st.session_state.rules = AccessControlRules.empty()
     if uploaded:
-        try:
-            obj = json.load(uploaded)
-            st.session_state.rules = load_rules(obj)
-            st.success("Loaded rules")
-        except Exception as e:
-            st.error(f"Failed to load: {e}")
+        raw = uploaded.getvalue()
+        digest = hashlib.sha256(raw).hexdigest()
+        # parse a file once; later reruns keep the edits made since
+        if st.session_state.get("uploaded_digest") != digest:
+            try:
+                st.session_state.rules = load_rules_stream(raw)
+                st.session_state.uploaded_digest = digest
+                bump_rules_version(f"load {uploaded.name}")
+                st.success("Loaded rules")
+                if regex_findings():
+                    st.warning(f"{len(regex_findings())} pattern(s) may backtrack catastrophically; see Edit Rules")
+            except ValueError as e:
+                st.error(f"Failed to load: {e}")
 
-    data = dump_rules(st.session_state.rules)
-    st.download_button("Save rules.json", json.dumps(data, indent=2), file_name="rules.json", mime="application/json")
+    st.download_button("Save rules.json", rules_json(), file_name="rules.json", mime="application/json")
+    st.checkbox("Reject unsafe regex patterns in edits", key="bounded_patterns",
+                help="Nested quantifiers such as (a+)+ can stall evaluation on long names")
 
-tabs = st.tabs(["Edit Rules", "Evaluate Access", "Preview JSON"])
+    st.header("History")
+    history = st.session_state.history
+    cols = st.columns(2)
+    cols[0].button("↶ Undo", disabled=not history.can_undo, on_click=lambda: set_rules_from_history(history.undo()))
+    cols[1].button("↷ Redo", disabled=not history.can_redo, on_click=lambda: set_rules_from_history(history.redo()))
+    checkpoint_name = st.text_input("Checkpoint name", key="checkpoint_name")
+    if st.button("Save checkpoint", disabled=not checkpoint_name):
+        history.checkpoint(checkpoint_name)
+    if history.checkpoints:
+        restore_name = st.selectbox("Checkpoints", options=list(history.checkpoints), key="restore_name")
+        st.button("Restore checkpoint", on_click=lambda: set_rules_from_history(history.restore(restore_name)))
 
-with tabs[0]:
-    st.subheader("Catalog Rules")
-    for i, rule in enumerate(list(st.session_state.rules.catalogs)):
-        cols = st.columns(5)
-        rule.catalog = cols[0].text_input(f"catalog pattern {i}", value=rule.catalog, key=f"cat_{i}_catalog")
-        rule.allow = cols[1].selectbox(f"allow {i}", options=["all","read-only","none"], index=["all","read-only","none"].index(rule.allow), key=f"cat_{i}_allow")
-        rule.user = cols[2].text_input(f"user regex {i}", value=rule.user or "", key=f"cat_{i}_user") or None
-        rule.group = cols[3].text_input(f"group regex {i}", value=rule.group or "", key=f"cat_{i}_group") or None
-        rule.role = cols[4].text_input(f"role regex {i}", value=rule.role or "", key=f"cat_{i}_role") or None
-    if st.button("➕ Add catalog rule"):
-        st.session_state.rules.catalogs.append(CatalogAccessControlRule(catalog=".*", allow="read-only"))
+def compiled_rules() -> CompiledRuleSet:
+    # recompile only when the rules content changed since the last rerun
+    compiled = st.session_state.get("compiled")
+    if compiled is None or st.session_state.get("compiled_for") != st.session_state.rules_version:
+        version = rules_fingerprint(st.session_state.rules)
+        if compiled is None or compiled.version != version:
+            compiled = CompiledRuleSet(st.session_state.rules, version=version)
+            st.session_state.compiled = compiled
+        st.session_state.compiled_for = st.session_state.rules_version
+    return compiled
 
-    st.markdown("---")
-    st.subheader("Schema Rules (ownership)")
-    for i, rule in enumerate(list(st.session_state.rules.schemas)):
-        cols = st.columns(6)
-        rule.catalog = cols[0].text_input(f"catalog {i}", value=rule.catalog, key=f"sch_{i}_catalog")
-        rule.schema = cols[1].text_input(f"schema {i}", value=rule.schema, key=f"sch_{i}_schema")
-        rule.owner = cols[2].checkbox(f"owner {i}", value=rule.owner, key=f"sch_{i}_owner")
-        rule.user = cols[3].text_input(f"user {i}", value=rule.user or "", key=f"sch_{i}_user") or None
-        rule.group = cols[4].text_input(f"group {i}", value=rule.group or "", key=f"sch_{i}_group") or None
-        rule.role = cols[5].text_input(f"role {i}", value=rule.role or "", key=f"sch_{i}_role") or None
-    if st.button("➕ Add schema rule"):
-        st.session_state.rules.schemas.append(CatalogSchemaAccessControlRule(catalog="hive", schema="default", owner=True))
+if "decision_cache" not in st.session_state:
+    st.session_state.decision_cache = DecisionCache(maxsize=10_000)
+if "hit_counter" not in st.session_state:
+    st.session_state.hit_counter = HitCounter()
+
+tabs = st.tabs(["Edit Rules", "Evaluate Access", "Who Can Access", "Preview JSON"])
+
+def apply_grid(tier: str, positions: List[int], key: str) -> None:
+    # data_editor on_change: apply the edit state as a diff, then a new
+    # rules version gives the grid a fresh key so edits are not re-applied
+    try:
+        if apply_grid_edits(st.session_state.rules, tier, positions, st.session_state[key],
+                            bounded=st.session_state.get("bounded_patterns", False)):
+            bump_rules_version()
+    except ValueError as e:
+        st.session_state.grid_error = str(e)
 
+def rule_grid(tier: str, title: str) -> None:
+    import pandas as pd
+    st.subheader(title)
+    rules = st.session_state.rules
+    cols = st.columns([3, 3, 2, 2])
+    pattern = cols[0].text_input("Object pattern contains", key=f"{tier}_search_pattern")
+    identity = cols[1].text_input("User/group/role contains", key=f"{tier}_search_identity")
+    privilege = cols[2].selectbox("Privilege", options=[""] + PRIVS, key=f"{tier}_search_priv") if tier == "tables" else None
+    page_size = cols[3].selectbox("Rows per page", options=[50, 100, 500], key=f"{tier}_page_size")
+    positions = search_positions(rules, tier, pattern, identity, privilege or None)
+    pages = max(1, -(-len(positions) // page_size))
+    if st.session_state.get(f"{tier}_page", 1) > pages:
+        st.session_state[f"{tier}_page"] = pages
+    page = st.number_input(f"Page (of {pages}, {len(positions)} of {len(getattr(rules, tier))} rules)",
+                           min_value=1, max_value=pages, value=1, key=f"{tier}_page")
+    shown = positions[(page - 1) * page_size:page * page_size]
+    tier_rules = getattr(rules, tier)
+    rows = pd.DataFrame([rule_row(tier, pos, tier_rules[pos]) for pos in shown], columns=("#",) + GRID_TIERS[tier])
+    key = f"grid_{tier}_{page}_{st.session_state.rules_version}"
+    config = {"#": st.column_config.NumberColumn("#", disabled=True)}
+    if tier == "catalogs":
+        config["allow"] = st.column_config.SelectboxColumn("allow", options=["all", "read-only", "none"], required=True)
+    st.data_editor(rows, key=key, num_rows="dynamic", hide_index=True, use_container_width=True,
+                   column_config=config, on_change=apply_grid, args=(tier, shown, key))
+
+with tabs[0]:
+    if "grid_error" in st.session_state:
+        st.error(st.session_state.pop("grid_error"))
+    if regex_findings():
+        st.warning("Patterns that may backtrack catastrophically (slow on long names):")
+        st.dataframe(regex_findings(), use_container_width=True)
+    rule_grid("catalogs", "Catalog Rules")
     st.markdown("---")
-    st.subheader("Table Rules (privileges)")
-    for i, rule in enumerate(list(st.session_state.rules.tables)):
-        cols = st.columns(7)
-        rule.catalog = cols[0].text_input(f"catalog {i}", value=rule.catalog, key=f"tbl_{i}_catalog")
-        rule.schema  = cols[1].text_input(f"schema {i}",  value=rule.schema,  key=f"tbl_{i}_schema")
-        rule.table   = cols[2].text_input(f"table {i}",   value=rule.table,   key=f"tbl_{i}_table")
-        current = set(rule.privileges)
-        choices: List[Privilege] = ["SELECT","INSERT","DELETE","UPDATE","OWNERSHIP","GRANT_SELECT","CREATE_VIEW"]
-        selected = []
-        # spread checkboxes across remaining columns
-        for j, p in enumerate(choices):
-            if cols[3 + (j % 4)].checkbox(f"{p} {i}", value=(p in current), key=f"tbl_{i}_{p}"):
-                selected.append(p)
-        rule.privileges = selected
-    if st.button("➕ Add table rule"):
-        st.session_state.rules.tables.append(TableAccessControlRule(catalog="hive", schema="default", table=".*", privileges=["SELECT"]))
-
-    st.info("Order matters (first match wins). Add rules in desired order.")
+    rule_grid("schemas", "Schema Rules (ownership)")
+    st.markdown("---")
+    rule_grid("tables", "Table Rules (privileges)")
+    st.info("Order matters (first match wins). New rows are inserted after the last rule shown.")
 
 with tabs[1]:
     st.subheader("Evaluate Effective Access")
@@ -79,18 +163,182 @@ with tabs[1]:
     catalog = st.text_input("Catalog", value="hive")
     schema = st.text_input("Schema (optional)", value="default")
     table = st.text_input("Table (optional)", value="orders")
+    group_file = st.file_uploader("Group memberships (Trino group file, CSV or LDIF)", type=["txt", "csv", "ldif"],
+                                  key="group_file")
+    if group_file:
+        raw = group_file.getvalue()
+        digest = hashlib.sha256(raw).hexdigest()
+        fmt = detect_format(group_file.name)
+        if st.session_state.get("group_digest") != digest:
+            # a new version of the same kind of file only re-parses the changed lines/entries
+            if getattr(st.session_state.get("group_index"), "fmt", None) != fmt:
+                st.session_state.group_index = GroupIndex(fmt)
+            st.session_state.group_index.update(raw.decode("utf-8"))
+            st.session_state.group_digest = digest
+    elif "group_index" in st.session_state:
+        del st.session_state["group_index"], st.session_state["group_digest"]
+    group_index = st.session_state.get("group_index")
+    if group_index is not None:
+        st.caption(f"{len(group_index.user_groups)} users in {len(group_index.group_users)} groups; "
+                   f"{user} is in: {', '.join(sorted(group_index.groups_for(user))) or '—'}")
+    explain = st.checkbox("Explain (rules examined, skip reasons, timings)")
 
     if st.button("Evaluate"):
-        res = effective_access(st.session_state.rules, user, [g.strip() for g in groups.split(",") if g.strip()],
+        res = effective_access(compiled_rules(), user, [g.strip() for g in groups.split(",") if g.strip()],
                                [r.strip() for r in roles.split(",") if r.strip()],
-                               catalog, schema or None, table or None)
+                               catalog, schema or None, table or None, cache=st.session_state.decision_cache,
+                               explain=explain, group_provider=group_index)
+        trace = res.pop("explain", None)
         # jsonify pydantic objects
         def ser(o):
             if hasattr(o, "model_dump"): return o.model_dump()
             if hasattr(o, "__dict__"): return o.__dict__
             return str(o)
         st.json(json.loads(json.dumps(res, default=ser)))
+        if trace:
+            st.write(f"Identity matching: {trace['identity_seconds'] * 1e6:.1f} µs")
+            st.dataframe([{"tier": tier, "matched": t["matched"], "examined": t["examined"],
+                           "skipped (identity)": t["skipped"]["identity"], "skipped (pattern)": t["skipped"]["pattern"],
+                           "µs": round(t["seconds"] * 1e6, 1)} for tier, t in trace["tiers"].items()],
+                         use_container_width=True)
+            for tier, t in trace["tiers"].items():
+                if t["trace"]:
+                    with st.expander(f"{tier}: skipped rules" + (" (first shown)" if t["truncated"] else "")):
+                        st.dataframe(t["trace"], use_container_width=True)
+    with st.expander("Decision cache"):
+        st.json(st.session_state.decision_cache.stats())
+
+    st.markdown("---")
+    st.subheader("Batch evaluation (CSV)")
+    st.caption("Columns: user, groups, roles, catalog, schema, table. Groups and roles are comma separated; "
+               "memberships from the group file above are added.")
+    checks_file = st.file_uploader("Load checks CSV", type=["csv"], key="batch_checks")
+    if checks_file and st.button("Evaluate batch"):
+        import pandas as pd
+        checks = pd.read_csv(checks_file, dtype=str, keep_default_na=False)
+        out = effective_access_many(compiled_rules(), checks, hits=st.session_state.hit_counter,
+                                    group_provider=group_index)
+        for col in ("groups", "roles", "privileges"):
+            out[col] = out[col].map(lambda v: ",".join(v) if isinstance(v, list) else v)
+        st.dataframe(out, use_container_width=True)
+        st.download_button("Download results.csv", out.to_csv(index=False), file_name="results.csv", mime="text/csv")
+    hit_counter = st.session_state.hit_counter
+    if hit_counter.checks:
+        with st.expander(f"Hot rules ({hit_counter.checks} checks across batch runs)"):
+            st.dataframe([{"tier": tier, **stats} for tier, stats in hit_counter.summary(compiled_rules()).items()],
+                         use_container_width=True)
+            st.dataframe(hit_counter.hot_rules(compiled_rules(), top=100), use_container_width=True)
+            if st.button("Reset hit counters"):
+                st.session_state.hit_counter = HitCounter()
 
 with tabs[2]:
+    st.subheader("Who can access an object")
+    cols = st.columns(4)
+    r_catalog = cols[0].text_input("Catalog", value="hive", key="rev_catalog")
+    r_schema = cols[1].text_input("Schema", value="sales", key="rev_schema")
+    r_table = cols[2].text_input("Table", value="orders", key="rev_table")
+    r_priv = cols[3].selectbox("Privilege", options=PRIVS, key="rev_priv")
+    directory_file = st.file_uploader("Known principals CSV (user, groups, roles)", type=["csv"], key="rev_directory")
+    if st.button("Find principals"):
+        directory = None
+        if directory_file:
+            directory = principals_from_rows(csv.DictReader(io.StringIO(directory_file.getvalue().decode("utf-8"))))
+        elif st.session_state.get("group_index") is not None:
+            directory = st.session_state.group_index.principals()  # the group file loaded in Evaluate Access
+        res = who_can(compiled_rules(), r_catalog, r_schema, r_table, r_priv, directory)
+        st.write(f"**Groups:** {', '.join(res['groups']) or '—'}")
+        st.write(f"**Users:** {', '.join(res['users']) or ('—' if directory else 'upload a principals CSV')}")
+        st.write(f"**Anyone without a matching identity:** {res['anyone']}")
+        st.dataframe(res["rules"], use_container_width=True)
+
+with tabs[3]:
     st.subheader("Current JSON")
-    st.code(json.dumps(dump_rules(st.session_state.rules), indent=2), language="json")
+    st.code(rules_json().decode("utf-8"), language="json")
+
+    st.markdown("---")
+    st.subheader("Changes between versions")
+    versions = st.session_state.history.versions()
+    labels = {v["version"]: f"{v['version']}: {v['label']}" for v in versions}
+    cols = st.columns(2)
+    diff_from = cols[0].selectbox("From", options=list(labels), format_func=labels.get, index=0, key="diff_from")
+    diff_to = cols[1].selectbox("To", options=list(labels), format_func=labels.get, index=len(labels) - 1, key="diff_to")
+    changes = st.session_state.history.diff(diff_from, diff_to)
+    if not changes:
+        st.info("No changes")
+    for tier, tier_changes in changes.items():
+        st.write(f"**{tier}**: {len(tier_changes)} change(s)")
+        st.dataframe([{**c, "before": json.dumps(c["before"]), "after": json.dumps(c["after"])} for c in tier_changes],
+                     use_container_width=True)
+    if changes:
+        st.caption("Impact on decisions: principals CSV (user, groups, roles) and inventory CSV (catalog, schema, table).")
+        cols = st.columns(2)
+        impact_principals = cols[0].file_uploader("Principals CSV", type=["csv"], key="impact_principals")
+        impact_inventory = cols[1].file_uploader("Inventory CSV", type=["csv"], key="impact_inventory")
+        if impact_principals and impact_inventory and st.button("Analyze impact"):
+            history = st.session_state.history
+            principals = principals_from_rows(csv.DictReader(io.StringIO(impact_principals.getvalue().decode("utf-8"))))
+            inventory = [(r["catalog"], r["schema"], r["table"])
+                         for r in csv.DictReader(io.StringIO(impact_inventory.getvalue().decode("utf-8")))]
+            res = impact(history.snapshot(diff_from).rules(), history.snapshot(diff_to).rules(), principals, inventory)
+            st.write(f"{len(res['decisions'])} decision(s) changed; evaluated {res['evaluated']} of "
+                     f"{res['universe']} checks in {res['seconds']}s")
+            st.dataframe([{**d, "granted": ",".join(d["granted"]), "revoked": ",".join(d["revoked"]),
+                           "groups": ",".join(d["groups"]), "roles": ",".join(d["roles"])} for d in res["decisions"]],
+                         use_container_width=True)
+
+    st.markdown("---")
+    st.subheader("Shadowed rules")
+    if st.button("Find shadowed rules"):
+        shadowed = find_shadowed(compiled_rules())
+        if shadowed:
+            st.dataframe(shadowed, use_container_width=True)
+            minimized = dump_rules_json(minimize_rules(compiled_rules()))
+            st.download_button("Save minimized rules.json", minimized,
+                               file_name="rules.minimized.json", mime="application/json")
+        else:
+            st.success("No shadowed rules found")
+
+    st.subheader("Regex cost")
+    st.caption("Times every regex rule on representative names and on worst-case inputs, most expensive first.")
+    profile_names = st.text_area("Representative names (one per line, optional)", key="profile_names")
+    if st.button("Profile regex patterns"):
+        names = [n.strip() for n in profile_names.splitlines() if n.strip()]
+        ranked = profile_patterns(st.session_state.rules, names or None, top=50)
+        if ranked:
+            st.dataframe(ranked, use_container_width=True)
+        else:
+            st.info("No regex patterns")
+
+    st.subheader("Optimize for Trino")
+    st.caption("Drops dead rules and merges adjacent compatible rules into alternation patterns.")
+    if st.button("Optimize"):
+        optimized, report = optimize_for_trino(compiled_rules())
+        verification = report["verification"]
+        st.write(f"Rules before: {report['before']} — after: {report['after']}")
+        if verification["equivalent"]:
+            st.success(f"Identical decisions on {verification['checked']} sampled checks")
+            st.download_button("Save optimized rules.json", dump_rules_json(optimized),
+                               file_name="rules.optimized.json", mime="application/json")
+        else:
+            st.error("Optimized rules differ from the original")
+            st.json(verification["mismatches"])
+
+    st.subheader("Reorder by hit counts")
+    hit_counter = st.session_state.hit_counter
+    st.caption("Moves frequently matched rules earlier where no conflicting rule is passed. "
+               f"Uses the hit counters of batch evaluations ({hit_counter.checks} checks so far).")
+    if st.button("Reorder", disabled=not hit_counter.checks):
+        reordered, report = reorder_rules(compiled_rules(), hit_counter)
+        st.dataframe([{"tier": tier, **stats} for tier, stats in report["tiers"].items()], use_container_width=True)
+        if report["verification"]["equivalent"]:
+            st.success(f"Identical decisions on {report['verification']['checked']} sampled checks")
+            st.session_state.reordered = (st.session_state.rules_version, reordered)
+        else:
+            st.error("Reordered rules differ from the original")
+            st.json(report["verification"]["mismatches"])
+    # only offered for the rules version it was computed from
+    if st.session_state.get("reordered", (None,))[0] == st.session_state.rules_version:
+        def apply_reordered() -> None:
+            st.session_state.rules = st.session_state.pop("reordered")[1]
+            bump_rules_version("reorder by hits")
+        st.button("Apply reordered rules", on_click=apply_reordered)
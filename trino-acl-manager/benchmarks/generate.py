@@ -0,0 +1,71 @@
+"""Synthetic rule files and access-check workloads for the ACL benchmarks."""
+from __future__ import annotations
+import random
+from typing import Dict, List
+
+PRIVILEGE_SETS = [["SELECT"], ["SELECT", "CREATE_VIEW"], ["SELECT", "INSERT", "DELETE", "UPDATE"], ["OWNERSHIP"], []]
+
+def _names(prefix: str, n: int) -> List[str]:
+    return [f"{prefix}{i:05d}" for i in range(n)]
+
+def generate_rules(n_tables: int = 8000, n_catalogs: int = 20, n_schemas: int = 400, n_groups: int = 200,
+                   n_users: int = 2000, literal: float = 0.7, prefix: float = 0.2, regex: float = 0.1,
+                   user_rules: float = 0.2, ordering: str = "specific-first", seed: int = 0) -> Dict:
+    """A rules dict with the requested mix of literal, prefix and regex table patterns.
+
+    ordering is "specific-first" (literal rules before wildcards, the usual
+    hand-maintained layout), "broad-first" or "random".
+    """
+    rng = random.Random(seed)
+    catalogs, schemas = _names("cat", n_catalogs), _names("sch", n_schemas)
+    groups, users = _names("grp", n_groups), _names("usr", n_users)
+    total = literal + prefix + regex
+
+    def identity() -> Dict[str, str]:
+        return {"user": rng.choice(users)} if rng.random() < user_rules else {"group": rng.choice(groups)}
+
+    def table_pattern(i: int) -> tuple:
+        r = rng.random() * total
+        if r < literal:
+            return 0, f"tbl{i:06d}"
+        if r < literal + prefix:
+            return 1, f"tbl{rng.randrange(max(1, n_tables // 100)):04d}.*"
+        return 2, rf"tbl{rng.randrange(100):02d}\d+_(raw|stg|mart)"
+
+    tables = []
+    for i in range(n_tables):
+        rank, pattern = table_pattern(i)
+        rule = dict(identity(), catalog=rng.choice(catalogs), schema=rng.choice(schemas), table=pattern,
+                    privileges=rng.choice(PRIVILEGE_SETS))
+        tables.append((rank, rule))
+    if ordering == "specific-first":
+        tables.sort(key=lambda t: t[0])
+    elif ordering == "broad-first":
+        tables.sort(key=lambda t: -t[0])
+    return {
+        "catalogs": [dict(group=g, catalog="|".join(rng.sample(catalogs, 3)), allow=rng.choice(["all", "read-only"]))
+                     for g in groups] + [{"catalog": ".*", "allow": "none"}],
+        "schemas": [dict(identity(), catalog=rng.choice(catalogs), schema=s, owner=rng.random() < 0.1)
+                    for s in schemas],
+        "tables": [rule for _, rule in tables],
+    }
+
+def generate_workload(rules: Dict, n_checks: int = 20000, n_principals: int = 500, groups_per_user: int = 3,
+                      hit_ratio: float = 0.8, seed: int = 1) -> List[Dict]:
+    """Access checks; hit_ratio of them target objects named by a literal rule."""
+    rng = random.Random(seed)
+    groups = sorted({r["group"] for r in rules["tables"] if "group" in r}) or ["grp00000"]
+    users = sorted({r["user"] for r in rules["tables"] if "user" in r}) or ["usr00000"]
+    principals = [(rng.choice(users) if i % 2 else f"other{i}", ",".join(rng.sample(groups, min(groups_per_user, len(groups)))))
+                  for i in range(n_principals)]
+    literal = [r for r in rules["tables"] if r["table"].isalnum()] or rules["tables"]
+    checks = []
+    for _ in range(n_checks):
+        user, grps = rng.choice(principals)
+        if rng.random() < hit_ratio and literal:
+            r = rng.choice(literal)
+            obj = (r["catalog"], r["schema"], r["table"])
+        else:
+            obj = (f"cat{rng.randrange(30):05d}", f"sch{rng.randrange(500):05d}", f"tbl{rng.randrange(10**6):06d}")
+        checks.append(dict(user=user, groups=grps, roles="", catalog=obj[0], schema=obj[1], table=obj[2]))
+    return checks
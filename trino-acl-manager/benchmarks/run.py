@@ -0,0 +1,118 @@
+"""ACL evaluator benchmarks on synthetic rule files.
+
+    python -m benchmarks.run --tables 50000 --checks 20000 --out bench.json
+    python -m benchmarks.run --tables 50000 --compare bench.json
+
+Everything runs offline; results are written as JSON so runs of different
+versions can be compared with --compare.
+"""
+from __future__ import annotations
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+from acl.cache import DecisionCache
+from acl.compiled import CompiledRuleSet
+from acl.evaluator import effective_access, effective_access_many
+from acl.parser import load_rules
+from .generate import generate_rules, generate_workload
+
+def _best(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def _memory(fn: Callable[[], object]) -> Dict[str, float]:
+    gc.collect()
+    tracemalloc.start()
+    kept = fn()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return {"retained_mb": round(current / 2**20, 2), "peak_mb": round(peak / 2**20, 2)}
+
+def _single(compiled, checks, cache=None) -> None:
+    for c in checks:
+        effective_access(compiled, c["user"], c["groups"].split(","), [], c["catalog"], c["schema"], c["table"],
+                         cache=cache)
+
+def run(args) -> Dict:
+    data = generate_rules(n_tables=args.tables, literal=args.literal, prefix=args.prefix, regex=args.regex,
+                          ordering=args.ordering, seed=args.seed)
+    checks = generate_workload(data, n_checks=args.checks, groups_per_user=args.groups_per_user, seed=args.seed + 1)
+    single_checks = checks[:args.single]
+    rules = load_rules(data)
+    results: Dict[str, Dict] = {}
+
+    def record(name: str, seconds: float, ops: int = 1) -> None:
+        results[name] = {"seconds": round(seconds, 6), "ops": ops, "per_op_us": round(seconds / ops * 1e6, 3)}
+        print(f"{name:<22} {seconds:>10.4f}s  {seconds / ops * 1e6:>10.2f} us/op", file=sys.stderr)
+
+    record("load_rules", _best(lambda: load_rules(data), args.repeat), len(data["tables"]))
+    record("compile", _best(lambda: CompiledRuleSet(rules), args.repeat), len(data["tables"]))
+    record("single_cold", _best(lambda: _single(CompiledRuleSet(rules), single_checks), args.repeat), len(single_checks))
+    compiled = CompiledRuleSet(rules)
+    _single(compiled, single_checks)
+    record("single_warm", _best(lambda: _single(compiled, single_checks), args.repeat), len(single_checks))
+    cache = DecisionCache(maxsize=len(checks))
+    record("cached_cold", _best(lambda: _single(compiled, single_checks, DecisionCache()), args.repeat), len(single_checks))
+    _single(compiled, single_checks, cache)
+    record("cached_warm", _best(lambda: _single(compiled, single_checks, cache), args.repeat), len(single_checks))
+    record("batch", _best(lambda: effective_access_many(CompiledRuleSet(rules), checks), args.repeat), len(checks))
+
+    memory = {"load_rules": _memory(lambda: load_rules(data)), "compile": _memory(lambda: CompiledRuleSet(rules))}
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(), "commit": commit,
+                 "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "params": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "results": results,
+        "memory": memory,
+    }
+
+def compare(new: Dict, old: Dict) -> None:
+    print(f"{'benchmark':<22} {'old us/op':>12} {'new us/op':>12} {'ratio':>8}")
+    for name, res in new["results"].items():
+        before = old.get("results", {}).get(name)
+        if before:
+            ratio = res["per_op_us"] / before["per_op_us"] if before["per_op_us"] else float("nan")
+            print(f"{name:<22} {before['per_op_us']:>12.2f} {res['per_op_us']:>12.2f} {ratio:>8.2f}")
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--tables", type=int, default=8000, help="table rules in the generated file")
+    ap.add_argument("--checks", type=int, default=20000, help="checks in the batch workload")
+    ap.add_argument("--single", type=int, default=2000, help="checks timed one effective_access call at a time")
+    ap.add_argument("--literal", type=float, default=0.7)
+    ap.add_argument("--prefix", type=float, default=0.2)
+    ap.add_argument("--regex", type=float, default=0.1)
+    ap.add_argument("--groups-per-user", type=int, default=3)
+    ap.add_argument("--ordering", choices=["specific-first", "broad-first", "random"], default="specific-first")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--compare", help="previous results JSON to compare against")
+    args = ap.parse_args(argv)
+    report = run(args)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Replay recorded Trino OPA request bodies against the decision service.
+
+    python mock_coordinator.py tests/fixtures/opa_requests.json --url http://localhost:8181 --repeat 1000 --threads 8
+
+Each record is {"path": ..., "body": ..., "expected": ...}; mismatches and
+latency percentiles are printed, and the exit code is non-zero on mismatch.
+"""
+import argparse
+import json
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+def post(url: str, body: dict):
+    req = urllib.request.Request(url, data=json.dumps(body).encode(), headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    with urllib.request.urlopen(req) as resp:
+        result = json.load(resp)["result"]
+    return result, time.perf_counter() - start
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("records")
+    ap.add_argument("--url", default="http://localhost:8181")
+    ap.add_argument("--repeat", type=int, default=1)
+    ap.add_argument("--threads", type=int, default=4, help="concurrent coordinators")
+    args = ap.parse_args(argv)
+
+    with open(args.records, "r", encoding="utf-8") as f:
+        records = json.load(f)
+    work = records * args.repeat
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(lambda r: post(args.url.rstrip("/") + r["path"], r["body"]), work))
+
+    # every repetition is checked: the later ones are the ones answered from the warm cache
+    mismatches = 0
+    for i, (result, _) in enumerate(results):
+        rec = records[i % len(records)]
+        if "expected" in rec and result != rec["expected"]:
+            mismatches += 1
+            if mismatches <= 20:
+                print(f"MISMATCH {rec['path']} {rec['body']['input']['action'].get('operation')} "
+                      f"(repetition {i // len(records) + 1}): expected {rec['expected']}, got {result}")
+    if mismatches:
+        print(f"{mismatches} mismatches")
+    latencies = sorted(lat for _, lat in results)
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    print(f"{len(latencies)} requests, p50={pct(0.50):.3f}ms p99={pct(0.99):.3f}ms max={latencies[-1]*1000:.3f}ms")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
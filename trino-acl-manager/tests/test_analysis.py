@@ -0,0 +1,38 @@
+from acl.models import AccessControlRules
+from acl.analysis import EXACT, find_shadowed, minimize_rules, pattern_contains
+from acl.compiled import compile_pattern
+from acl.parser import dump_rules
+
+RULES = AccessControlRules(**{
+    "catalogs":[{"catalog":"hive","allow":"all"},{"group":"analyst","catalog":"hive","allow":"read-only"}],
+    "tables":[
+        {"group":"analyst|finance","catalog":"hive","schema":"sales","table":"ord.*","privileges":["SELECT"]},
+        {"group":"analyst","catalog":"hive","schema":"sales","table":"orders","privileges":["INSERT"]},
+        {"group":"analyst","catalog":"hive","schema":"sales","table":"customers","privileges":["SELECT"]},
+        {"user":"bob","catalog":"hive","schema":"sales","table":"orders","privileges":["SELECT"]},
+        {"group":"fin.*","catalog":"hive","schema":"sales","table":r"orders_\d+","privileges":["DELETE"]},
+        {"user":"","catalog":"hive","schema":"sales","table":"x"},
+    ]})
+
+def test_find_shadowed_reports_shadowing_rule():
+    found = {(r["tier"], r["index"]): r for r in find_shadowed(RULES)}
+    assert found[("catalogs", 1)]["shadowed_by"] == 0
+    assert found[("tables", 1)]["shadowed_by"] == 0 and found[("tables", 1)]["exact"]
+    assert ("tables", 2) not in found and ("tables", 3) not in found
+    # group regex fin.* is wider than the literal alternation, so rule 4 stays live
+    assert ("tables", 4) not in found
+    assert found[("tables", 5)]["shadowed_by"] is None
+
+def test_minimize_drops_only_dead_rules():
+    data = dump_rules(minimize_rules(RULES))
+    assert len(data["catalogs"]) == 1
+    assert [t["table"] for t in data["tables"]] == ["ord.*", "customers", "orders", r"orders_\d+"]
+
+def test_containment_respects_newlines():
+    c = compile_pattern
+    # ".*" never matches a newline, so patterns whose values can hold one aren't contained
+    assert pattern_contains(c(".*"), c("a\nb")) is None
+    assert pattern_contains(c("a.*"), c("a\nb")) is None and pattern_contains(c("a.*"), c("ab\n.*")) is None
+    assert pattern_contains(c("a.*"), c("a\nb|ab")) is None
+    assert pattern_contains(c(".*"), c("ab")) == EXACT and pattern_contains(c("a.*"), c("a\n.*")) is None
+    assert pattern_contains(c("a\n.*"), c("a\nb.*")) == EXACT
@@ -0,0 +1,30 @@
+import pytest
+from acl.models import AccessControlRules
+from acl.evaluator import effective_access, effective_access_many
+
+RULES = AccessControlRules(**{
+    "catalogs":[{"group":"analyst","catalog":"hive","allow":"read-only"}],
+    "schemas":[{"user":"bob","catalog":"hive","schema":"sales","owner":True}],
+    "tables":[{"group":"analyst","catalog":"hive","schema":"sales","table":"orders","privileges":["SELECT"]}]
+})
+
+def test_batch_matches_single_checks():
+    checks = [
+        {"user":"bob","groups":"analyst","roles":"","catalog":"hive","schema":"sales","table":"orders"},
+        {"user":"eve","groups":[],"roles":[],"catalog":"hive","schema":"sales","table":"orders"},
+        {"user":"bob","groups":["analyst"],"roles":[],"catalog":"hive","schema":"sales","table":"orders"},
+        {"user":"bob","groups":["analyst"],"roles":[],"catalog":"hive"},
+    ]
+    out = effective_access_many(RULES, checks)
+    assert out["visible"] == [True, False, True, True]
+    assert out["privileges"] == [["SELECT"], [], ["SELECT"], None]
+    assert out["schema_owner"][:3] == [True, False, True]
+    assert out["table_rule"] == [0, None, 0, None]
+    single = effective_access(RULES, "eve", [], [], "hive", "sales", "orders")
+    assert out["catalog_allow"][1] == single["catalog"]["allow"]
+
+def test_batch_accepts_dataframe():
+    pd = pytest.importorskip("pandas")
+    df = pd.DataFrame([{"user":"bob","groups":"analyst","roles":"","catalog":"hive","schema":"sales","table":"orders"}])
+    out = effective_access_many(RULES, df)
+    assert list(out["privileges"]) == [["SELECT"]]
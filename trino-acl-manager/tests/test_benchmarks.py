@@ -0,0 +1,13 @@
+from benchmarks.generate import generate_rules, generate_workload
+from benchmarks.run import main
+
+def test_generator_mix_and_ordering():
+    data = generate_rules(n_tables=300, literal=0.5, prefix=0.3, regex=0.2, seed=3)
+    kinds = [("lit" if r["table"].isalnum() else "pre" if r["table"].endswith(".*") else "re") for r in data["tables"]]
+    assert kinds == sorted(kinds, key=["lit", "pre", "re"].index)
+    assert len(generate_workload(data, n_checks=50)) == 50
+
+def test_benchmark_smoke(tmp_path):
+    out = tmp_path / "bench.json"
+    main(["--tables", "200", "--checks", "200", "--single", "50", "--repeat", "1", "--out", str(out)])
+    assert '"cached_warm"' in out.read_text()
@@ -0,0 +1,22 @@
+from acl.models import AccessControlRules, CatalogAccessControlRule
+from acl.compiled import CompiledRuleSet
+from acl.cache import DecisionCache
+from acl.evaluator import effective_access
+
+def test_cache_hits_and_evictions():
+    compiled = CompiledRuleSet(AccessControlRules(catalogs=[CatalogAccessControlRule(catalog="hive", allow="all")]))
+    cache = DecisionCache(maxsize=2)
+    first = effective_access(compiled, "bob", ["b", "a"], [], "hive", cache=cache)
+    assert effective_access(compiled, "bob", ["a", "b"], [], "hive", cache=cache) is first
+    effective_access(compiled, "bob", [], [], "tpch", cache=cache)
+    effective_access(compiled, "eve", [], [], "tpch", cache=cache)
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (1, 3, 1, 2)
+
+def test_cache_invalidated_by_rules_change():
+    rules = AccessControlRules(catalogs=[CatalogAccessControlRule(catalog="hive", allow="all")])
+    cache = DecisionCache()
+    assert effective_access(CompiledRuleSet(rules), "bob", [], [], "hive", cache=cache)["visible"]
+    rules.catalogs[0].allow = "none"
+    assert not effective_access(CompiledRuleSet(rules), "bob", [], [], "hive", cache=cache)["visible"]
+    assert cache.stats()["invalidations"] == 1
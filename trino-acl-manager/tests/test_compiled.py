@@ -0,0 +1,123 @@
+import random
+import re
+from acl.models import AccessControlRules
+from acl.compiled import CompiledRuleSet, compile_pattern
+from acl.evaluator import PRIVS, effective_access
+
+# reference semantics: the original linear first-match scan over re.fullmatch
+def _ref_match(pat, value):
+    try:
+        return re.fullmatch(pat, value) is not None
+    except re.error:
+        return pat == value
+
+def _ref_identity(rule, user, groups, roles):
+    if rule.user is None and rule.group is None and rule.role is None:
+        return True
+    return bool((rule.user and _ref_match(rule.user, user)) or
+                (rule.group and any(_ref_match(rule.group, g) for g in groups)) or
+                (rule.role and any(_ref_match(rule.role, r) for r in roles)))
+
+def _ref_first(tier, principal, values, fields):
+    return next((rule for rule in tier if _ref_identity(rule, *principal) and
+                 all(_ref_match(getattr(rule, f), v) for f, v in zip(fields, values))), None)
+
+def test_invalid_regex_falls_back_to_literal():
+    pat = compile_pattern("sales[")
+    assert pat.match("sales[")
+    assert not pat.match("sales")
+
+def test_compiled_ruleset_matches_model_evaluation():
+    rules = AccessControlRules(**{
+        "catalogs":[{"user":"admin","catalog":".*","allow":"all"},{"group":"an.*","catalog":"hive","allow":"read-only"}],
+        "schemas":[{"role":"etl","catalog":"hive","schema":"sales","owner":True}],
+        "tables":[{"group":"analyst","catalog":"hive","schema":"sales","table":"ord(ers|er_lines)","privileges":["SELECT"]}]
+    })
+    compiled = CompiledRuleSet.from_rules(rules)
+    for user, groups, roles in [("admin",[],[]),("bob",["analyst"],["etl"]),("eve",[],[])]:
+        for table in ["orders","order_lines","customers"]:
+            assert effective_access(compiled, user, groups, roles, "hive", "sales", table) == \
+                effective_access(rules, user, groups, roles, "hive", "sales", table)
+
+def test_pattern_kinds():
+    assert compile_pattern("orders").kind == "literal"
+    assert compile_pattern("sales_.*").kind == "prefix"
+    assert compile_pattern(".*").kind == "prefix"
+    assert compile_pattern("ord(ers|er_lines)").kind == "regex"
+    assert compile_pattern("sales_.*").match("sales_eu")
+    assert not compile_pattern("sales_.*").match("sales_\neu")
+
+def test_table_index_keeps_first_match_order():
+    rules = AccessControlRules(**{"tables":[
+        {"catalog":"hive","schema":"sales","table":"ord.+","privileges":["INSERT"]},
+        {"catalog":"hive","schema":"sales","table":"orders","privileges":["SELECT"]},
+        {"catalog":"hive","schema":"sales","table":"or.*","privileges":["DELETE"]},
+        {"catalog":"hive","schema":"sales","table":"customers","privileges":["UPDATE"]},
+    ]})
+    compiled = CompiledRuleSet(rules)
+    assert list(compiled.table_index.candidates("orders")) == [0, 1, 2]
+    assert list(compiled.table_index.candidates("customers")) == [0, 3]
+    res = effective_access(compiled, "bob", [], [], "hive", "sales", "orders")
+    assert res["table"]["privileges"] == ["INSERT"]
+
+def test_principal_view_is_memoized_per_principal():
+    rules = AccessControlRules(**{
+        "catalogs":[{"group":"analyst","catalog":"hive","allow":"read-only"},{"catalog":".*","allow":"none"}],
+        "tables":[{"user":"bob","catalog":"hive","schema":".*","table":".*"},
+                  {"group":"analyst","catalog":"hive","schema":"sales","table":".*","privileges":["SELECT"]}],
+    })
+    compiled = CompiledRuleSet(rules)
+    view = compiled.principal_view("alice", ["finance", "analyst"], [])
+    assert compiled.principal_view("alice", ["analyst", "finance"], []) is view
+    assert (view.catalogs, view.schemas, view.tables) == (0b11, 0, 0b10)
+
+def test_compiled_rules_are_slotted_and_share_patterns():
+    rules = AccessControlRules(**{"tables":[
+        {"group":"analyst","catalog":"hive","schema":"sales","table":"orders","privileges":["SELECT"]},
+        {"group":"analyst","catalog":"hive","schema":"sales","table":"items","privileges":["SELECT"]},
+    ]})
+    compiled = CompiledRuleSet(rules)
+    first, second = compiled.tables
+    assert not hasattr(first, "__dict__")
+    assert first.identity_key is second.identity_key
+    assert first.outcome is second.outcome == ("SELECT",)
+    assert compiled.principal_view("bob", ["analyst"], []).bits["tables"][0] == 0b11
+    res = effective_access(compiled, "bob", ["analyst"], [], "hive", "sales", "items")
+    assert res["table"]["matched_rule"] is rules.tables[1]
+
+def test_field_matcher_masks_match_patterns():
+    from acl.compiled import FieldMatcher
+    pats = ["orders", "ord.*", ".*", "ord(ers|er_lines)", "or[a-z]+s", "(a)\\1", "sales["]
+    matcher = FieldMatcher([compile_pattern(p) for p in pats])
+    for value in ("orders", "order_lines", "ord\nx", "aa", "sales[", "x"):
+        expected = sum(1 << i for i, p in enumerate(pats) if compile_pattern(p).match(value))
+        assert matcher.mask(value) == expected, value
+
+PATTERNS = ["orders", "ord.*", ".*", "", "ord(ers|er_lines)", "orders|items", "it.*|orders", "sales[", "(a)\\1",
+            "or[a-z]+s", "ORDERS", "(?i)orders", "a\nb", "a\n.*", "[^x]*", "o.+", "items"]
+VALUES = ["orders", "order_lines", "items", "ord", "ord\nx", "a\nb", "a\nbc", "aa", "sales[", "ORDERS", "x", ""]
+NAMES = ["bob", "analyst", "etl", "", "ord", "a\nb"]
+
+def test_compiled_matches_reference_linear_scan():
+    rng = random.Random(7)
+    pick = lambda: rng.choice(PATTERNS)
+    for _ in range(150):
+        def ident():
+            return {f: rng.choice(PATTERNS + NAMES) for f in ("user", "group", "role") if rng.random() < 0.3}
+        data = {"catalogs": [dict(ident(), catalog=pick(), allow=rng.choice(["all", "read-only", "none"])) for _ in range(4)],
+                "schemas": [dict(ident(), catalog=pick(), schema=pick(), owner=rng.random() < 0.5) for _ in range(4)],
+                "tables": [dict(ident(), catalog=pick(), schema=pick(), table=pick(),
+                                privileges=rng.sample(PRIVS, rng.randrange(3))) for _ in range(8)]}
+        rules = AccessControlRules(**data)
+        compiled = CompiledRuleSet(rules)
+        for _ in range(20):
+            principal = (rng.choice(NAMES), rng.sample(NAMES, 2), rng.sample(NAMES, rng.randrange(2)))
+            c, sch, t = (rng.choice(VALUES[:3] if rng.random() < 0.5 else VALUES) for _ in range(3))
+            res = effective_access(compiled, *principal, c, sch or None, t or None)
+            cat = _ref_first(rules.catalogs, principal, (c,), ("catalog",))
+            assert res["catalog"]["matched_rule"] is cat, (data, principal, c)
+            if sch:
+                assert res["schema"]["matched_rule"] is _ref_first(rules.schemas, principal, (c, sch), ("catalog", "schema"))
+            if sch and t:
+                assert res["table"]["matched_rule"] is _ref_first(rules.tables, principal, (c, sch, t),
+                                                                  ("catalog", "schema", "table"))
@@ -0,0 +1,41 @@
+from acl.editor import apply_grid_edits, rule_row, search_positions
+from acl.models import AccessControlRules
+
+def _rules():
+    return AccessControlRules(**{"tables": [
+        {"group": "analyst", "catalog": "hive", "schema": "sales", "table": "orders", "privileges": ["SELECT"]},
+        {"user": "etl", "catalog": "hive", "schema": "sales", "table": ".*", "privileges": ["INSERT", "SELECT"]},
+        {"catalog": "hive", "schema": "hr", "table": "salaries"},
+    ]})
+
+def test_search_and_rows():
+    rules = _rules()
+    assert search_positions(rules, "tables", pattern="SALES") == [0, 1]
+    assert search_positions(rules, "tables", identity="etl") == [1]
+    assert search_positions(rules, "tables", privilege="SELECT") == [0, 1]
+    row = rule_row("tables", 1, rules.tables[1])
+    assert row["#"] == 1 and row["INSERT"] and not row["DELETE"] and row["group"] is None
+
+def test_grid_edits_apply_as_diff_to_visible_slice():
+    rules = _rules()
+    untouched = rules.tables[2]
+    # the grid shows rules 0 and 1 (e.g. a filtered page); new rows go after the last one shown
+    edits = {"edited_rows": {1: {"INSERT": False, "user": ""}}, "deleted_rows": [],
+             "added_rows": [{"catalog": "hive", "schema": "sales", "table": "returns", "SELECT": True}]}
+    assert apply_grid_edits(rules, "tables", [0, 1], edits) == 2
+    assert [r.table for r in rules.tables] == ["orders", ".*", "returns", "salaries"]
+    assert rules.tables[1].privileges == ["SELECT"] and rules.tables[1].user is None
+    assert rules.tables[3] is untouched
+    assert apply_grid_edits(rules, "tables", [2, 3], {"deleted_rows": [0]}) == 1
+    assert [r.table for r in rules.tables] == ["orders", ".*", "salaries"]
+
+def test_invalid_grid_row_changes_nothing():
+    rules = _rules()
+    before = list(rules.tables)
+    try:
+        apply_grid_edits(rules, "tables", [0], {"edited_rows": {0: {"table": "x"}}, "added_rows": [{"catalog": "hive"}]})
+    except ValueError as e:
+        assert "new rule" in str(e)
+    else:
+        raise AssertionError("expected a validation error")
+    assert rules.tables == before
@@ -0,0 +1,44 @@
+import os
+from acl.evaluator import effective_access, effective_access_many
+from acl.groups import FileGroupProvider, GroupIndex
+from acl.models import AccessControlRules
+
+LDIF = """version: 1
+
+dn: cn=analyst,ou=groups,dc=example,dc=com
+cn: analyst
+objectClass: groupOfNames
+member: uid=alice,ou=people,dc=example,dc=com
+member: uid=bob,ou=people,dc=example,dc=com
+
+dn: uid=carol,ou=people,dc=example,dc=com
+uid: carol
+memberOf: cn=finance,ou=groups,dc=example,dc=com
+"""
+
+def test_formats_build_both_maps():
+    trino = GroupIndex("trino")
+    trino.update("# comment\nanalyst:alice,bob\nfinance: carol\n")
+    csv_index = GroupIndex("csv")
+    csv_index.update("user,groups\nalice,analyst\nbob,analyst\ncarol,finance\n")
+    ldif = GroupIndex("ldif")
+    ldif.update(LDIF)
+    for index in (trino, csv_index, ldif):
+        assert index.groups_for("alice") == {"analyst"} and index.groups_for("carol") == {"finance"}
+        assert index.users_in("analyst") == {"alice", "bob"} and index.groups_for("nobody") == frozenset()
+
+def test_incremental_reload_and_evaluation(tmp_path):
+    path = tmp_path / "group.txt"
+    path.write_text("analyst:alice,bob\nfinance:carol\n")
+    provider = FileGroupProvider(str(path), interval=0)
+    rules = AccessControlRules(**{"catalogs": [{"group": "analyst", "catalog": "hive", "allow": "all"}]})
+    assert effective_access(rules, "alice", [], [], "hive", group_provider=provider)["visible"]
+    unchanged = provider._records["finance:carol"]
+    path.write_text("analyst:bob\nfinance:carol\nfinance:alice\n")
+    os.utime(path, ns=(1, 1))
+    assert provider.check() == {"alice"}
+    assert provider._records["finance:carol"] is unchanged  # untouched line not parsed again
+    assert provider.users_in("analyst") == {"bob"} and provider.groups_for("alice") == {"finance"}
+    out = effective_access_many(rules, [{"user": "alice", "catalog": "hive"}, {"user": "bob", "catalog": "hive"}],
+                                group_provider=provider)
+    assert out["visible"] == [False, True] and out["groups"] == [["finance"], ["analyst"]]
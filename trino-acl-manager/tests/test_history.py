@@ -0,0 +1,39 @@
+from acl.editor import apply_grid_edits
+from acl.history import CHUNK, RulesHistory
+from acl.models import AccessControlRules
+
+def _rules(n):
+    return AccessControlRules(**{"tables": [{"catalog": "hive", "schema": "s", "table": f"t{i}"} for i in range(n)]})
+
+def test_undo_redo_and_checkpoints():
+    rules = _rules(3)
+    history = RulesHistory(rules)
+    apply_grid_edits(rules, "tables", [0], {"edited_rows": {0: {"table": "renamed"}}})
+    history.record(rules)
+    history.checkpoint("renamed")
+    apply_grid_edits(rules, "tables", [1], {"deleted_rows": [0]})
+    history.record(rules)
+    assert history.record(rules) == history.current.version  # no change, no new version
+
+    assert [r.table for r in history.undo().tables] == ["renamed", "t1", "t2"]
+    assert [r.table for r in history.undo().tables] == ["t0", "t1", "t2"]
+    assert history.undo() is None
+    assert [r.table for r in history.redo().tables] == ["renamed", "t1", "t2"]
+    history.undo()
+    # restoring records a new version, which drops the redo branch
+    assert [r.table for r in history.restore("renamed").tables] == ["renamed", "t1", "t2"]
+    assert not history.can_redo and history.can_undo
+
+def test_snapshots_share_unchanged_chunks_and_diff():
+    rules = _rules(CHUNK * 10)
+    history = RulesHistory(rules)
+    first = history.current
+    apply_grid_edits(rules, "tables", [CHUNK * 5], {"edited_rows": {0: {"table": "edited"}}})
+    apply_grid_edits(rules, "tables", [3], {"added_rows": [{"catalog": "hive", "schema": "s", "table": "new"}]})
+    history.record(rules)
+    shared = set(map(id, first.tiers["tables"])) & set(map(id, history.current.tiers["tables"]))
+    assert len(shared) >= 8
+    changes = history.diff(first.version, history.current.version)["tables"]
+    assert [(c["change"], c["old_index"], c["new_index"]) for c in changes] == \
+           [("added", None, 4), ("changed", CHUNK * 5, CHUNK * 5 + 1)]
+    assert changes[1]["after"]["table"] == "edited"
@@ -0,0 +1,25 @@
+from acl.impact import impact
+from acl.models import AccessControlRules
+
+OLD = {
+    "catalogs": [{"group": "analyst", "catalog": "hive", "allow": "read-only"}, {"catalog": "hive", "allow": "all"}],
+    "tables": [{"group": "analyst", "catalog": "hive", "schema": "sales", "table": "orders", "privileges": ["SELECT"]},
+               {"catalog": "hive", "schema": ".*", "table": ".*", "privileges": ["SELECT", "INSERT"]}],
+}
+PRINCIPALS = [("alice", ("analyst",), ()), ("bob", (), ()), ("carol", ("finance",), ())]
+INVENTORY = [("hive", "sales", "orders"), ("hive", "sales", "items"), ("hive", "hr", "salaries")]
+
+def test_impact_only_evaluates_affected_pairs():
+    new = AccessControlRules(**OLD)
+    new.tables = [new.tables[0].model_copy(update={"privileges": []}), new.tables[1]]
+    res = impact(AccessControlRules(**OLD), new, PRINCIPALS, INVENTORY)
+    assert res["evaluated"] == 1 and res["universe"] == 9
+    assert [(d["user"], d["table"], d["revoked"]) for d in res["decisions"]] == [("alice", "orders", ["SELECT"])]
+
+def test_impact_of_inserted_catalog_rule():
+    new = AccessControlRules(**OLD)
+    new.catalogs = [AccessControlRules(catalogs=[{"user": "bob", "catalog": "hive", "allow": "none"}]).catalogs[0]] + new.catalogs
+    res = impact(AccessControlRules(**OLD), new, PRINCIPALS, INVENTORY)
+    assert res["rule_changes"]["catalogs"][0]["change"] == "added"
+    assert {d["user"] for d in res["decisions"]} == {"bob"}
+    assert all(d["revoked"] == ["SELECT", "INSERT"] and not d["visible_after"] for d in res["decisions"])
@@ -0,0 +1,30 @@
+import json
+import os
+import pytest
+from acl.evaluator import effective_access
+from acl.matrix import MATRIX_COLUMNS, build_access_matrix
+from acl.parser import load_rules
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+with open(os.path.join(os.path.dirname(__file__), "..", "sample_acl.json"), encoding="utf-8") as f:
+    RULES = load_rules(json.load(f))
+PRINCIPALS = [("admin", (), ()), ("bob", ("analyst",), ()), ("carol", ("analyst",), ()), ("alice", (), ())]
+INVENTORY = [("hive", "sales", "orders"), ("hive", "default", "t1"), ("tpch", "tiny", "nation")]
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_matrix_matches_effective_access(tmp_path, processes):
+    summary = build_access_matrix(RULES, PRINCIPALS, INVENTORY, str(tmp_path), chunk_size=2, processes=processes)
+    assert summary["rows"] == len(PRINCIPALS) * len(INVENTORY)
+    assert summary["distinct_views"] == 3
+    table = pq.read_table(str(tmp_path))
+    assert table.column_names == MATRIX_COLUMNS
+    rows = table.to_pylist()
+    assert len(rows) == summary["rows"]
+    for row in rows:
+        user, groups, roles = next(p for p in PRINCIPALS if p[0] == row["user"])
+        res = effective_access(RULES, user, list(groups), list(roles), row["catalog"], row["schema"], row["table"])
+        assert row["visible"] == res["visible"]
+        assert row["catalog_allow"] == res["catalog"]["allow"]
+        assert row["schema_owner"] == res["schema"]["owner"]
+        assert row["select"] == ("SELECT" in res["table"]["privileges"])
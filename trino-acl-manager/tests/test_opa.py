@@ -0,0 +1,45 @@
+import json
+import os
+import pytest
+from acl.cache import DecisionCache
+from acl.opa import decide, decide_batch
+from acl.service import load_compiled
+
+HERE = os.path.dirname(__file__)
+SAMPLE = os.path.join(HERE, "..", "sample_acl.json")
+
+with open(os.path.join(HERE, "fixtures", "opa_requests.json"), encoding="utf-8") as f:
+    RECORDS = json.load(f)
+
+def test_recorded_requests_replay():
+    compiled = load_compiled(SAMPLE)
+    cache = DecisionCache()
+    for _ in range(2):
+        for rec in RECORDS:
+            fn = decide_batch if rec["path"].endswith("/batch") else decide
+            assert fn(compiled, rec["body"], cache) == rec["expected"], rec["body"]["input"]["action"]["operation"]
+    assert cache.stats()["hits"] > 0
+
+def test_service_endpoints():
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+    from acl.service import create_app
+    client = TestClient(create_app(SAMPLE))
+    for rec in RECORDS:
+        assert client.post(rec["path"], json=rec["body"]).json() == {"result": rec["expected"]}
+    assert client.get("/health").json()["status"] == "ok"
+
+def test_admin_endpoints_need_token_or_loopback(monkeypatch):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+    from acl.service import create_app
+    monkeypatch.delenv("ACL_ADMIN_TOKEN", raising=False)
+    # TestClient requests come from host "testclient", not a loopback address
+    assert TestClient(create_app(SAMPLE, watch_interval=0)).post("/reload").status_code == 403
+    client = TestClient(create_app(SAMPLE, watch_interval=0, admin_token="s3cret"))
+    assert client.post("/rollback").status_code == 401
+    assert client.post("/reload", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    res = client.post("/reload", headers={"Authorization": "Bearer s3cret"})
+    assert res.status_code == 200 and res.json()["reloaded"]
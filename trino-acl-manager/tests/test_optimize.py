@@ -0,0 +1,84 @@
+import json
+import pytest
+from acl import optimize
+from acl.models import AccessControlRules
+from acl.optimize import merge_adjacent, optimize_for_trino, sample_universe, verify_equivalent
+
+def _tables(*patterns):
+    tables = [{"group":"analyst","catalog":"hive","schema":"sales","table":p,"privileges":["SELECT"]} for p in patterns]
+    return AccessControlRules(**{"catalogs":[{"catalog":"hive","allow":"all"}], "tables": tables})
+
+def test_merge_adjacent_builds_alternations():
+    rules = [
+        {"group":"analyst","catalog":"hive","schema":"sales","table":"orders","privileges":["SELECT"]},
+        {"group":"analyst","catalog":"hive","schema":"sales","table":"customers","privileges":["SELECT"]},
+        {"group":"analyst","catalog":"hive","schema":"sales","table":"line.*","privileges":["SELECT"]},
+        {"group":"analyst","catalog":"hive","schema":"hr","table":"people","privileges":["SELECT"]},
+        {"group":"analyst","catalog":"hive","schema":"hr","table":"pay[","privileges":["SELECT"]},
+    ]
+    merged = merge_adjacent(rules, ("catalog","schema","table"))
+    assert [r["table"] for r in merged] == ["orders|customers|(?:line.*)", "people", "pay["]
+
+def test_optimize_is_equivalent_and_smaller():
+    tables = [{"group":"analyst","catalog":"hive","schema":"sales","table":f"t{i}","privileges":["SELECT"]} for i in range(20)]
+    tables.insert(10, {"user":"bob","catalog":"hive","schema":"sales","table":"t1","privileges":["INSERT"]})
+    tables.append({"group":"analyst","catalog":"hive","schema":"sales","table":"t3","privileges":["DELETE"]})
+    rules = AccessControlRules(**{"catalogs":[{"catalog":"hive","allow":"all"}], "tables": tables})
+    optimized, report = optimize_for_trino(rules)
+    assert report["after"]["tables"] == 3
+    assert report["verification"]["equivalent"]
+    assert report["verification"]["checked"] > 0
+
+def test_verify_detects_difference():
+    a = AccessControlRules(**{"catalogs":[{"group":"analyst","catalog":"hive","allow":"all"}]})
+    b = AccessControlRules(**{"catalogs":[{"group":"analyst","catalog":"hive|tpch","allow":"all"}]})
+    report = verify_equivalent(a, b)
+    assert not report["equivalent"]
+    assert report["mismatches"][0]["check"]["catalog"] == "tpch"
+    assert verify_equivalent(a, a)["equivalent"]
+
+@pytest.mark.parametrize("patterns,broken", [
+    (["(?i)orders", "(?i)customers"], "(?:(?i)orders)|(?:(?i)customers)"),
+    (["(a)\\1", "(b)\\1"], "(?:(a)\\1)|(?:(b)\\1)"),
+    (["(?P<x>a)", "(?P<x>b)"], "(?:(?P<x>a))|(?:(?P<x>b))"),
+])
+def test_group_and_flag_patterns_are_not_merged(patterns, broken):
+    rules = _tables(*patterns)
+    optimized, report = optimize_for_trino(rules)
+    assert [r.table for r in optimized.tables] == patterns
+    assert report["verification"]["equivalent"]
+    # the sampled universe holds each rule's fully matching object, so the naive merge is caught
+    assert not verify_equivalent(rules, _tables(broken))["equivalent"]
+
+def test_rule_checks_cover_every_rule():
+    rules = AccessControlRules(**{"tables": [
+        {"user":"bob","catalog":"c[0-9]","schema":"s_.*","table":"t(x|y)","privileges":["SELECT"]},
+        {"role":"etl","catalog":"hive","schema":"raw","table":"(a)\\1","privileges":["INSERT"]},
+    ]})
+    compiled = optimize.ensure_compiled(rules)
+    for rule in compiled.tables:
+        assert any(rule.identity_matches(u, g, r) and rule.object_matches(o["catalog"], o["schema"], o["table"])
+                   for (u, g, r), o in optimize.rule_checks(rules))
+
+def test_sample_universe_respects_limits():
+    from benchmarks.generate import generate_rules
+    rules = optimize.load_rules(generate_rules(n_tables=3000))
+    principals, objects = sample_universe(rules, max_principals=100, max_objects=1000)
+    assert len(principals) <= 100 and len(objects) <= 1000
+    report = verify_equivalent(rules, rules, max_principals=20, max_objects=100)
+    # the matrix plus a few checks per rule, not every sampled principal against every object
+    assert report["equivalent"] and report["checked"] <= 25 * 125 + 2 * 4 * 3000
+
+def test_main_refuses_unverified_output(tmp_path, monkeypatch, capsys):
+    src, out = tmp_path / "rules.json", tmp_path / "out.json"
+    src.write_text(json.dumps({"tables": [
+        {"group":"analyst","catalog":"hive","schema":"sales","table":"orders","privileges":["SELECT"]},
+        {"group":"analyst","catalog":"hive","schema":"sales","table":"customers","privileges":["SELECT"]},
+    ]}))
+    monkeypatch.setattr(optimize, "_alternation", lambda patterns: "orders")
+    with pytest.raises(SystemExit):
+        optimize.main([str(src), str(out)])
+    assert not out.exists()
+    assert json.loads(capsys.readouterr().out.splitlines()[0])["verification"]["equivalent"] is False
+    optimize.main([str(src), str(out), "--force"])
+    assert out.exists()
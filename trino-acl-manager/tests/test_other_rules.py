@@ -0,0 +1,46 @@
+from acl.models import AccessControlRules
+from acl.evaluator import (eval_function, eval_impersonation, eval_procedure, eval_query,
+                           eval_session_property, eval_system_information, evaluate_many)
+
+RULES = AccessControlRules(**{
+    "functions":[{"group":"analyst","catalog":"hive","function":"udf_.*"},
+                 {"catalog":".*","function":".*","execute":False}],
+    "procedures":[{"user":"admin","catalog":"system","procedure":"kill_query"}],
+    "session_properties":[{"group":"etl","property":"query_max_memory"},
+                          {"group":"etl","catalog":"hive","property":"insert_.*"}],
+    "queries":[{"user":"admin"},{"group":"analyst","query":"bob|carol"}],
+    "system_information":[{"user":"admin","allow":True}],
+    "impersonation":[{"principal":"svc_(.*)","user":"$1"},
+                     {"principal":"superset","user":"(?!admin).*"}],
+})
+
+def test_function_procedure_and_session_property_rules():
+    assert eval_function(RULES, "bob", ["analyst"], [], "hive", "udf_parse")["allow"]
+    assert not eval_function(RULES, "eve", [], [], "hive", "udf_parse")["allow"]
+    assert eval_procedure(RULES, "admin", [], [], "system", "kill_query")["allow"]
+    assert not eval_procedure(RULES, "bob", [], [], "system", "kill_query")["allow"]
+    assert eval_session_property(RULES, "x", ["etl"], [], "query_max_memory")["allow"]
+    assert not eval_session_property(RULES, "x", ["etl"], [], "query_max_memory", catalog="hive")["allow"]
+    assert eval_session_property(RULES, "x", ["etl"], [], "insert_existing_partitions_behavior", catalog="hive")["allow"]
+    assert eval_function(AccessControlRules(), "eve", [], [], "hive", "anything")["allow"]
+
+def test_query_and_system_information_rules():
+    assert eval_query(RULES, "admin", [], [], "anyone")["allow"]
+    assert eval_query(RULES, "dave", ["analyst"], [], "carol")["allow"]
+    assert not eval_query(RULES, "dave", ["analyst"], [])["allow"]
+    assert eval_system_information(RULES, "admin", [], [])["allow"]
+    assert not eval_system_information(RULES, "bob", [], [])["allow"]
+
+def test_impersonation_back_reference():
+    assert eval_impersonation(RULES, "svc_alice", "alice")["allow"]
+    assert not eval_impersonation(RULES, "svc_alice", "bob")["allow"]
+    assert eval_impersonation(RULES, "superset", "bob")["allow"]
+    assert not eval_impersonation(RULES, "superset", "admin")["allow"]
+    assert eval_impersonation(RULES, "bob", "bob")["allow"]
+
+def test_evaluate_many():
+    out = evaluate_many(RULES, "impersonation", [{"principal":"svc_a","user":"a"},{"principal":"svc_a","user":"b"}])
+    assert out["allow"] == [True, False] and out["rule"] == [0, None]
+    out = evaluate_many(RULES, "function", [{"user":"bob","groups":"analyst","catalog":"hive","function":"udf_x"},
+                                            {"user":"eve","catalog":"hive","function":"udf_x"}])
+    assert out["allow"] == [True, False] and out["rule"] == [0, 1]
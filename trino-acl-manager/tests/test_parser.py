@@ -0,0 +1,33 @@
+import json
+import pytest
+from acl.parser import RulesLoadError, dump_rules, dump_rules_json, load_rules, load_rules_stream
+
+def test_stream_loader_matches_load_rules():
+    data = {"catalogs": [{"group": "analyst", "catalog": "hive", "allow": "read-only"}],
+            "tables": [{"catalog": "hive", "schema": "s", "table": f"t{i}", "privileges": ["SELECT"]} for i in range(7)],
+            "impersonation": [{"principal": "admin", "user": ".*"}], "comment": {"ignored": True}}
+    expected = load_rules(data)
+    assert load_rules_stream(json.dumps(data).encode(), chunk_size=3) == expected
+    assert load_rules_stream(json.dumps({"data": data}, indent=2)) == expected
+
+def test_stream_loader_ignores_siblings_of_data():
+    inner = {"tables": [{"catalog": "hive", "schema": "s", "table": "t", "privileges": ["SELECT"]}]}
+    text = json.dumps({"schemas": [{"catalog": "hive", "schema": "a", "owner": True}], "data": inner,
+                       "catalogs": [{"catalog": ".*", "allow": "all"}], "tables": "not a list"})
+    assert load_rules_stream(text) == load_rules(json.loads(text)) == load_rules(inner)
+
+def test_stream_loader_reports_rule_position():
+    text = '{"tables": [\n  {"catalog": "a", "schema": "b", "table": "c"},\n  {"catalog": "a", "schema": "b"}\n]}'
+    with pytest.raises(RulesLoadError) as err:
+        load_rules_stream(text, chunk_size=1)
+    assert (err.value.tier, err.value.index, err.value.line, err.value.column) == ("tables", 1, 3, 3)
+    with pytest.raises(RulesLoadError, match="line 1 column 29"):
+        load_rules_stream('{"catalogs":[{"catalog":"a",}]}')
+
+def test_dump_rules_single_pass_matches_json_round_trip():
+    rules = load_rules({"catalogs": [{"user": "admin", "catalog": ".*", "allow": "all"}],
+                        "session_properties": [{"property": "query_max_memory", "allow": False}]})
+    expected = json.loads(rules.model_dump_json(exclude_none=True))
+    assert dump_rules(rules) == expected
+    assert json.loads(dump_rules_json(rules)) == expected
+    assert load_rules_stream(dump_rules_json(rules)) == rules
@@ -0,0 +1,36 @@
+import pytest
+from acl.editor import apply_grid_edits
+from acl.models import AccessControlRules
+from acl.redos import EXPONENTIAL, POLYNOMIAL, UnsafePatternError, analyze_pattern, check_rules, \
+    pattern_cost, profile_patterns, scan_rules
+
+def test_static_analysis_flags_backtracking_constructs():
+    for pattern in ("(a+)+", "(\\w+\\s?)+", "(a|a)*", "([a-z]+)*", "(a{1,3})+", "(.+\\.)+x", "(\\d+\\.?)+",
+                    "(a\\.|a\\.)+", "((\\d+)+\\.)+"):
+        assert analyze_pattern(pattern)[0][0] == EXPONENTIAL, pattern
+    assert analyze_pattern(".*_.*_.*")[0][0] == POLYNOMIAL
+    for pattern in ("orders", "sales_.*", "(sales|hr)_[a-z]+", "(ab+)+", "\\d+x\\d+y\\d+", "[a-z]{2,8}_.*", "(a|ab)*",
+                    "(\\d+\\.)+\\d+", "([a-z]+_)+[a-z]+"):
+        assert analyze_pattern(pattern) == (), pattern
+    # a delimiter ends every iteration: ordinary version-string rules pass bounded mode
+    check_rules(AccessControlRules(**{"catalogs": [{"catalog": "hive_v(\\d+\\.)+\\d+", "allow": "all"}]}))
+
+def test_profile_ranks_expensive_rules_first_and_stays_bounded():
+    rules = AccessControlRules(**{"tables": [
+        {"catalog": "hive", "schema": "sales", "table": "orders_[0-9]+", "privileges": ["SELECT"]},
+        {"catalog": "hive", "schema": "(a+)+", "table": ".*", "privileges": ["SELECT"]},
+    ]})
+    assert [(f["index"], f["field"]) for f in scan_rules(rules)] == [(1, "schema")]
+    ranked = profile_patterns(rules, ["orders_1", "sales"], budget=0.02)
+    assert ranked[0]["pattern"] == "(a+)+" and ranked[0]["exceeded"] and ranked[0]["flagged"] == EXPONENTIAL
+    assert not pattern_cost("orders_[0-9]+", budget=0.02)["exceeded"]
+
+def test_bounded_mode_rejects_unsafe_patterns():
+    rules = AccessControlRules(**{"catalogs": [{"catalog": "hive", "allow": "all"}]})
+    with pytest.raises(ValueError, match="catalog"):
+        apply_grid_edits(rules, "catalogs", [0], {"edited_rows": {0: {"catalog": "(h+)+"}}}, bounded=True)
+    assert rules.catalogs[0].catalog == "hive"
+    assert apply_grid_edits(rules, "catalogs", [0], {"edited_rows": {0: {"catalog": "hive|iceberg"}}}, bounded=True)
+    check_rules(rules)
+    with pytest.raises(UnsafePatternError, match="length|longer"):
+        check_rules(AccessControlRules(**{"catalogs": [{"catalog": "(a|b)" * 200, "allow": "all"}]}))
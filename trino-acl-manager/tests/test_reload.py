@@ -0,0 +1,32 @@
+import json
+from acl.cache import DecisionCache
+from acl.evaluator import effective_access
+from acl.reload import FileWatcher, RuleStore
+
+def _write(path, allow):
+    path.write_text(json.dumps({"catalogs": [{"catalog": "hive", "allow": allow}]}))
+
+def test_watcher_swaps_and_keeps_old_version_on_bad_file(tmp_path):
+    rules_file = tmp_path / "rules.json"
+    _write(rules_file, "all")
+    cache = DecisionCache()
+    store = RuleStore(cache=cache)
+    watcher = FileWatcher(store, str(rules_file))
+    assert watcher.check()
+    old = store.current
+    assert effective_access(old, "bob", [], [], "hive", cache=cache)["visible"]
+
+    _write(rules_file, "none")
+    assert watcher.check()
+    # the hot key was re-decided against the new rules before the swap
+    assert cache.stats()["size"] == 1
+    assert not effective_access(store.current, "bob", [], [], "hive", cache=cache)["visible"]
+    # a request still running on the old version neither sees nor flushes the new entries
+    assert effective_access(old, "bob", [], [], "hive", cache=cache)["visible"]
+    assert cache.stats()["size"] == 1
+
+    rules_file.write_text('{"catalogs": [{"allow": "all"}]}')
+    live = store.current
+    assert not watcher.check()
+    assert store.current is live and store.last_error
+    assert store.rollback() and store.current is old
@@ -0,0 +1,46 @@
+from acl.analysis import pattern_disjoint
+from acl.compiled import CompiledRuleSet, compile_pattern
+from acl.evaluator import effective_access_many
+from acl.models import AccessControlRules
+from acl.optimize import rule_checks, verify_equivalent
+from acl.reorder import reorder_rules
+from acl.trace import HitCounter
+
+RULES = AccessControlRules(**{"tables": [
+    {"catalog": "hive", "schema": "hr", "table": ".*"},
+    {"group": "analyst", "catalog": "hive", "schema": "sales", "table": "orders_.*", "privileges": ["SELECT"]},
+    {"catalog": "hive", "schema": "sales", "table": "orders_eu"},
+    {"user": "etl", "catalog": "hive", "schema": "sales", "table": "orders_us", "privileges": ["INSERT"]},
+    {"group": "analyst", "catalog": "hive", "schema": "sales", "table": "items", "privileges": ["SELECT"]},
+]})
+
+def test_pattern_disjoint_is_proof_only():
+    c = compile_pattern
+    assert pattern_disjoint(c("orders"), c("items")) and pattern_disjoint(c("sales_.*"), c("hr_.*"))
+    assert pattern_disjoint(c("orders_[0-9]+"), c("items_.*"))
+    assert not pattern_disjoint(c("orders_.*"), c("orders_eu")) and not pattern_disjoint(c("[ab]c"), c("ac"))
+
+def test_hot_rules_move_up_only_past_non_conflicting_rules():
+    compiled = CompiledRuleSet(RULES)
+    hits = HitCounter()
+    checks = [{"user": "bob", "groups": "analyst", "roles": "", "catalog": "hive", "schema": "sales", "table": t}
+              for t in ("items", "items", "items", "orders_eu", "orders_us")]
+    effective_access_many(compiled, checks, hits=hits)
+    reordered, report = reorder_rules(compiled, hits)
+    # items overlaps nothing above it; orders_.* passes the hr rule but not the hotter items rule
+    assert [r.table for r in reordered.tables] == ["items", "orders_.*", ".*", "orders_eu", "orders_us"]
+    assert report["verification"]["equivalent"]
+    assert report["tiers"]["tables"]["mean_examined_after"] < report["tiers"]["tables"]["mean_examined_before"]
+    assert verify_equivalent(RULES, reordered)["equivalent"]
+
+def test_verification_samples_each_rules_full_match():
+    compiled = CompiledRuleSet(RULES)
+    for rule in compiled.tables:
+        assert any(rule.identity_matches(u, g, r) and rule.object_matches(o["catalog"], o["schema"], o["table"])
+                   for (u, g, r), o in rule_checks(compiled))
+    # orders_.* and orders_eu conflict only on orders_eu itself; swapping them must be caught
+    tables = list(RULES.tables)
+    tables[1], tables[2] = tables[2], tables[1]
+    report = verify_equivalent(compiled, RULES.model_copy(update={"tables": tables}))
+    assert not report["equivalent"]
+    assert {m["check"]["table"] for m in report["mismatches"]} == {"orders_eu"}
@@ -0,0 +1,62 @@
+import json
+import sqlite3
+import pytest
+from acl.models import AccessControlRules
+from acl.replay import iter_query_rows, query_checks, replay
+
+def _log(path):
+    conn = sqlite3.connect(str(path))
+    conn.execute('CREATE TABLE trino_queries (query_id TEXT, "user" TEXT, catalog TEXT, schema TEXT, '
+                 'update_type TEXT, inputs_json TEXT, output_json TEXT, create_time TEXT)')
+    def t(c, s, n):
+        return {"catalogName": c, "schema": s, "table": n, "columns": []}
+    rows = [
+        ("q1", "alice", "hive", "sales", None, json.dumps([t("hive", "sales", "orders")]), None, "2024-01-01"),
+        ("q2", "bob", "hive", "sales", None, json.dumps([t("hive", "sales", "orders"), t("hive", "hr", "pay")]), None, "2024-01-02"),
+        ("q3", "bob", "hive", "sales", "INSERT", json.dumps([t("hive", "sales", "orders")]),
+         json.dumps(t("hive", "sales", "orders_copy")), "2024-01-03"),
+        ("q4", "bob", None, None, None, "[]", None, "2024-01-04"),
+    ] + [(f"r{i}", "alice", "hive", "hr", None, json.dumps([t("hive", "hr", "pay")]), None, "2024-02-01") for i in range(5)]
+    conn.executemany("INSERT INTO trino_queries VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    return conn
+
+LIVE = AccessControlRules(**{"tables": [{"catalog": "hive", "schema": ".*", "table": ".*", "privileges": ["SELECT", "INSERT"]}],
+                             "catalogs": [{"catalog": "hive", "allow": "all"}]})
+PROPOSED = AccessControlRules(**{"tables": [{"group": "finance", "catalog": "hive", "schema": "hr", "table": ".*", "privileges": ["SELECT"]},
+                                            {"catalog": "hive", "schema": "sales", "table": ".*", "privileges": ["SELECT"]}],
+                                 "catalogs": [{"catalog": "hive", "allow": "all"}]})
+
+def test_query_checks_from_inputs_and_output():
+    row = {"user": "bob", "update_type": "insert",
+           "inputs_json": '[{"catalogName": "hive", "schema": "s", "table": "a"}]',
+           "output_json": '{"catalogName": "hive", "schema": "s", "table": "b"}'}
+    assert query_checks(row, {"bob": ["etl"]}) == [("bob", ("etl",), "hive", "s", "a", "SELECT"),
+                                                   ("bob", ("etl",), "hive", "s", "b", "INSERT")]
+
+def test_replay_reports_new_denials_grouped(tmp_path):
+    conn = _log(tmp_path / "log.db")
+    res = replay(conn, PROPOSED, baseline=LIVE, chunk_size=2, groups={"alice": ["finance"]})
+    assert (res["rows"], res["skipped"]) == (9, 1)
+    assert [(d["user"], d["table"], d["privilege"], d["queries"]) for d in res["denied"]] == \
+           [("bob", "pay", "SELECT", 1), ("bob", "orders_copy", "INSERT", 1)]
+    assert res["by_user"] == {"bob": 2}
+    since = replay(conn, PROPOSED, baseline=LIVE, chunk_size=2, processes=2, since="2024-01-03")
+    assert since["rows"] == 7
+    assert [(d["user"], d["queries"]) for d in since["denied"]] == [("alice", 5), ("bob", 1)]
+
+def test_sqlalchemy_engine_is_streamed(tmp_path):
+    sqlalchemy = pytest.importorskip("sqlalchemy")
+    from sqlalchemy.pool import StaticPool
+    # one shared in-memory database across the engine's connections
+    engine = sqlalchemy.create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    rows = _log(tmp_path / "log.db").execute("SELECT * FROM trino_queries").fetchall()
+    with engine.begin() as c:
+        c.exec_driver_sql('CREATE TABLE trino_queries (query_id TEXT, "user" TEXT, catalog TEXT, schema TEXT, '
+                          'update_type TEXT, inputs_json TEXT, output_json TEXT, create_time TEXT)')
+        c.exec_driver_sql("INSERT INTO trino_queries VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    chunks = list(iter_query_rows(engine, chunk_size=4, since="2024-01-03"))
+    assert [len(c) for c in chunks] == [4, 3]
+    assert chunks[0][0]["query_id"] == "q3" and "create_time" not in chunks[0][0]
+    res = replay(engine, PROPOSED, baseline=LIVE, chunk_size=2, groups={"alice": ["finance"]})
+    assert res["rows"] == 9 and res["by_user"] == {"bob": 2}
@@ -0,0 +1,33 @@
+from acl.models import AccessControlRules
+from acl.evaluator import effective_access, has_privilege
+from acl.reverse import who_can
+
+RULES = AccessControlRules(**{
+    "catalogs":[{"user":"admin","catalog":".*","allow":"all"},{"group":"analyst|finance","catalog":"hive","allow":"read-only"}],
+    "tables":[{"user":"mallory","catalog":"hive","schema":"sales","table":".*"},
+              {"group":"analyst","catalog":"hive","schema":"sales","table":"orders","privileges":["SELECT"]},
+              {"group":"fin.*","catalog":"hive","schema":"sales","table":"ord.*","privileges":["SELECT"]},
+              {"catalog":"hive","schema":".*","table":".*","privileges":[]},
+              {"user":"admin","catalog":"hive","schema":".*","table":".*","privileges":["SELECT"]}],
+})
+DIRECTORY = [("bob",("analyst",),()),("mallory",("analyst",),()),("fiona",("finance",),()),("admin",(),()),("eve",(),())]
+
+def test_who_can_matches_forward_evaluation():
+    res = who_can(RULES, "hive", "sales", "orders", "SELECT", DIRECTORY)
+    expected = [u for u, g, r in DIRECTORY
+                if has_privilege(effective_access(RULES, u, list(g), list(r), "hive", "sales", "orders"), "SELECT")]
+    assert res["users"] == sorted(expected) == ["bob", "fiona"]
+    assert res["groups"] == ["analyst", "finance"]
+    assert not res["anyone"]
+    assert [r["reachable"] for r in res["rules"]] == [True, True, True, True, False]
+
+def test_user_wildcard_deny_shadows_group_grant():
+    rules = AccessControlRules(**{
+        "catalogs":[{"catalog":"hive","allow":"all"}],
+        "tables":[{"user":".*","catalog":"hive","schema":"sales","table":"orders","privileges":[]},
+                  {"group":"analyst","catalog":"hive","schema":"sales","table":"orders","privileges":["SELECT"]}],
+    })
+    res = who_can(rules, "hive", "sales", "orders", "SELECT", [("bob", ("analyst",), ())])
+    assert res["users"] == [] and res["groups"] == [] and not res["anyone"]
+    assert [r["reachable"] for r in res["rules"]] == [True, False]
+    assert not has_privilege(effective_access(rules, "bob", ["analyst"], [], "hive", "sales", "orders"), "SELECT")
@@ -0,0 +1,61 @@
+from acl.compiled import CompiledRuleSet
+from acl.evaluator import effective_access, effective_access_many
+from acl.models import AccessControlRules
+from acl.trace import HitCounter
+
+RULES = {
+    "catalogs": [{"group": "analyst", "catalog": "hive", "allow": "read-only"}, {"catalog": "hive", "allow": "none"}],
+    "tables": [
+        {"user": "etl", "catalog": "hive", "schema": ".*", "table": ".*", "privileges": ["INSERT"]},
+        {"catalog": "hive", "schema": "hr", "table": ".*"},
+        {"group": "analyst", "catalog": "hive", "schema": "sales", "table": "orders", "privileges": ["SELECT"]},
+    ],
+}
+
+def test_explain_records_skips_and_matches_the_decision():
+    compiled = CompiledRuleSet(AccessControlRules(**RULES))
+    res = effective_access(compiled, "bob", ["analyst"], [], "hive", "sales", "orders", explain=True)
+    # the explained pass is the evaluation itself: it builds the principal view, nothing ran before it
+    assert compiled._views.cache_info().misses == 1 and compiled._views.cache_info().hits == 0
+    assert {k: v for k, v in res.items() if k != "explain"} == \
+        effective_access(compiled, "bob", ["analyst"], [], "hive", "sales", "orders")
+    assert res["table"]["privileges"] == ["SELECT"]
+    tables = res["explain"]["tiers"]["tables"]
+    assert tables["matched"] == 2 and tables["examined"] == 3
+    assert tables["trace"] == [{"index": 0, "reason": "identity"},
+                               {"index": 1, "reason": "pattern", "field": "schema", "pattern": "hr", "value": "sales"}]
+    assert tables["seconds"] >= 0 and "schemas" in res["explain"]["tiers"]
+    miss = effective_access(compiled, "eve", [], [], "hive", None, None, explain=True)["explain"]["tiers"]
+    assert list(miss) == ["catalogs"] and miss["catalogs"]["matched"] == 1
+
+def test_hit_counter_accumulates_and_follows_moved_rules():
+    checks = [{"user": "bob", "groups": "analyst", "roles": "", "catalog": "hive", "schema": "sales", "table": "orders"}] * 3 + \
+             [{"user": "eve", "groups": "", "roles": "", "catalog": "hive", "schema": "hr", "table": "pay"}]
+    hits = HitCounter()
+    compiled = CompiledRuleSet(AccessControlRules(**RULES))
+    effective_access_many(compiled, checks, hits=hits)
+    # move the hot table rule to the top; its count follows it
+    moved = dict(RULES, tables=[RULES["tables"][2]] + RULES["tables"][:2])
+    compiled = CompiledRuleSet(AccessControlRules(**moved))
+    effective_access_many(compiled, checks[:1], hits=hits)
+    hot = [r for r in hits.hot_rules(compiled) if r["tier"] == "tables"]
+    assert hot[0] == {"tier": "tables", "index": 0, "hits": 4, "share": 0.8}
+    summary = hits.summary(compiled)
+    assert summary["tables"] == {"hits": 5, "misses": 0, "mean_examined": 1.4}
+    assert summary["schemas"] == {"hits": 0, "misses": 5, "mean_examined": 0.0}
+
+def test_hit_counter_serializes_rules_once_per_version(monkeypatch):
+    from acl.models import TableAccessControlRule
+    compiled = CompiledRuleSet(AccessControlRules(**RULES))
+    hits = HitCounter()
+    effective_access_many(compiled, [{"user": "bob", "groups": "analyst", "roles": "", "catalog": "hive",
+                                      "schema": "sales", "table": "orders"}], hits=hits)
+    dumped = []
+    original = TableAccessControlRule.model_dump_json
+    monkeypatch.setattr(TableAccessControlRule, "model_dump_json", lambda self, **kw: dumped.append(1) or original(self, **kw))
+    for _ in range(3):
+        hits.summary(compiled)
+        hits.hot_rules(compiled)
+    assert dumped == []
+    hits.hot_rules(CompiledRuleSet(AccessControlRules(**RULES)))
+    assert len(dumped) == len(RULES["tables"])